@@ -1,11 +1,80 @@
 """FastAPI application factory."""
 
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
 from pathlib import Path
-from app.routes import sessions_router, users_router, execution_router, health_router
+from app.middleware import (
+    CompressionMiddleware,
+    LoadSheddingMiddleware,
+    MetricsMiddleware,
+    ReadYourWritesMiddleware,
+    ShardingMiddleware,
+    TracingMiddleware,
+)
+from app.static import PrecompressedStaticFiles
+from app.routes import (
+    sessions_router,
+    users_router,
+    execution_router,
+    health_router,
+    metrics_router,
+    presence_router,
+    events_router,
+    revisions_router,
+)
+from app.services import db
+from app.services.events import bus
+from app.services.presence import run_presence_reaper
+from app.services.zygote import FORK_AVAILABLE, zygote
+
+logger = logging.getLogger(__name__)
+
+# Seconds startup waits for the tables before serving (unhealthy) anyway
+DATABASE_INIT_WAIT = 5.0
+
+
+async def prepare_database(database, retry_interval: float = 1.0, max_interval: float = 30.0) -> None:
+    """Create tables, retrying with backoff until the database answers."""
+    while True:
+        try:
+            await asyncio.to_thread(database.init)
+            return
+        except Exception:
+            logger.warning("Database not ready; retrying in %.0fs", retry_interval, exc_info=True)
+        await asyncio.sleep(retry_interval)
+        retry_interval = min(retry_interval * 2, max_interval)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Prepare the database and run background tasks for the lifetime of the application.
+
+    Nothing connects to the database at import or in ``create_app``; tables
+    are created here, off the event loop. If the database is unreachable
+    the worker starts anyway and keeps retrying in the background, with
+    the health check reporting 503 until the tables exist.
+    """
+    init = asyncio.create_task(prepare_database(db))
+    await asyncio.wait({init}, timeout=DATABASE_INIT_WAIT)
+    if FORK_AVAILABLE:
+        # Boot the execution fork server now rather than on the first run
+        await asyncio.to_thread(zygote.start)
+    await bus.start()
+    reaper = asyncio.create_task(run_presence_reaper(db))
+    try:
+        yield
+    finally:
+        init.cancel()
+        reaper.cancel()
+        try:
+            await reaper
+        except asyncio.CancelledError:
+            pass
+        await bus.stop()
+        await asyncio.to_thread(zygote.stop)
 
 
 def create_app() -> FastAPI:
@@ -18,8 +87,16 @@ def create_app() -> FastAPI:
         title="CodeInterview API",
         description="Real-time collaborative code interview platform API",
         version="1.0.0",
+        lifespan=lifespan,
     )
 
+    # Route a client's reads to the primary right after it writes
+    if db.replicas:
+        app.add_middleware(ReadYourWritesMiddleware)
+
+    # Send session requests to the worker owning the session; a no-op unless SHARD_NODES is set
+    app.add_middleware(ShardingMiddleware)
+
     # Add CORS middleware
     app.add_middleware(
         CORSMiddleware,
@@ -29,16 +106,32 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Compress API responses and on-the-fly static files above the size threshold
+    app.add_middleware(CompressionMiddleware)
+
+    # Shed polling first, then writes, when latency shows the server is saturated
+    app.add_middleware(LoadSheddingMiddleware)
+
+    # Record per-route latency and in-flight requests for /metrics
+    app.add_middleware(MetricsMiddleware)
+    # Root span per request; a no-op unless TRACE_EXPORTER is set
+    app.add_middleware(TracingMiddleware)
+
     # Include routers
     app.include_router(sessions_router)
     app.include_router(users_router)
     app.include_router(execution_router)
     app.include_router(health_router)
+    app.include_router(metrics_router)
+    app.include_router(presence_router)
+    app.include_router(events_router)
+    app.include_router(revisions_router)
 
     # Serve built frontend static files if present
     static_dir = Path(__file__).resolve().parent.parent / 'frontend' / 'dist'
     if static_dir.exists():
         # Mount the build at root so paths like '/assets' resolve correctly
-        app.mount('/', StaticFiles(directory=str(static_dir), html=True), name='frontend')
+        # (serving precompressed .br/.gz siblings, immutable caching for hashed /assets)
+        app.mount('/', PrecompressedStaticFiles(directory=str(static_dir), html=True), name='frontend')
 
     return app
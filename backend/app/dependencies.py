@@ -0,0 +1,103 @@
+"""Shared route dependencies.
+
+Configuration:
+    ADMIN_API_TOKEN: Bearer token for admin endpoints such as the session
+        listing (unset disables them)
+"""
+
+import math
+import os
+import secrets
+from fastapi import Depends, HTTPException, Request, status
+from app.services import db
+from app.services.database import UnitOfWork
+from app.services.ratelimit import RateLimit, limiter
+
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN", "")
+
+
+def enforce_rate_limit(name: str, key: str, limit: RateLimit) -> None:
+    """Count a request against a limit, rejecting it with 429 when exhausted.
+
+    Raises:
+        HTTPException: With a ``Retry-After`` header if the bucket is empty
+    """
+    retry_after = limiter.hit(name, key, limit)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail={
+                "error": "RATE_LIMITED",
+                "message": f"Too many requests; retry in {retry_after:.1f}s",
+                "statusCode": 429,
+            },
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
+def rate_limited(name: str, rate: float, burst: int, per: str = "client"):
+    """Route dependency applying a named token-bucket limit.
+
+    Args:
+        name: Limit name, overridable with ``RATE_LIMIT_<NAME>=rate/burst``
+        rate: Sustained requests per second
+        burst: Requests allowed at once
+        per: ``client`` (by client address, taken from ``X-Forwarded-For``
+            when the peer is in ``FORWARDED_ALLOW_IPS``) or ``session`` (by
+            the ``session_id`` path parameter)
+    """
+    limit = RateLimit.from_env(name, RateLimit(rate, burst))
+
+    async def dependency(request: Request) -> None:
+        if per == "session":
+            key = request.path_params.get("session_id")
+            if key is None:
+                return
+        else:
+            key = request.client.host if request.client else "unknown"
+        enforce_rate_limit(name, key, limit)
+
+    return Depends(dependency)
+
+
+async def unit_of_work():
+    """Route dependency sharing one database connection and transaction per request.
+
+    Routes call ``commit()`` on the yielded unit once their writes are done,
+    before publishing events about them. Anything left uncommitted is
+    committed when the request ends, or rolled back if it failed.
+    """
+    with db.unit_of_work() as unit:
+        yield unit
+
+
+async def require_admin(request: Request) -> None:
+    """Route dependency admitting only requests that bear ``ADMIN_API_TOKEN``.
+
+    Session IDs are the only capability needed to join a session, so
+    endpoints that reveal them are for operators, not participants.
+
+    Raises:
+        HTTPException: 403 if no admin token is configured, 401 if the
+            request's bearer token is missing or wrong
+    """
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail={
+                "error": "ADMIN_API_DISABLED",
+                "message": "Set ADMIN_API_TOKEN to enable admin endpoints",
+                "statusCode": 403,
+            },
+        )
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), ADMIN_API_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail={
+                "error": "UNAUTHORIZED",
+                "message": "A valid admin bearer token is required",
+                "statusCode": 401,
+            },
+            headers={"WWW-Authenticate": "Bearer"},
+        )
@@ -0,0 +1,18 @@
+"""Middleware package."""
+
+from .compression import CompressionMiddleware
+from .loadshed import LoadSheddingMiddleware
+from .metrics import MetricsMiddleware
+from .replicas import ReadYourWritesMiddleware
+from .sharding import ShardingMiddleware
+from .tracing import TracingMiddleware, TracedRoute
+
+__all__ = [
+    "CompressionMiddleware",
+    "LoadSheddingMiddleware",
+    "MetricsMiddleware",
+    "ReadYourWritesMiddleware",
+    "ShardingMiddleware",
+    "TracingMiddleware",
+    "TracedRoute",
+]
@@ -0,0 +1,190 @@
+"""Response compression middleware (brotli or gzip)."""
+
+import asyncio
+import gzip
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional speedup
+    brotli = None
+
+# Responses smaller than this are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# Bodies larger than this are compressed off the event loop
+THREAD_MIN_SIZE = 128 * 1024
+GZIP_LEVEL = 6
+# Brotli quality tuned for on-the-fly compression; static assets are precompressed at 11
+BROTLI_QUALITY = 4
+
+EXCLUDED_CONTENT_TYPES = (
+    "application/gzip",
+    "application/zip",
+    "application/octet-stream",
+    "audio/",
+    "font/woff",
+    "image/",
+    "text/event-stream",
+    "video/",
+)
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """Parse an ``Accept-Encoding`` header into ``{coding: q}``."""
+    codings = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding.strip().lower()] = q
+    return codings
+
+
+def choose_encoding(header: str, available: tuple[str, ...]) -> str | None:
+    """Pick the client's preferred encoding among ``available`` (in server preference order)."""
+    codings = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for coding in available:
+        q = codings.get(coding, codings.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def available_encodings() -> tuple[str, ...]:
+    """Encodings this process can produce, most preferred first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+class _Compressor:
+    """Incremental compressor for one response."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits=31 writes a gzip header and trailer
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Compress a complete body in one shot."""
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, GZIP_LEVEL, mtime=0)
+
+
+def _header(headers: list, name: bytes) -> bytes | None:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing responses above a size threshold.
+
+    Uses brotli when installed and accepted, gzip otherwise. Responses that
+    already carry ``Content-Encoding`` (e.g. precompressed static assets),
+    event streams and already-compressed media types are passed through.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = _header(scope["headers"], b"accept-encoding")
+        encoding = choose_encoding(accept.decode("latin-1"), available_encodings()) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                content_type = (_header(headers, b"content-type") or b"").decode("latin-1").lower()
+                passthrough = (
+                    message["status"] in (204, 206, 304)
+                    or _header(headers, b"content-encoding") is not None
+                    or content_type.startswith(EXCLUDED_CONTENT_TYPES)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    # Hold the headers until the first body chunk shows the size
+                    start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if start_message is not None:
+                headers = [
+                    (k, v) for k, v in start_message.get("headers", [])
+                    if k.lower() not in (b"content-length", b"vary")
+                ]
+                vary = _header(start_message.get("headers", []), b"vary")
+                vary_value = b"Accept-Encoding" if not vary else vary + b", Accept-Encoding"
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                headers.append((b"vary", vary_value))
+                headers.append((b"content-encoding", encoding.encode()))
+                if not more_body:
+                    if len(body) >= THREAD_MIN_SIZE:
+                        body = await asyncio.to_thread(compress, body, encoding)
+                    else:
+                        body = compress(body, encoding)
+                    headers.append((b"content-length", str(len(body)).encode()))
+                    await send({**start_message, "headers": headers})
+                    start_message = None
+                    await send({"type": "http.response.body", "body": body})
+                    return
+
+                # Streaming body: compress chunk by chunk without a length
+                compressor = _Compressor(encoding)
+                await send({**start_message, "headers": headers})
+                start_message = None
+
+            chunk = compressor.compress(body) if body else b""
+            if not more_body:
+                chunk += compressor.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
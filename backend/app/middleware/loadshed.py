@@ -0,0 +1,169 @@
+"""Adaptive concurrency limiting and priority load shedding."""
+
+import math
+import os
+import threading
+import time
+from starlette.responses import JSONResponse
+from app.services.metrics import registry
+
+load_shed_total = registry.counter(
+    "load_shed_total",
+    "Requests rejected with 503 because the server was saturated, by priority",
+    ["priority"],
+)
+concurrency_limit = registry.gauge(
+    "concurrency_limit",
+    "Current adaptive limit on concurrently served API requests",
+)
+
+# Priorities, lowest first. A request is admitted while in-flight requests
+# stay below this fraction of the limit; "critical" is never shed.
+PRIORITY_SHARE = {
+    "low": 0.7,  # Polling GETs
+    "normal": 0.9,  # Writes: edits, runs, heartbeats
+    "high": 1.0,  # Joins and session creation
+}
+
+# Long-lived streams would pin slots for their whole lifetime
+STREAM_SUFFIXES = ("/events", "/replay")
+CRITICAL_PATHS = ("/api/v1/health", "/metrics")
+# Latency dominated by user code (and bounded by the execution pool) says
+# nothing about server health, so it does not move the limit
+UNSAMPLED_PATHS = ("/api/v1/execute",)
+
+
+def request_priority(method: str, path: str) -> str | None:
+    """Classify a request, or return None if it is not subject to the limit."""
+    if not path.startswith("/api/") and path != "/metrics":
+        return None  # Static frontend
+    if path.startswith(CRITICAL_PATHS):
+        return "critical"
+    if path.endswith(STREAM_SUFFIXES):
+        return None
+    if method in ("GET", "HEAD"):
+        return "low"
+    if method == "POST" and (path == "/api/v1/sessions" or path.endswith("/users")):
+        return "high"
+    return "normal"
+
+
+class AdaptiveConcurrencyLimit:
+    """Concurrency limit that follows observed latency (gradient algorithm).
+
+    A slow-moving average of request latency is the baseline of a healthy
+    server. When the fast-moving average rises above it (e.g. Postgres slows
+    down and requests queue), the limit shrinks in proportion; while latency
+    stays at the baseline and the limit is actually used, it grows by about
+    ``sqrt(limit)`` per request to probe for spare capacity.
+    """
+
+    def __init__(
+        self,
+        initial: int = 64,
+        min_limit: int = 8,
+        max_limit: int = 512,
+        tolerance: float = 1.5,
+        smoothing: float = 0.2,
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.inflight = 0
+        self._short_rtt = 0.0
+        self._long_rtt = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "AdaptiveConcurrencyLimit":
+        """Build the limit from the ``LOAD_SHED_*`` environment variables."""
+        return cls(
+            initial=int(os.getenv("LOAD_SHED_INITIAL_LIMIT", "64")),
+            min_limit=int(os.getenv("LOAD_SHED_MIN_LIMIT", "8")),
+            max_limit=int(os.getenv("LOAD_SHED_MAX_LIMIT", "512")),
+        )
+
+    def try_acquire(self, priority: str) -> bool:
+        """Take a slot unless the priority's share of the limit is used up."""
+        with self._lock:
+            if priority != "critical" and self.inflight >= self.limit * PRIORITY_SHARE[priority]:
+                return False
+            self.inflight += 1
+            return True
+
+    def release(self, rtt: float | None) -> None:
+        """Return a slot and adapt the limit to the request's latency (seconds, or None)."""
+        with self._lock:
+            inflight = self.inflight
+            self.inflight -= 1
+            if rtt is None:
+                return
+            if self._long_rtt == 0.0:
+                self._short_rtt = self._long_rtt = rtt
+                return
+            self._short_rtt += (rtt - self._short_rtt) * 0.1
+            self._long_rtt += (rtt - self._long_rtt) * 0.01
+            # Let the baseline recover quickly once latency improves
+            if self._long_rtt > self._short_rtt * 2:
+                self._long_rtt *= 0.95
+
+            gradient = max(0.5, min(1.0, self.tolerance * self._long_rtt / self._short_rtt))
+            if gradient == 1.0 and inflight < self.limit / 2:
+                return  # Not using the limit; latency says nothing about it
+            target = self.limit * gradient + math.sqrt(self.limit)
+            limit = self.limit * (1 - self.smoothing) + target * self.smoothing
+            self.limit = max(self.min_limit, min(self.max_limit, limit))
+
+
+class LoadSheddingMiddleware:
+    """Pure ASGI middleware rejecting low-priority requests when saturated.
+
+    Requests are admitted against an ``AdaptiveConcurrencyLimit``. When the
+    server is saturated, polling GETs are shed first with ``503`` and
+    ``Retry-After``, then writes, then joins. Health checks and metrics are
+    never shed, and long-lived event streams are not counted.
+
+    Configuration:
+        LOAD_SHED_ENABLED: ``0`` disables shedding (default: ``1``)
+        LOAD_SHED_INITIAL_LIMIT / LOAD_SHED_MIN_LIMIT / LOAD_SHED_MAX_LIMIT
+    """
+
+    def __init__(self, app, limiter: AdaptiveConcurrencyLimit | None = None):
+        self.app = app
+        self.limiter = limiter or AdaptiveConcurrencyLimit.from_env()
+        self.enabled = os.getenv("LOAD_SHED_ENABLED", "1") != "0"
+        concurrency_limit.set_function(lambda: self.limiter.limit)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+        priority = request_priority(scope["method"], scope["path"])
+        if priority is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not self.limiter.try_acquire(priority):
+            load_shed_total.inc(priority=priority)
+            response = JSONResponse(
+                {
+                    "detail": {
+                        "error": "OVERLOADED",
+                        "message": "Server is overloaded; retry shortly",
+                        "statusCode": 503,
+                    }
+                },
+                status_code=503,
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+
+        sampled = not scope["path"].startswith(UNSAMPLED_PATHS)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release(time.perf_counter() - start if sampled else None)
@@ -0,0 +1,66 @@
+"""HTTP request metrics middleware."""
+
+import time
+from app.services.metrics import registry
+
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served",
+    ["method"],
+)
+
+# Route label used when no route matched, to keep label cardinality bounded
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def route_label(scope: dict) -> str:
+    """Return the route template that served a request (e.g. ``/api/v1/sessions/{session_id}``)."""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        return UNMATCHED_ROUTE
+    # Mounts (the static frontend) have an empty path
+    return path or "/"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency and in-flight requests.
+
+    Implemented without ``BaseHTTPMiddleware`` so it adds no extra task or
+    body buffering per request and is cheap enough to leave on under load.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(method=method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec(method=method)
+            http_request_duration_seconds.observe(
+                time.perf_counter() - start,
+                method=method,
+                route=route_label(scope),
+                status=str(status_code),
+            )
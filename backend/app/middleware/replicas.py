@@ -0,0 +1,59 @@
+"""Read-your-writes pinning for database read replicas.
+
+A request that writes gets a short-lived cookie; requests carrying it read
+from the primary, so a client sees its own writes even while replicas lag.
+The cookie travels with the client, so the pin holds whichever worker or
+node serves the next request. Browsers send it on same-origin requests
+(the frontend served by the backend) or with ``credentials: "include"``.
+
+Configuration:
+    REPLICA_PIN_SECONDS: How long a client reads from the primary after writing (default: 5)
+"""
+
+import os
+from http.cookies import SimpleCookie
+from app.services.database import ReadRouting, reset_read_routing, route_reads
+
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "5"))
+PIN_COOKIE = "db_primary"
+
+
+def _has_pin(headers: list) -> bool:
+    for name, value in headers:
+        if name == b"cookie" and PIN_COOKIE.encode() in value:
+            cookie = SimpleCookie()
+            cookie.load(value.decode("latin-1"))
+            if PIN_COOKIE in cookie:
+                return True
+    return False
+
+
+class ReadYourWritesMiddleware:
+    """Pure ASGI middleware routing a client's reads to the primary after it writes."""
+
+    def __init__(self, app, pin_seconds: int = REPLICA_PIN_SECONDS):
+        self.app = app
+        self.set_cookie = (
+            f"{PIN_COOKIE}=1; Max-Age={pin_seconds}; Path=/; HttpOnly; SameSite=Lax"
+        ).encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        routing = ReadRouting(pinned=_has_pin(scope["headers"]))
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and routing.wrote:
+                message = {
+                    **message,
+                    "headers": [*message.get("headers", []), (b"set-cookie", self.set_cookie)],
+                }
+            await send(message)
+
+        token = route_reads(routing)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            reset_read_routing(token)
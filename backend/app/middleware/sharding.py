@@ -0,0 +1,153 @@
+"""Session-affinity middleware routing session requests to their owner worker."""
+
+import re
+from starlette.responses import JSONResponse, RedirectResponse
+from app.services.metrics import registry
+from app.services.sharding import ShardMap, shards
+
+shard_requests_total = registry.counter(
+    "shard_requests_total",
+    "Session requests by sharding outcome",
+    ["outcome"],
+)
+
+# Set on forwarded requests so the owner serves them even if rings disagree
+FORWARDED_HEADER = b"x-shard-forwarded"
+
+SESSION_PATH = re.compile(r"^/api/v1/sessions/([^/]+)")
+# Collection routes under the sessions prefix that are not session IDs
+NON_SESSION_SEGMENTS = {"bulk"}
+
+HOP_BY_HOP_HEADERS = {
+    b"connection", b"keep-alive", b"proxy-authenticate", b"proxy-authorization",
+    b"te", b"trailer", b"transfer-encoding", b"upgrade", b"host",
+}
+
+
+class ShardingMiddleware:
+    """Pure ASGI middleware sending session requests to the worker owning the session.
+
+    Requests for sessions owned by another worker are proxied to it, or
+    answered with a 307 redirect when ``SHARD_MODE=redirect`` (only useful
+    when ``SHARD_NODES`` are public URLs). Everything else (session
+    creation, execution, health, static files) is served locally. The
+    proxy's HTTP client is closed at lifespan shutdown.
+    """
+
+    def __init__(self, app, shard_map: ShardMap | None = None, transport=None):
+        self.app = app
+        self.shards = shard_map or shards
+        self.transport = transport
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            import httpx
+
+            # No read timeout: event streams stay open indefinitely
+            self._client = httpx.AsyncClient(
+                transport=self.transport, timeout=httpx.Timeout(10.0, read=None)
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the proxy's HTTP client, if one was opened."""
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.app(scope, receive, self._closing_on_shutdown(send))
+            return
+        if scope["type"] != "http" or not self.shards.enabled or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        match = SESSION_PATH.match(scope["path"])
+        if (
+            match is None
+            or match.group(1) in NON_SESSION_SEGMENTS
+            or self.shards.is_local(match.group(1))
+        ):
+            await self.app(scope, receive, send)
+            return
+        if any(name == FORWARDED_HEADER for name, _ in scope["headers"]):
+            shard_requests_total.inc(outcome="misrouted")
+            await self.app(scope, receive, send)
+            return
+
+        owner = self.shards.owner(match.group(1))
+        target = owner + scope.get("root_path", "") + scope["path"]
+        if scope["query_string"]:
+            target += "?" + scope["query_string"].decode("latin-1")
+
+        if self.shards.mode == "redirect":
+            shard_requests_total.inc(outcome="redirected")
+            await RedirectResponse(target, status_code=307)(scope, receive, send)
+            return
+
+        shard_requests_total.inc(outcome="forwarded")
+        await self._forward(scope, receive, send, target)
+
+    def _closing_on_shutdown(self, send):
+        """Wrap the lifespan ``send`` to close the client once the app has shut down."""
+
+        async def wrapped(message):
+            if message["type"].startswith("lifespan.shutdown."):
+                await self.aclose()
+            await send(message)
+
+        return wrapped
+
+    async def _forward(self, scope, receive, send, target: str) -> None:
+        """Proxy the request to the owner and stream its response back."""
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        headers = [(k, v) for k, v in scope["headers"] if k not in HOP_BY_HOP_HEADERS]
+        headers.append((FORWARDED_HEADER, b"1"))
+        if scope.get("client"):
+            # Otherwise the owner sees every forwarded client as this worker
+            forwarded_for = [v for k, v in headers if k == b"x-forwarded-for"]
+            forwarded_for.append(scope["client"][0].encode("latin-1"))
+            headers = [(k, v) for k, v in headers if k != b"x-forwarded-for"]
+            headers.append((b"x-forwarded-for", b", ".join(forwarded_for)))
+        client = self._get_client()
+        try:
+            request = client.build_request(scope["method"], target, headers=headers, content=body)
+            response = await client.send(request, stream=True)
+        except Exception:
+            await JSONResponse(
+                {
+                    "detail": {
+                        "error": "SHARD_UNAVAILABLE",
+                        "message": "The worker owning this session is unreachable",
+                        "statusCode": 502,
+                    }
+                },
+                status_code=502,
+            )(scope, receive, send)
+            return
+
+        try:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": response.status_code,
+                    "headers": [
+                        (k, v)
+                        for k, v in response.headers.raw
+                        if k.lower() not in HOP_BY_HOP_HEADERS
+                    ],
+                }
+            )
+            async for chunk in response.aiter_raw():
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await response.aclose()
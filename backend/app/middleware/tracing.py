@@ -0,0 +1,88 @@
+"""HTTP request tracing middleware and traced route class."""
+
+import inspect
+from functools import wraps
+from fastapi.routing import APIRoute
+from app.middleware.metrics import route_label
+from app.services.tracing import tracer, SPAN_KIND_SERVER, STATUS_ERROR
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware opening a root span per HTTP request.
+
+    Continues incoming W3C ``traceparent`` headers and echoes the request's
+    own ``traceparent`` on sampled responses so clients can correlate.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope["headers"]:
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        method = scope["method"]
+        with tracer.start_trace(
+            method,
+            traceparent,
+            {"http.request.method": method, "url.path": scope["path"]},
+            kind=SPAN_KIND_SERVER,
+        ) as span:
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start" and span.recording:
+                    status_code = message["status"]
+                    span.set_attribute("http.response.status_code", status_code)
+                    if status_code >= 500:
+                        span.status = STATUS_ERROR
+                    headers = list(message.get("headers", []))
+                    headers.append((b"traceparent", span.traceparent.encode("latin-1")))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                if span.recording:
+                    route = route_label(scope)
+                    span.name = f"{method} {route}"
+                    span.set_attribute("http.route", route)
+
+
+def _traced_endpoint(endpoint):
+    """Wrap a route endpoint in a ``handler`` span.
+
+    The difference between the request span and this span is the time
+    FastAPI spends parsing/validating the request and serializing the response.
+    """
+    name = f"handler {endpoint.__name__}"
+
+    if inspect.iscoroutinefunction(endpoint):
+
+        @wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            with tracer.start_span(name):
+                return await endpoint(*args, **kwargs)
+
+        return async_wrapper
+
+    @wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        with tracer.start_span(name):
+            return endpoint(*args, **kwargs)
+
+    return wrapper
+
+
+class TracedRoute(APIRoute):
+    """APIRoute whose endpoint runs inside its own span."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _traced_endpoint(endpoint), **kwargs)
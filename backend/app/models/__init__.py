@@ -2,6 +2,7 @@ from .schema import (
     User,
     Session,
     ExecutionResult,
+    ExecutionTelemetry,
     Error,
     Language,
     SessionStatus,
@@ -10,12 +11,26 @@ from .schema import (
     JoinSessionRequest,
     ExecuteCodeRequest,
     UsersResponse,
+    CursorPosition,
+    Selection,
+    Presence,
+    PresenceUpdateRequest,
+    PresenceResponse,
+    Revision,
+    RevisionsResponse,
+    RevisionCode,
+    ExecutionRecord,
+    BulkCreateSessionsRequest,
+    BulkCreateSessionsResponse,
+    SessionSummary,
+    SessionsPage,
 )
 
 __all__ = [
     "User",
     "Session",
     "ExecutionResult",
+    "ExecutionTelemetry",
     "Error",
     "Language",
     "SessionStatus",
@@ -24,4 +39,17 @@ __all__ = [
     "JoinSessionRequest",
     "ExecuteCodeRequest",
     "UsersResponse",
+    "CursorPosition",
+    "Selection",
+    "Presence",
+    "PresenceUpdateRequest",
+    "PresenceResponse",
+    "Revision",
+    "RevisionsResponse",
+    "RevisionCode",
+    "ExecutionRecord",
+    "BulkCreateSessionsRequest",
+    "BulkCreateSessionsResponse",
+    "SessionSummary",
+    "SessionsPage",
 ]
@@ -1,6 +1,6 @@
 """SQLAlchemy ORM models."""
 
-from sqlalchemy import Column, String, Integer, Text, DateTime, ForeignKey, Table
+from sqlalchemy import Column, String, Integer, Float, Text, DateTime, ForeignKey, Table, LargeBinary, Index
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
 
@@ -28,6 +28,12 @@ class SessionModel(Base):
     
     # Relationships
     users = relationship('UserModel', secondary=session_users, backref='sessions')
+
+    # Keyset pagination of the session listing on (updated_at, id), with and without a status filter
+    __table_args__ = (
+        Index('ix_sessions_updated_at_id', 'updated_at', 'id'),
+        Index('ix_sessions_status_updated_at_id', 'status', 'updated_at', 'id'),
+    )
     
     def to_dict(self):
         """Convert to dictionary for Pydantic model."""
@@ -58,3 +64,51 @@ class UserModel(Base):
             'color': self.color,
             'joinedAt': self.joined_at,
         }
+
+
+class RevisionModel(Base):
+    """SQLAlchemy model for code revisions (compressed keyframes and deltas)."""
+    __tablename__ = 'session_revisions'
+
+    session_id = Column(String(10), ForeignKey('sessions.id', ondelete='CASCADE'), primary_key=True)
+    revision = Column(Integer, primary_key=True)
+    kind = Column(String(10), nullable=False)  # 'keyframe' or 'delta'
+    data = Column(LargeBinary, nullable=False)  # zlib-compressed code or delta
+    length = Column(Integer, nullable=False)  # Length of the code at this revision
+    created_at = Column(Integer, nullable=False)  # Unix timestamp in milliseconds
+
+    def to_dict(self):
+        """Convert to dictionary for Pydantic model."""
+        return {
+            'revision': self.revision,
+            'createdAt': self.created_at,
+            'length': self.length,
+            'keyframe': self.kind == 'keyframe',
+        }
+
+
+class ExecutionModel(Base):
+    """SQLAlchemy model for code executions run in a session."""
+    __tablename__ = 'session_executions'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    session_id = Column(String(10), ForeignKey('sessions.id', ondelete='CASCADE'), nullable=False, index=True)
+    revision = Column(Integer, nullable=True)  # Latest code revision when the run started
+    language = Column(String(20), nullable=False)
+    output = Column(Text, nullable=False)
+    error = Column(Text, nullable=True)
+    execution_time = Column(Float, nullable=False)  # Milliseconds
+    created_at = Column(Integer, nullable=False)  # Unix timestamp in milliseconds
+
+    def to_dict(self):
+        """Convert to dictionary for Pydantic model."""
+        return {
+            'revision': self.revision,
+            'language': self.language,
+            'createdAt': self.created_at,
+            'result': {
+                'output': self.output,
+                'error': self.error,
+                'executionTime': self.execution_time,
+            },
+        }
@@ -51,6 +51,50 @@ class Session(BaseModel):
     status: SessionStatus = Field(
         default="active", description="Current session status"
     )
+    lastExecution: "ExecutionRecord | None" = Field(
+        None, description="Most recent run recorded in the session, shared by all participants"
+    )
+
+
+class ExecutionTelemetry(BaseModel):
+    """Per-phase timing and resource usage of a code execution."""
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "queueWaitTime": 0.1,
+                "spawnTime": 38.2,
+                "compileTime": None,
+                "runTime": 1.4,
+                "peakRssBytes": 44040192,
+                "cpuUserTime": 31.0,
+                "cpuSystemTime": 9.0,
+                "outputBytes": 14,
+            }
+        }
+    )
+
+    queueWaitTime: float = Field(
+        0, description="Time spent waiting for a free execution slot in milliseconds"
+    )
+    spawnTime: float | None = Field(
+        None, description="Process spawn and runtime warm-up time in milliseconds"
+    )
+    compileTime: float | None = Field(
+        None, description="Time spent compiling the user's code in milliseconds"
+    )
+    runTime: float | None = Field(
+        None, description="Time spent running the user's code in milliseconds"
+    )
+    peakRssBytes: int | None = Field(
+        None, description="Peak resident set size of the execution process in bytes"
+    )
+    cpuUserTime: float | None = Field(None, description="User CPU time in milliseconds")
+    cpuSystemTime: float | None = Field(None, description="System CPU time in milliseconds")
+    outputBytes: int = Field(0, description="Size of the captured output in bytes")
+    kernelStarted: bool | None = Field(
+        None, description="For persistent runs, whether this run started the session's kernel"
+    )
 
 
 class ExecutionResult(BaseModel):
@@ -67,6 +111,17 @@ class ExecutionResult(BaseModel):
     executionTime: float = Field(
         ..., description="Time taken to execute code in milliseconds"
     )
+    telemetry: ExecutionTelemetry | None = Field(
+        None, description="Per-phase timing and resource usage breakdown"
+    )
+    outputTruncated: bool = Field(
+        False, description="Whether output holds only the beginning of the run's output"
+    )
+    outputId: str | None = Field(
+        None,
+        description="ID for paging through the full output with "
+        "GET /api/v1/execute/outputs/{outputId} when it was truncated",
+    )
 
 
 class Error(BaseModel):
@@ -97,6 +152,14 @@ class CreateSessionRequest(BaseModel):
     )
 
 
+class BulkCreateSessionsRequest(BaseModel):
+    """Request to create many sessions in one transaction."""
+
+    sessions: list[CreateSessionRequest] = Field(
+        ..., min_length=1, max_length=500, description="Sessions to create"
+    )
+
+
 class UpdateSessionRequest(BaseModel):
     """Request to update a session."""
 
@@ -127,9 +190,139 @@ class ExecuteCodeRequest(BaseModel):
     code: str = Field(..., description="Code to execute")
     language: Language = Field(..., description="Programming language")
     timeout: int = Field(default=30000, description="Execution timeout in milliseconds")
+    sessionId: str | None = Field(
+        None, description="Session to record the run in (for history and replay)"
+    )
+    persistent: bool = Field(
+        False,
+        description="Run Python in the session's kernel, keeping variables and "
+        "functions from earlier persistent runs (requires sessionId)",
+    )
+
+
+class CursorPosition(BaseModel):
+    """Position in the editor (zero-based)."""
+
+    line: int = Field(..., ge=0, description="Line number")
+    column: int = Field(..., ge=0, description="Column number")
+
+
+class Selection(BaseModel):
+    """Selected range in the editor."""
+
+    anchor: CursorPosition = Field(..., description="Where the selection started")
+    head: CursorPosition = Field(..., description="Where the selection ends (the cursor)")
+
+
+class Presence(BaseModel):
+    """Ephemeral presence of a user in a session."""
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "userId": "user1234",
+                "cursor": {"line": 3, "column": 14},
+                "selection": None,
+                "lastSeen": 1702000000000,
+            }
+        }
+    )
+
+    userId: str = Field(..., description="User identifier")
+    cursor: CursorPosition | None = Field(None, description="Current cursor position")
+    selection: Selection | None = Field(None, description="Current selection")
+    lastSeen: int = Field(..., description="Unix timestamp of the last heartbeat")
+
+
+class PresenceUpdateRequest(BaseModel):
+    """Heartbeat with the user's current cursor and selection."""
+
+    cursor: CursorPosition | None = Field(None, description="Current cursor position")
+    selection: Selection | None = Field(None, description="Current selection")
+
+
+class PresenceResponse(BaseModel):
+    """Response containing presence of all active users."""
+
+    presence: list[Presence] = Field(..., description="Presence of active users")
 
 
 class UsersResponse(BaseModel):
     """Response containing list of users."""
 
     users: list[User] = Field(..., description="List of users in the session")
+
+
+class Revision(BaseModel):
+    """A recorded version of a session's code."""
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "revision": 3,
+                "createdAt": 1702000000000,
+                "length": 42,
+                "keyframe": False,
+            }
+        }
+    )
+
+    revision: int = Field(..., description="Revision number (increasing per session)")
+    createdAt: int = Field(..., description="Unix timestamp when the revision was recorded")
+    length: int = Field(..., description="Length of the code at this revision")
+    keyframe: bool = Field(..., description="Whether the full code is stored (vs. a delta)")
+
+
+class RevisionsResponse(BaseModel):
+    """Response containing a session's revisions, oldest first."""
+
+    revisions: list[Revision] = Field(..., description="Recorded revisions")
+
+
+class RevisionCode(BaseModel):
+    """The code of a session at a given revision."""
+
+    revision: int = Field(..., description="Revision number")
+    createdAt: int = Field(..., description="Unix timestamp when the revision was recorded")
+    code: str = Field(..., description="Code at this revision")
+
+
+class ExecutionRecord(BaseModel):
+    """A code execution recorded in a session."""
+
+    revision: int | None = Field(
+        None,
+        description="Code revision that ran: the session's latest when the run started, "
+        "or None if the code run differed from it",
+    )
+    language: Language = Field(..., description="Programming language")
+    createdAt: int = Field(..., description="Unix timestamp when the run finished")
+    result: ExecutionResult = Field(..., description="Result of the run")
+
+
+Session.model_rebuild()
+
+
+class BulkCreateSessionsResponse(BaseModel):
+    """Response containing the sessions created in bulk."""
+
+    sessions: list[Session] = Field(..., description="Created sessions, in request order")
+
+
+class SessionSummary(BaseModel):
+    """Session metadata returned by the listing (without code and users)."""
+
+    id: str = Field(..., description="Unique session identifier (10 chars)")
+    language: Language = Field(..., description="Programming language")
+    status: SessionStatus = Field(..., description="Current session status")
+    createdAt: int = Field(..., description="Unix timestamp when session was created")
+    updatedAt: int = Field(..., description="Unix timestamp of the last update")
+
+
+class SessionsPage(BaseModel):
+    """One page of the session listing."""
+
+    sessions: list[SessionSummary] = Field(..., description="Sessions ordered by (updatedAt, id)")
+    nextCursor: str | None = Field(
+        None, description="Cursor for the next page, or null on the last page"
+    )
@@ -0,0 +1,27 @@
+"""Custom response classes."""
+
+import json
+from typing import Any
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson when it is installed.
+
+    Routes return already-shaped data (e.g. ``Session.model_dump()``) in this
+    response so FastAPI skips ``response_model`` re-validation and
+    ``jsonable_encoder``; large code strings are then encoded exactly once.
+    Falls back to the stdlib encoder without orjson.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content)
+        return json.dumps(
+            content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
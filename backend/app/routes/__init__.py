@@ -4,5 +4,18 @@ from .sessions import router as sessions_router
 from .users import router as users_router
 from .execution import router as execution_router
 from .health import router as health_router
+from .metrics import router as metrics_router
+from .presence import router as presence_router
+from .events import router as events_router
+from .revisions import router as revisions_router
 
-__all__ = ["sessions_router", "users_router", "execution_router", "health_router"]
+__all__ = [
+    "sessions_router",
+    "users_router",
+    "execution_router",
+    "health_router",
+    "metrics_router",
+    "presence_router",
+    "events_router",
+    "revisions_router",
+]
@@ -0,0 +1,77 @@
+"""Session event stream routes (Server-Sent Events)."""
+
+import asyncio
+import json
+from typing import AsyncIterator, Awaitable, Callable
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from app.middleware import TracedRoute
+from app.services import db
+from app.services.events import bus, Subscription
+from app.services.presence import presence
+
+router = APIRouter(prefix="/api/v1/sessions", tags=["Events"], route_class=TracedRoute)
+
+# Seconds between keep-alive comments on an idle stream
+KEEPALIVE_INTERVAL = 15
+
+
+def format_event(event_type: str, data) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event_type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+async def event_stream(
+    session_id: str,
+    subscription: Subscription,
+    is_disconnected: Callable[[], Awaitable[bool]],
+) -> AsyncIterator[str]:
+    """Yield a presence snapshot, then every event published for the session."""
+    try:
+        yield format_event(
+            "presence.snapshot", [p.model_dump() for p in presence.snapshot(session_id)]
+        )
+        while not await is_disconnected():
+            try:
+                event = await asyncio.wait_for(subscription.get(), KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if event.get("truncated"):
+                # Payload was too large for the bus; clients refetch over HTTP
+                yield format_event(event["type"], {"truncated": True})
+            else:
+                yield format_event(event["type"], event["data"])
+    finally:
+        subscription.close()
+
+
+@router.get("/{session_id}/events")
+async def session_events(session_id: str, request: Request):
+    """Stream session events (edits, joins/leaves, presence) as Server-Sent Events.
+
+    Args:
+        session_id: The session ID
+
+    Returns:
+        A ``text/event-stream`` response
+
+    Raises:
+        HTTPException: If session not found
+    """
+    if not db.session_exists(session_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                "error": "SESSION_NOT_FOUND",
+                "message": f"Session with ID '{session_id}' not found",
+                "statusCode": 404,
+            },
+        )
+
+    subscription = bus.subscribe(session_id)
+    return StreamingResponse(
+        event_stream(session_id, subscription, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
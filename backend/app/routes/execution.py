@@ -1,30 +1,85 @@
 """Code execution routes."""
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, Response, status
+from time import time
+from app.dependencies import enforce_rate_limit, rate_limited
+from app.middleware import TracedRoute
 from app.models import ExecuteCodeRequest, ExecutionResult
-from app.services import CodeExecutionService
+from app.services.events import bus
+from app.services.kernels import KernelLimitReached, kernels
+from app.services.outputs import outputs
+from app.services.ratelimit import RateLimit
+from app.services import CodeExecutionService, db
 
-router = APIRouter(prefix="/api/v1", tags=["Code Execution"])
+router = APIRouter(prefix="/api/v1", tags=["Code Execution"], route_class=TracedRoute)
 
+# Runs recorded in one session, shared by everyone in it
+EXECUTE_SESSION_LIMIT = RateLimit.from_env("execute_session", RateLimit(rate=1, burst=5))
 
-@router.post("/execute", response_model=ExecutionResult)
+# Largest byte range returned by one output request
+MAX_OUTPUT_RANGE = 1024 * 1024
+
+
+@router.post(
+    "/execute",
+    response_model=ExecutionResult,
+    dependencies=[rate_limited("execute_client", rate=2, burst=10)],
+)
 async def execute_code(request: ExecuteCodeRequest):
     """Execute code in the specified language.
 
     Args:
-        request: Code execution request with code, language, and optional timeout
+        request: Code execution request with code, language, optional timeout,
+            optional session ID to record the run in and whether to run in the
+            session's persistent kernel
 
     Returns:
         ExecutionResult with output, error, and execution time
 
     Raises:
-        HTTPException: If execution fails or times out
+        HTTPException: If execution fails, times out or is rate limited, or
+            no kernel is available for a persistent run
     """
+    if request.persistent:
+        if request.language != "python":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={
+                    "error": "KERNEL_UNSUPPORTED",
+                    "message": "Persistent runs are only supported for Python",
+                    "statusCode": 400,
+                },
+            )
+        if not request.sessionId or not db.session_exists(request.sessionId):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail={
+                    "error": "SESSION_NOT_FOUND",
+                    "message": "Persistent runs need the ID of an existing session",
+                    "statusCode": 404,
+                },
+            )
+    if request.sessionId:
+        enforce_rate_limit("execute_session", request.sessionId, EXECUTE_SESSION_LIMIT)
+        # Taken before running: edits made during the run are not what ran
+        revision = db.revision_of_code(request.sessionId, request.code)
     try:
         result = await CodeExecutionService.execute(
-            code=request.code, language=request.language, timeout=request.timeout
+            code=request.code,
+            language=request.language,
+            timeout=request.timeout,
+            kernel=request.sessionId if request.persistent else None,
+        )
+    except KernelLimitReached as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={
+                "error": "KERNEL_LIMIT_REACHED",
+                "message": str(e),
+                "statusCode": 503,
+            },
+            headers={"Retry-After": "30"},
         )
-        return result
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -34,3 +89,97 @@ async def execute_code(request: ExecuteCodeRequest):
                 "statusCode": 500,
             },
         )
+    if request.sessionId:
+        record = db.record_execution(
+            request.sessionId, request.language, result, int(time() * 1000), revision
+        )
+        if record is not None:
+            # Everyone in the session sees the run without running it again
+            bus.publish(request.sessionId, "execution.completed", record.model_dump())
+    return result
+
+
+@router.delete("/execute/kernels/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_kernel(session_id: str):
+    """Stop a session's persistent kernel, discarding its variables.
+
+    Args:
+        session_id: Session whose kernel to stop
+
+    Raises:
+        HTTPException: If the session has no running kernel
+    """
+    try:
+        stopped = kernels.stop(session_id)
+    except ValueError:
+        stopped = False
+    if not stopped:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                "error": "KERNEL_NOT_FOUND",
+                "message": f"Session '{session_id}' has no running kernel",
+                "statusCode": 404,
+            },
+        )
+
+
+@router.get(
+    "/execute/outputs/{output_id}",
+    response_class=Response,
+    responses={200: {"content": {"text/plain": {}}}, 206: {"content": {"text/plain": {}}}},
+)
+async def get_output(
+    output_id: str,
+    offset: int = Query(0, ge=0, description="First byte to return"),
+    length: int = Query(64 * 1024, ge=1, le=MAX_OUTPUT_RANGE, description="Bytes to return"),
+):
+    """Page through the full output of a run whose result was truncated.
+
+    Ranges are byte offsets, so a chunk may start or end inside a multi-byte
+    character; clients joining chunks should decode the joined bytes.
+
+    Args:
+        output_id: outputId from the ExecutionResult
+        offset: First byte to return
+        length: Number of bytes to return
+
+    Returns:
+        The bytes as text/plain with a Content-Range header; 206 if more
+        output remains outside the range
+
+    Raises:
+        HTTPException: If the output does not exist (or expired), or the
+            offset is past its end
+    """
+    chunk = outputs.read(output_id, offset, length)
+    if chunk is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                "error": "OUTPUT_NOT_FOUND",
+                "message": f"Output '{output_id}' not found or expired",
+                "statusCode": 404,
+            },
+        )
+    data, total = chunk
+    if offset and offset >= total:
+        raise HTTPException(
+            status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE,
+            detail={
+                "error": "RANGE_NOT_SATISFIABLE",
+                "message": f"Offset {offset} is past the end of the output ({total} bytes)",
+                "statusCode": 416,
+            },
+            headers={"Content-Range": f"bytes */{total}"},
+        )
+    partial = len(data) < total
+    headers = {"Accept-Ranges": "bytes"}
+    if data:
+        headers["Content-Range"] = f"bytes {offset}-{offset + len(data) - 1}/{total}"
+    return Response(
+        content=data,
+        media_type="text/plain; charset=utf-8",
+        status_code=status.HTTP_206_PARTIAL_CONTENT if partial else status.HTTP_200_OK,
+        headers=headers,
+    )
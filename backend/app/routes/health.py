@@ -1,16 +1,26 @@
 """Health check routes."""
 
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from datetime import datetime, timezone
+from app.middleware import TracedRoute
+from app.services import db
 
-router = APIRouter(prefix="/api/v1", tags=["Health"])
+router = APIRouter(prefix="/api/v1", tags=["Health"], route_class=TracedRoute)
 
 
 @router.get("/health")
 async def health_check():
     """Health check endpoint.
 
+    Reports 503 until the database tables are prepared, so load balancers
+    hold traffic back from a worker that started while the database was
+    unreachable.
+
     Returns:
         Health status with timestamp
     """
-    return {"status": "ok", "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")}
+    timestamp = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    if not db.ready:
+        return JSONResponse({"status": "starting", "timestamp": timestamp}, status_code=503)
+    return {"status": "ok", "timestamp": timestamp}
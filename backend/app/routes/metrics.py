@@ -0,0 +1,21 @@
+"""Metrics routes."""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.middleware import TracedRoute
+from app.services.metrics import registry
+
+router = APIRouter(tags=["Metrics"], route_class=TracedRoute)
+
+# Content type of the Prometheus text exposition format
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Expose collected metrics in Prometheus text format.
+
+    Returns:
+        All registered metrics rendered for scraping
+    """
+    return PlainTextResponse(registry.render(), media_type=METRICS_CONTENT_TYPE)
@@ -0,0 +1,61 @@
+"""Presence routes."""
+
+from fastapi import APIRouter, HTTPException, status
+from app.middleware import TracedRoute
+from app.models import Presence, PresenceUpdateRequest, PresenceResponse
+from app.services import db
+from app.services.presence import presence
+
+router = APIRouter(prefix="/api/v1/sessions", tags=["Presence"], route_class=TracedRoute)
+
+
+@router.put("/{session_id}/presence/{user_id}", response_model=Presence)
+async def update_presence(
+    session_id: str, user_id: str, request: PresenceUpdateRequest | None = None
+):
+    """Heartbeat a user's presence with their cursor and selection.
+
+    Only the first heartbeat of a user checks the database for membership;
+    later heartbeats are served from memory.
+
+    Args:
+        session_id: The session ID
+        user_id: The user ID
+        request: Optional cursor and selection
+
+    Returns:
+        The user's presence
+
+    Raises:
+        HTTPException: If the user is not in the session
+    """
+    if not presence.is_tracked(session_id, user_id):
+        if not db.get_user_in_session(session_id, user_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail={
+                    "error": "USER_NOT_FOUND",
+                    "message": f"User with ID '{user_id}' not found in session",
+                    "statusCode": 404,
+                },
+            )
+
+    return presence.heartbeat(
+        session_id,
+        user_id,
+        cursor=request.cursor if request else None,
+        selection=request.selection if request else None,
+    )
+
+
+@router.get("/{session_id}/presence", response_model=PresenceResponse)
+async def get_presence(session_id: str):
+    """Get presence of all users that are heartbeating.
+
+    Args:
+        session_id: The session ID
+
+    Returns:
+        Presence of active users
+    """
+    return PresenceResponse(presence=presence.snapshot(session_id))
@@ -0,0 +1,133 @@
+"""Code history and replay routes."""
+
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Iterator
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from app.middleware import TracedRoute
+from app.models import RevisionCode, RevisionsResponse
+from app.routes.events import format_event
+from app.services import db
+from app.services.replay import TimelineEvent, timeline
+
+router = APIRouter(prefix="/api/v1/sessions", tags=["Revisions"], route_class=TracedRoute)
+
+
+@router.get("/{session_id}/revisions", response_model=RevisionsResponse)
+async def list_revisions(session_id: str):
+    """List the recorded code revisions of a session, oldest first.
+
+    Args:
+        session_id: The session ID
+
+    Returns:
+        The session's revisions
+
+    Raises:
+        HTTPException: If session not found
+    """
+    if not db.session_exists(session_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                "error": "SESSION_NOT_FOUND",
+                "message": f"Session with ID '{session_id}' not found",
+                "statusCode": 404,
+            },
+        )
+    return RevisionsResponse(revisions=db.list_revisions(session_id))
+
+
+@router.get("/{session_id}/revisions/{revision}", response_model=RevisionCode)
+async def get_revision(session_id: str, revision: int):
+    """Get the code of a session at a given revision.
+
+    Args:
+        session_id: The session ID
+        revision: The revision number
+
+    Returns:
+        The code at that revision
+
+    Raises:
+        HTTPException: If the revision is not stored (never recorded or pruned)
+    """
+    result = db.get_revision_code(session_id, revision)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                "error": "REVISION_NOT_FOUND",
+                "message": f"Revision {revision} of session '{session_id}' not found",
+                "statusCode": 404,
+            },
+        )
+    created_at, code = result
+    return RevisionCode(revision=revision, createdAt=created_at, code=code)
+
+
+async def replay_stream(
+    events: Iterator[TimelineEvent],
+    speed: float,
+    max_gap: int,
+    is_disconnected: Callable[[], Awaitable[bool]],
+) -> AsyncIterator[str]:
+    """Pace timeline events as Server-Sent Events, ending with ``replay.end``.
+
+    Args:
+        speed: Playback speed multiplier (0 streams without pauses)
+        max_gap: Longest pause between events in recorded milliseconds
+    """
+    previous = None
+    for created_at, event_type, data in events:
+        if await is_disconnected():
+            return
+        if previous is not None and speed > 0:
+            pause = min(max(created_at - previous, 0), max_gap) / speed / 1000
+            if pause > 0:
+                await asyncio.sleep(pause)
+        previous = created_at
+        yield format_event(event_type, data)
+    yield format_event("replay.end", {})
+
+
+@router.get("/{session_id}/replay")
+async def replay_session(
+    session_id: str,
+    request: Request,
+    speed: float = Query(1.0, ge=0, description="Playback speed multiplier (0 = no pauses)"),
+    max_gap: int = Query(
+        2000, ge=0, description="Cap on idle pauses between events, in recorded milliseconds"
+    ),
+):
+    """Stream the session's edits and runs in recorded order as Server-Sent Events.
+
+    Emits ``edit`` events (revision, createdAt, code), ``execution`` events
+    (recorded runs) and a final ``replay.end``. The timeline is read from
+    storage page by page while streaming.
+
+    Args:
+        session_id: The session ID
+        speed: Playback speed multiplier
+        max_gap: Longest pause between events in recorded milliseconds
+
+    Returns:
+        A ``text/event-stream`` response
+
+    Raises:
+        HTTPException: If session not found
+    """
+    if not db.session_exists(session_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                "error": "SESSION_NOT_FOUND",
+                "message": f"Session with ID '{session_id}' not found",
+                "statusCode": 404,
+            },
+        )
+    return StreamingResponse(
+        replay_stream(timeline(db, session_id), speed, max_gap, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,16 +1,27 @@
 """Sessions routes."""
 
-from fastapi import APIRouter, HTTPException, status
+import base64
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from time import time
 from nanoid import generate
+from app.dependencies import rate_limited, require_admin, unit_of_work
+from app.middleware import TracedRoute
+from app.responses import FastJSONResponse
 from app.models import (
     Session,
+    SessionStatus,
+    SessionsPage,
     CreateSessionRequest,
+    BulkCreateSessionsRequest,
+    BulkCreateSessionsResponse,
     UpdateSessionRequest,
 )
 from app.services import db
+from app.services.database import UnitOfWork
+from app.services.events import bus
 
-router = APIRouter(prefix="/api/v1/sessions", tags=["Sessions"])
+router = APIRouter(prefix="/api/v1/sessions", tags=["Sessions"], route_class=TracedRoute)
 
 # Session ID generation: 10 characters
 SESSION_ID_SIZE = 10
@@ -28,6 +39,9 @@ USER_COLORS = [
     "#f97316",
 ]
 MAX_USERS_PER_SESSION = 10
+# Page size limits of the session listing
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
 
 
 def get_random_color(existing_colors: list[str]) -> str:
@@ -49,14 +63,107 @@ def generate_user_name() -> str:
     return f"{random.choice(adjectives)}{random.choice(nouns)}"
 
 
-@router.post("", response_model=Session, status_code=status.HTTP_201_CREATED)
+def encode_cursor(updated_at: int, session_id: str) -> str:
+    """Opaque keyset cursor for the row after which the next page starts."""
+    raw = json.dumps([updated_at, session_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[int, str]:
+    """Decode a cursor from ``encode_cursor``.
+
+    Raises:
+        HTTPException: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        updated_at, session_id = json.loads(raw)
+        if not isinstance(updated_at, int) or not isinstance(session_id, str):
+            raise ValueError
+        return updated_at, session_id
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "error": "INVALID_CURSOR",
+                "message": "Malformed pagination cursor",
+                "statusCode": 400,
+            },
+        )
+
+
+def generate_session_id() -> str:
+    """Generate a new session ID."""
+    return generate(alphabet="0123456789abcdefghijklmnopqrstuvwxyz", size=SESSION_ID_SIZE)
+
+
+@router.get("", response_model=SessionsPage, dependencies=[Depends(require_admin)])
+async def list_sessions(
+    status_filter: SessionStatus | None = Query(None, alias="status"),
+    updated_after: int | None = Query(None, description="Only sessions updated after this timestamp"),
+    cursor: str | None = Query(None, description="nextCursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """List sessions ordered by last update, oldest first (admin only).
+
+    Requires the ``ADMIN_API_TOKEN`` bearer token, since the listing
+    reveals every session ID. Uses keyset pagination on ``(updated_at, id)``, so every page costs one
+    index range scan regardless of how deep the client has paged.
+
+    Args:
+        status_filter: Only sessions with this status
+        updated_after: Only sessions updated after this timestamp
+        cursor: Cursor returned as ``nextCursor`` by the previous page
+        limit: Page size
+
+    Returns:
+        A page of session summaries and the cursor of the next page
+    """
+    after = decode_cursor(cursor) if cursor else None
+    sessions = db.list_sessions(status_filter, updated_after, after, limit)
+    next_cursor = None
+    if len(sessions) == limit:
+        next_cursor = encode_cursor(sessions[-1].updatedAt, sessions[-1].id)
+    return SessionsPage(sessions=sessions, nextCursor=next_cursor)
+
+
+@router.post(
+    "/bulk",
+    response_model=BulkCreateSessionsResponse,
+    response_class=FastJSONResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_sessions(request: BulkCreateSessionsRequest):
+    """Create many sessions in one transaction (e.g. for a hiring day).
+
+    Args:
+        request: The sessions to create
+
+    Returns:
+        The created sessions, in request order
+    """
+    created_at = int(time() * 1000)
+    sessions = db.create_sessions(
+        [(generate_session_id(), s.language, s.code) for s in request.sessions], created_at
+    )
+    return FastJSONResponse(
+        {"sessions": [s.model_dump() for s in sessions]}, status_code=status.HTTP_201_CREATED
+    )
+
+
+@router.post(
+    "",
+    response_model=Session,
+    response_class=FastJSONResponse,
+    status_code=status.HTTP_201_CREATED,
+)
 async def create_session(request: CreateSessionRequest | None = None):
     """Create a new interview session.
 
     Returns:
         The newly created session
     """
-    session_id = generate(alphabet="0123456789abcdefghijklmnopqrstuvwxyz", size=SESSION_ID_SIZE)
+    session_id = generate_session_id()
     created_at = int(time() * 1000)
 
     default_code = '// Start coding here\nconsole.log("Hello, World!");'
@@ -64,10 +171,10 @@ async def create_session(request: CreateSessionRequest | None = None):
     language = request.language if request else "javascript"
 
     session = db.create_session(session_id, language, code, created_at)
-    return session
+    return FastJSONResponse(session.model_dump(), status_code=status.HTTP_201_CREATED)
 
 
-@router.get("/{session_id}", response_model=Session)
+@router.get("/{session_id}", response_model=Session, response_class=FastJSONResponse)
 async def get_session(session_id: str):
     """Get session details.
 
@@ -90,22 +197,33 @@ async def get_session(session_id: str):
                 "statusCode": 404,
             },
         )
-    return session
+    return FastJSONResponse(session.model_dump())
 
 
-@router.patch("/{session_id}", response_model=Session)
-async def update_session(session_id: str, request: UpdateSessionRequest):
+@router.patch(
+    "/{session_id}",
+    response_model=Session,
+    response_class=FastJSONResponse,
+    dependencies=[
+        rate_limited("session_update_client", rate=20, burst=40),
+        rate_limited("session_update", rate=10, burst=30, per="session"),
+    ],
+)
+async def update_session(
+    session_id: str, request: UpdateSessionRequest, unit: UnitOfWork = Depends(unit_of_work)
+):
     """Update a session.
 
     Args:
         session_id: The session ID
         request: Update request with optional code, language, and status
+        unit: The request's database unit of work
 
     Returns:
         The updated session
 
     Raises:
-        HTTPException: If session not found or invalid request
+        HTTPException: If session not found, invalid request or rate limited
     """
     session = db.get_session_by_id(session_id)
     if not session:
@@ -135,7 +253,10 @@ async def update_session(session_id: str, request: UpdateSessionRequest):
         language=request.language,
         status=request.status,
     )
-    return updated_session
+    unit.commit()
+    body = updated_session.model_dump()
+    bus.publish(session_id, "session.updated", body)
+    return FastJSONResponse(body)
 
 
 @router.delete("/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -157,3 +278,5 @@ async def delete_session(session_id: str):
                 "statusCode": 404,
             },
         )
+    # Subscribers drop the session's presence on every worker
+    bus.publish(session_id, "session.deleted", None)
@@ -1,12 +1,17 @@
 """Users routes."""
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status
 from time import time
 from nanoid import generate
+from app.dependencies import unit_of_work
+from app.middleware import TracedRoute
 from app.models import User, JoinSessionRequest, UsersResponse
 from app.services import db
+from app.services.database import UnitOfWork
+from app.services.events import bus
+from app.services.presence import presence
 
-router = APIRouter(prefix="/api/v1/sessions", tags=["Users"])
+router = APIRouter(prefix="/api/v1/sessions", tags=["Users"], route_class=TracedRoute)
 
 USER_ID_SIZE = 8
 USER_COLORS = [
@@ -44,12 +49,17 @@ def generate_user_name() -> str:
 
 
 @router.post("/{session_id}/users", response_model=User, status_code=status.HTTP_201_CREATED)
-async def join_session(session_id: str, request: JoinSessionRequest | None = None):
+async def join_session(
+    session_id: str,
+    request: JoinSessionRequest | None = None,
+    unit: UnitOfWork = Depends(unit_of_work),
+):
     """Join a session.
 
     Args:
         session_id: The session ID
         request: Optional join request with user name
+        unit: The request's database unit of work
 
     Returns:
         The created user object
@@ -91,6 +101,10 @@ async def join_session(session_id: str, request: JoinSessionRequest | None = Non
     user = User(id=user_id, name=user_name, color=color, joinedAt=joined_at)
 
     db.add_user(session_id, user)
+    unit.commit()
+    bus.publish(session_id, "user.joined", user.model_dump())
+    # Start tracking presence right away so a user who never heartbeats expires
+    presence.heartbeat(session_id, user_id)
     return user
 
 
@@ -121,12 +135,13 @@ async def get_session_users(session_id: str):
 
 
 @router.delete("/{session_id}/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def leave_session(session_id: str, user_id: str):
+async def leave_session(session_id: str, user_id: str, unit: UnitOfWork = Depends(unit_of_work)):
     """Leave a session.
 
     Args:
         session_id: The session ID
         user_id: The user ID
+        unit: The request's database unit of work
 
     Raises:
         HTTPException: If session or user not found
@@ -154,3 +169,6 @@ async def leave_session(session_id: str, user_id: str):
         )
 
     db.remove_user(session_id, user_id)
+    unit.commit()
+    bus.publish(session_id, "user.left", {"userId": user_id})
+    presence.leave(session_id, user_id)
@@ -0,0 +1,361 @@
+"""Production launcher: preload the app once, then fork workers sharing it.
+
+The master process imports the app, creates tables and warms lazily built
+state before forking, so every worker starts from the same copy-on-write
+memory instead of importing everything again. Workers serve one shared
+listening socket with uvicorn (uvloop and httptools when installed).
+
+Usage (from ``backend/``)::
+
+    python -m app.server --workers 4 --port 8000
+
+Signals (to the master):
+    TERM, INT: Stop accepting connections, let in-flight requests finish, exit
+    HUP: Rolling restart; each worker is replaced once its successor is ready
+
+Workers share nothing in memory, so more than one needs the shared event
+bus (``EVENT_BUS=postgres``); otherwise presence and event streams are per
+worker. Without the shared bus the default is a single worker. Rate limits
+stay per worker unless ``RATE_LIMIT_BACKEND=database``, which makes them
+exact at the cost of a database write per limited request.
+
+Configuration:
+    WEB_CONCURRENCY: Worker processes (default: usable CPUs, i.e. the
+        affinity mask capped by the cgroup CPU quota; 1 with the in-process
+        event bus)
+    WORKER_GRACEFUL_TIMEOUT: Seconds a stopping worker may spend finishing
+        in-flight requests (default: 60, above the 30 s execution limit)
+    MAX_CONCURRENT_EXECUTIONS: Per worker; defaults to CPUs / workers here
+    FORWARDED_ALLOW_IPS: Comma-separated proxy addresses (or ``*``) whose
+        ``X-Forwarded-For`` sets the client address; per-client rate limits
+        key on it (default: 127.0.0.1,::1)
+"""
+
+import argparse
+import gc
+import logging
+import math
+import os
+import select
+import signal
+import socket
+import sys
+import time
+from typing import Optional
+import uvicorn
+
+# Log through uvicorn's configured logger, like its own process managers
+logger = logging.getLogger("uvicorn.error")
+
+# How long a new worker may take to run its lifespan startup
+WORKER_READY_TIMEOUT = 30.0
+
+
+class _Server(uvicorn.Server):
+    """uvicorn server that tells the master when it is accepting connections."""
+
+    def __init__(self, config: uvicorn.Config, ready_fd: int):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+
+    async def startup(self, sockets=None) -> None:
+        await super().startup(sockets=sockets)
+        if self.started:
+            os.write(self.ready_fd, b"1")
+            os.close(self.ready_fd)
+
+
+def _cgroup_cpu_quota(root: str = "/sys/fs/cgroup") -> Optional[float]:
+    """CPUs allowed by the container's cgroup quota (v2 ``cpu.max`` or v1 CFS), if limited."""
+    try:
+        with open(os.path.join(root, "cpu.max")) as f:
+            quota, period = f.read().split()[:2]
+    except (OSError, ValueError):
+        try:
+            with open(os.path.join(root, "cpu", "cpu.cfs_quota_us")) as f:
+                quota = f.read().strip()
+            with open(os.path.join(root, "cpu", "cpu.cfs_period_us")) as f:
+                period = f.read().strip()
+        except OSError:
+            return None
+    if quota in ("max", "-1"):
+        return None
+    try:
+        return int(quota) / int(period)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def available_cpus(cgroup_root: str = "/sys/fs/cgroup") -> int:
+    """CPUs this process may run on: its affinity mask, capped by the cgroup quota.
+
+    ``os.cpu_count()`` reports the host's cores, so a container limited to
+    half a CPU on a 64-core host would otherwise fork 64 workers.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on macOS
+        cpus = os.cpu_count() or 1
+    quota = _cgroup_cpu_quota(cgroup_root)
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+def worker_count(requested: Optional[int], cpus: int) -> int:
+    """Workers to fork: as requested, else one per CPU when workers can share state.
+
+    Warns when several workers would keep events and presence in
+    per-worker memory, and notes that in-memory rate limits apply per worker.
+    """
+    shared_bus = os.getenv("EVENT_BUS", "inprocess").lower() != "inprocess"
+    workers = max(1, requested or (cpus if shared_bus else 1))
+    if workers > 1 and not shared_bus:
+        logger.warning(
+            "%d workers with EVENT_BUS=inprocess: events and presence stay within each "
+            "worker, so heartbeats seen by one worker do not keep users joined on another. "
+            "Set EVENT_BUS=postgres",
+            workers,
+        )
+    if workers > 1 and os.getenv("RATE_LIMIT_BACKEND", "memory").lower() == "memory":
+        logger.info(
+            "%d workers with RATE_LIMIT_BACKEND=memory: limits apply per worker, so a "
+            "client may get up to %d times each limit. RATE_LIMIT_BACKEND=database "
+            "shares them, adding a database write per limited request",
+            workers,
+            workers,
+        )
+    return workers
+
+
+def preload():
+    """Import and build the app, prepare the database and warm caches.
+
+    Runs once in the master before forking. Database connections opened here
+    are discarded so workers never share a socket to the database. If the
+    database is unreachable the workers start anyway and retry creating
+    the tables themselves.
+
+    Returns:
+        The ASGI application shared by every worker
+    """
+    from app import create_app
+    from app.services import db
+
+    application = create_app()
+    try:
+        db.init()
+    except Exception:
+        logger.warning("Database unreachable; workers will retry preparing it", exc_info=True)
+    db.dispose()
+    application.openapi()  # Built on first request otherwise, once per worker
+    # Keep preloaded objects out of the collector so it does not touch (and
+    # copy) their pages in every worker
+    gc.collect()
+    gc.freeze()
+    return application
+
+
+class Supervisor:
+    """Forks workers from the preloaded app and keeps their number constant."""
+
+    def __init__(self, config: uvicorn.Config, sock: socket.socket, workers: int, graceful_timeout: float):
+        self.config = config
+        self.sock = sock
+        self.size = workers
+        self.graceful_timeout = graceful_timeout
+        self.workers: dict[int, int] = {}  # pid -> readiness pipe
+        self.retiring: dict[int, float] = {}  # pid -> kill deadline
+        self._signals: list[int] = []
+
+    def spawn(self) -> int:
+        """Fork a worker and return its pid."""
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            for fd in self.workers.values():
+                os.close(fd)
+            code = 0
+            try:
+                for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                    signal.signal(sig, signal.SIG_DFL)
+                _Server(self.config, write_fd).run(sockets=[self.sock])
+            except SystemExit as exc:
+                code = exc.code if isinstance(exc.code, int) else 1
+            except BaseException:
+                logger.exception("Worker %d crashed", os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        os.close(write_fd)
+        self.workers[pid] = read_fd
+        logger.info("Booted worker %d", pid)
+        return pid
+
+    def wait_ready(self, pid: int, timeout: float = WORKER_READY_TIMEOUT) -> bool:
+        """Wait until a worker has run its startup and accepts connections.
+
+        Keeps supervising meanwhile: exited workers are reaped (and
+        replaced), and a pending TERM or INT ends the wait early.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            fd = self.workers.get(pid)
+            if fd is None or self.stopping:
+                return False
+            remaining = deadline - time.monotonic()
+            readable, _, _ = select.select([fd], [], [], max(0.0, min(0.2, remaining)))
+            if readable:
+                return os.read(fd, 1) == b"1"
+            if remaining <= 0:
+                return False
+            self.reap()
+
+    @property
+    def stopping(self) -> bool:
+        """Whether a TERM or INT is waiting to be handled."""
+        return any(signum != signal.SIGHUP for signum in self._signals)
+
+    def retire(self, pid: int) -> None:
+        """Ask a worker to stop accepting and finish its in-flight requests."""
+        fd = self.workers.pop(pid, None)
+        if fd is None:
+            return  # Already exited and reaped
+        os.close(fd)
+        self.retiring[pid] = time.monotonic() + self.graceful_timeout + 5
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def rolling_restart(self) -> None:
+        """Replace workers one at a time, never dropping below full capacity."""
+        for old in list(self.workers):
+            new = self.spawn()
+            if not self.wait_ready(new):
+                if self.stopping:
+                    logger.info("Rolling restart interrupted by shutdown")
+                else:
+                    logger.error("Worker %d did not become ready; keeping the old workers", new)
+                self.retire(new)
+                return
+            self.retire(old)
+        logger.info("Rolling restart complete")
+
+    def reap(self) -> None:
+        """Collect exited workers, replacing any that died unexpectedly."""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if self.retiring.pop(pid, None) is not None:
+                continue
+            fd = self.workers.pop(pid, None)
+            if fd is not None:
+                os.close(fd)
+                logger.warning(
+                    "Worker %d exited with code %d; replacing it", pid, os.waitstatus_to_exitcode(status)
+                )
+                # During a rolling restart the booting successor may already fill the slot
+                if len(self.workers) < self.size:
+                    self.spawn()
+        # Workers that outlive the graceful timeout are killed
+        now = time.monotonic()
+        for pid, deadline in self.retiring.items():
+            if now > deadline:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def run(self) -> int:
+        """Start the workers and supervise them until told to stop."""
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(sig, lambda signum, frame: self._signals.append(signum))
+        for _ in range(self.size):
+            self.spawn()
+
+        while True:
+            self.reap()
+            while self._signals:
+                signum = self._signals.pop(0)
+                if signum == signal.SIGHUP:
+                    logger.info("Received SIGHUP, restarting workers")
+                    self.rolling_restart()
+                else:
+                    return self.stop()
+            time.sleep(0.2)
+
+    def stop(self) -> int:
+        """Stop every worker gracefully and wait for them to exit."""
+        logger.info("Shutting down, waiting for in-flight requests")
+        for pid in list(self.workers):
+            self.retire(pid)
+        while self.retiring:
+            self.reap()
+            time.sleep(0.1)
+        return 0
+
+
+def bind(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Open the listening socket every worker accepts from."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the API with preloaded, forked workers.")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "0")) or None,
+                        help="Worker processes (default: usable CPUs, or 1 with the in-process event bus)")
+    parser.add_argument("--graceful-timeout", type=float,
+                        default=float(os.getenv("WORKER_GRACEFUL_TIMEOUT", "60")))
+    parser.add_argument("--forwarded-allow-ips",
+                        default=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1,::1"),
+                        help="Proxies trusted to set X-Forwarded-For (comma-separated, or '*')")
+    parser.add_argument("--log-level", default="info")
+    return parser.parse_args(argv)
+
+
+def make_config(application, args: argparse.Namespace) -> uvicorn.Config:
+    """uvicorn configuration shared by every worker."""
+    return uvicorn.Config(
+        application,
+        loop="auto",  # uvloop if installed
+        http="auto",  # httptools if installed
+        lifespan="on",
+        log_level=args.log_level,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        # Behind a proxy every request comes from the proxy; trust its
+        # X-Forwarded-For so client addresses (and rate limits) are per user
+        proxy_headers=True,
+        forwarded_allow_ips=args.forwarded_allow_ips,
+    )
+
+
+def main(argv=None) -> Optional[int]:
+    args = parse_args(argv)
+    cpus = available_cpus()
+    workers = worker_count(args.workers, cpus)
+    # Execution slots are per worker; split the cores between workers
+    os.environ.setdefault("MAX_CONCURRENT_EXECUTIONS", str(max(1, cpus // workers)))
+
+    sock = bind(args.host, args.port)
+    config = make_config(preload(), args)
+    config.load()  # Resolve protocol classes before forking
+    logger.info("Listening on %s:%d with %d workers", args.host, args.port, workers)
+    return Supervisor(config, sock, workers, args.graceful_timeout).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
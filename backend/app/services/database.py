@@ -1,35 +1,813 @@
-"""SQLAlchemy database service."""
+"""SQLAlchemy database service.
 
+SQLite databases get a production profile on every connection: WAL
+journaling (readers never block the writer or each other),
+``synchronous=NORMAL`` (durable at checkpoints rather than every commit,
+safe in WAL mode), a memory-mapped read path and a busy timeout. SQLite
+allows one writer at a time. Write transactions start with ``BEGIN
+IMMEDIATE``, taking the write lock before their first read, so writers in
+every process (waiting up to the busy timeout) run one after another and
+each sees the previous one's commit. Within a process, writers first queue
+up in arrival order for a writer slot instead of all polling the file lock.
+
+Read-only methods run on a read replica when ``DATABASE_REPLICA_URLS`` is
+set, taking healthy replicas in turn. A replica that fails is skipped (its
+reads retried on the primary) and probed again, from a background thread,
+after ``REPLICA_RETRY_INTERVAL`` seconds. A request that is pinned (see
+``ReadRouting``) or has written reads from the primary, so clients see
+their own writes despite replication lag.
+
+Hot-path lookups are module-level statements with bound parameters, so
+each call reuses SQLAlchemy's compiled SQL instead of building and
+compiling a query; on Postgres psycopg also prepares statements run
+``DATABASE_PREPARE_THRESHOLD`` times on the server.
+
+Configuration:
+    DATABASE_PREPARE_THRESHOLD: Runs of a query before psycopg prepares it
+        server-side; ``none`` disables (e.g. behind PgBouncer in transaction
+        pooling mode) (default: 1)
+    DATABASE_REPLICA_URLS: Comma-separated read replica URLs (default: none)
+    REPLICA_RETRY_INTERVAL: Seconds before a failed replica is probed again (default: 10)
+    SESSION_OUTPUT_PREVIEW: Characters of output and error a session's
+        ``lastExecution`` carries (default: 4096)
+    SQLITE_BUSY_TIMEOUT: Milliseconds a write waits for the database (default: 5000)
+    SQLITE_MMAP_SIZE: Bytes of the database file read through mmap (default: 256 MiB)
+    SQLITE_CACHE_SIZE: Page cache per connection in KiB (default: 16384)
+"""
+
+import itertools
+import logging
 import os
-from typing import Optional
-from sqlalchemy import create_engine
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Iterable, Iterator, Optional
+from sqlalchemy import bindparam, create_engine, delete, event, func, select, text, tuple_
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import InterfaceError, OperationalError
 from sqlalchemy.orm import sessionmaker, Session as SQLSession
-from app.models.orm import Base, SessionModel, UserModel
-from app.models import Session, User, Language, SessionStatus
+from app.models.orm import Base, ExecutionModel, RevisionModel, SessionModel, UserModel, session_users
+from app.models import (
+    ExecutionRecord,
+    ExecutionResult,
+    Revision,
+    Session,
+    SessionSummary,
+    User,
+    Language,
+    SessionStatus,
+)
+from app.services import revisions
+from app.services.metrics import registry
+from app.services.tracing import tracer, current_span, SPAN_KIND_CLIENT, STATUS_ERROR
+
+logger = logging.getLogger(__name__)
+
+db_operation_seconds = registry.histogram(
+    "db_operation_seconds",
+    "Duration of Database service methods",
+    ["method"],
+)
+db_queries_total = registry.counter(
+    "db_queries_total",
+    "SQL statements executed, by Database service method",
+    ["method"],
+)
+
+db_writer_wait_seconds = registry.histogram(
+    "db_writer_wait_seconds",
+    "Time SQLite write transactions waited for the writer slot",
+)
+
+db_reads_total = registry.counter(
+    "db_reads_total",
+    "Read-only Database method calls, by where they ran (primary, replica, fallback)",
+    ["target"],
+)
+
+REPLICA_RETRY_INTERVAL = float(os.getenv("REPLICA_RETRY_INTERVAL", "10"))
+_prepare_threshold = os.getenv("DATABASE_PREPARE_THRESHOLD", "1")
+DATABASE_PREPARE_THRESHOLD = None if _prepare_threshold.lower() == "none" else int(_prepare_threshold)
+SESSION_OUTPUT_PREVIEW = int(os.getenv("SESSION_OUTPUT_PREVIEW", "4096"))
+
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "16384"))
+
+# Statements that make a SQLite transaction a write transaction
+_WRITE_STATEMENTS = frozenset({"INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER"})
+
+# Hot-path statements, built once: executing them only binds parameters to
+# SQL compiled on first use (and prepared server-side by psycopg)
+_SESSION_BY_ID = select(SessionModel).where(SessionModel.id == bindparam("session_id"))
+# Locks the row on Postgres until commit (SQLite relies on BEGIN IMMEDIATE)
+_SESSION_FOR_UPDATE = _SESSION_BY_ID.with_for_update()
+_SESSION_ID_EXISTS = select(SessionModel.id).where(SessionModel.id == bindparam("session_id"))
+_USER_BY_ID = select(UserModel).where(UserModel.id == bindparam("user_id"))
+_USER_IN_SESSION = (
+    select(UserModel)
+    .join(session_users, session_users.c.user_id == UserModel.id)
+    .where(
+        session_users.c.session_id == bindparam("session_id"),
+        UserModel.id == bindparam("user_id"),
+    )
+)
+# A session's last run travels with every poll and update, so only the start
+# of its output is read; the full result goes out once as execution.completed
+_EXECUTION_PREVIEW = (
+    ExecutionModel.revision,
+    ExecutionModel.language,
+    ExecutionModel.created_at,
+    func.substr(ExecutionModel.output, 1, SESSION_OUTPUT_PREVIEW).label("output"),
+    func.length(ExecutionModel.output).label("output_length"),
+    func.substr(ExecutionModel.error, 1, SESSION_OUTPUT_PREVIEW).label("error"),
+    ExecutionModel.execution_time,
+)
+_LAST_EXECUTION = (
+    select(*_EXECUTION_PREVIEW)
+    .where(ExecutionModel.session_id == bindparam("session_id"))
+    .order_by(ExecutionModel.id.desc())
+    .limit(1)
+)
+# The session and its last run in one round trip
+_SESSION_WITH_LAST_EXECUTION = (
+    select(SessionModel, *_EXECUTION_PREVIEW)
+    .outerjoin(
+        ExecutionModel,
+        ExecutionModel.id
+        == select(func.max(ExecutionModel.id))
+        .where(ExecutionModel.session_id == SessionModel.id)
+        .correlate(SessionModel)
+        .scalar_subquery(),
+    )
+    .where(SessionModel.id == bindparam("session_id"))
+)
+
+# Name of the Database method currently running, used to attribute SQL statements
+_current_method: ContextVar[str] = ContextVar("db_current_method", default="<none>")
+# Whether the running Database method holds the SQLite writer slot
+_holding_writer: ContextVar[bool] = ContextVar("db_holding_writer", default=False)
+# Replica serving the running read-only method, if any
+_current_replica: ContextVar[Optional["Replica"]] = ContextVar("db_current_replica", default=None)
+
+
+class ReadRouting:
+    """Where a request's reads may go; shared with threads the request runs code in.
+
+    Attributes:
+        pinned: Read from the primary (the client wrote moments ago)
+        wrote: Set once the request has written; its later reads and the
+            client's next ones go to the primary
+    """
+
+    def __init__(self, pinned: bool = False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+_read_routing: ContextVar[Optional[ReadRouting]] = ContextVar("db_read_routing", default=None)
+# Unit of work the running request's Database calls share, if any
+_current_unit: ContextVar[Optional["UnitOfWork"]] = ContextVar("db_current_unit", default=None)
+
+
+def route_reads(routing: ReadRouting):
+    """Use ``routing`` for the Database calls of the current request.
+
+    Returns:
+        Token for ``ContextVar.reset`` when the request ends
+    """
+    return _read_routing.set(routing)
+
+
+def reset_read_routing(token) -> None:
+    """Undo ``route_reads``."""
+    _read_routing.reset(token)
+
+
+def instrumented(method):
+    """Record duration and SQL statement count of a Database method."""
+    name = method.__name__
+    span_name = f"Database.{name}"
+
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        token = _current_method.set(name)
+        start = time.perf_counter()
+        try:
+            with tracer.start_span(span_name):
+                return method(*args, **kwargs)
+        finally:
+            db_operation_seconds.observe(time.perf_counter() - start, method=name)
+            _current_method.reset(token)
+
+    return wrapper
+
+
+def writes(method):
+    """Run a Database method that writes on the primary, marking the request as a writer.
+
+    With SQLite the method holds the process's writer slot and its
+    transaction starts with ``BEGIN IMMEDIATE``, so its reads and writes
+    form one step no writer in any process interleaves with (e.g.
+    numbering the next revision).
+    """
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        routing = _read_routing.get()
+        if routing is not None:
+            routing.wrote = True
+        unit = _current_unit.get()
+        if unit is not None and unit.database is self:
+            return unit.run_write(method, self, *args, **kwargs)
+        if not self.serialize_writes or _holding_writer.get():
+            return method(self, *args, **kwargs)
+        self._writer.acquire(SQLITE_BUSY_TIMEOUT / 1000)
+        token = _holding_writer.set(True)
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            _holding_writer.reset(token)
+            self._writer.release()
+
+    return wrapper
+
+
+def reads(method):
+    """Run a read-only Database method on a replica, if one is configured and usable.
+
+    Reads stay on the primary when the request reads its own writes. If the
+    replica fails, it is taken out of rotation and the read runs on the
+    primary instead.
+    """
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        routing = _read_routing.get()
+        unit = _current_unit.get()
+        replica = None
+        if (
+            self.replicas
+            and not (routing is not None and (routing.pinned or routing.wrote))
+            and not (unit is not None and unit.connection is not None)
+        ):
+            replica = self._choose_replica()
+        if replica is None:
+            db_reads_total.inc(target="primary")
+            return method(self, *args, **kwargs)
+        token = _current_replica.set(replica)
+        try:
+            result = method(self, *args, **kwargs)
+            db_reads_total.inc(target="replica")
+            return result
+        except (OperationalError, InterfaceError):
+            logger.warning("Read replica %s failed; reading from the primary", replica, exc_info=True)
+            replica.mark_down()
+        finally:
+            _current_replica.reset(token)
+        db_reads_total.inc(target="fallback")
+        return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """SQLAlchemy hook counting statements and opening a span per statement."""
+    db_queries_total.inc(method=_current_method.get())
+    if current_span().recording:
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+        span = tracer.start_span(
+            f"db.{operation}",
+            {"db.system": conn.dialect.name, "db.statement": statement[:500]},
+            kind=SPAN_KIND_CLIENT,
+        )
+        conn.info.setdefault("trace_spans", []).append(span)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """SQLAlchemy hook closing the statement span."""
+    spans = conn.info.get("trace_spans")
+    if spans:
+        spans.pop().end()
+
+
+def _handle_error(exception_context):
+    """SQLAlchemy hook closing the statement span of a failed statement."""
+    conn = exception_context.connection
+    spans = conn.info.get("trace_spans") if conn is not None else None
+    if spans:
+        span = spans.pop()
+        span.set_error(exception_context.original_exception)
+        span.end()
+
+
+def _before_commit(session):
+    """SQLAlchemy session hook opening a span around COMMIT."""
+    if current_span().recording:
+        session.info["commit_span"] = tracer.start_span("db.commit")
+
+
+def _after_commit(session):
+    """SQLAlchemy session hook closing the COMMIT span."""
+    span = session.info.pop("commit_span", None)
+    if span is not None:
+        span.end()
+
+
+def _after_rollback(session, previous_transaction):
+    """SQLAlchemy session hook closing a COMMIT span that failed."""
+    span = session.info.pop("commit_span", None)
+    if span is not None:
+        span.status = STATUS_ERROR
+        span.end()
+
+
+def _sqlite_on_connect(dbapi_connection, connection_record):
+    """Apply the SQLite production profile to a new connection."""
+    # Leave BEGIN to _sqlite_begin (pysqlite would defer it to the first write)
+    dbapi_connection.isolation_level = None
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+def _sqlite_begin(conn):
+    """SQLAlchemy hook opening SQLite transactions: IMMEDIATE for writers.
+
+    Transactions of ``@writes`` methods and units of work take the write
+    lock up front, waiting up to the busy timeout for writers in other
+    processes. Anything else starts a deferred transaction, which in WAL
+    mode never blocks on writers.
+    """
+    unit = _current_unit.get()
+    immediate = _holding_writer.get() or (unit is not None and unit.connection is conn)
+    conn.exec_driver_sql("BEGIN IMMEDIATE" if immediate else "BEGIN")
+
+
+class WriterQueue:
+    """One writer slot per process, handed to waiting writers in arrival order (FIFO).
+
+    Only orders this process's threads; ``BEGIN IMMEDIATE`` and the busy
+    timeout order writers across processes.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._waiters: deque = deque()
+        self._held = False
+
+    def acquire(self, timeout: float) -> None:
+        """Wait for the slot.
+
+        Raises:
+            TimeoutError: If the slot did not come free within ``timeout`` seconds
+        """
+        ticket = object()
+        start = time.perf_counter()
+        with self._cond:
+            self._waiters.append(ticket)
+            granted = self._cond.wait_for(
+                lambda: not self._held and self._waiters[0] is ticket, timeout
+            )
+            if not granted:
+                self._waiters.remove(ticket)
+                self._cond.notify_all()
+                raise TimeoutError(f"No SQLite writer slot within {timeout:g} s")
+            self._waiters.popleft()
+            self._held = True
+        db_writer_wait_seconds.observe(time.perf_counter() - start)
+
+    def release(self) -> None:
+        """Hand the slot to the next writer."""
+        with self._cond:
+            self._held = False
+            self._cond.notify_all()
+
+
+def _make_engine(database_url: str):
+    """Create an instrumented engine and session factory (does not connect).
+
+    Returns:
+        Tuple of (engine, session factory)
+    """
+    sqlite = database_url.startswith("sqlite")
+    if sqlite:
+        connect_args = {"check_same_thread": False}
+    elif database_url.startswith("postgresql+psycopg"):
+        connect_args = {"prepare_threshold": DATABASE_PREPARE_THRESHOLD}
+    else:
+        connect_args = {}
+    engine = create_engine(database_url, connect_args=connect_args, echo=False)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    if sqlite:
+        event.listen(engine, "connect", _sqlite_on_connect)
+        event.listen(engine, "begin", _sqlite_begin)
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    event.listen(session_factory, "before_commit", _before_commit)
+    event.listen(session_factory, "after_commit", _after_commit)
+    event.listen(session_factory, "after_soft_rollback", _after_rollback)
+    return engine, session_factory
+
+
+class UnitOfWork:
+    """One connection and transaction shared by the Database calls of a request.
+
+    The connection is checked out by the first call that needs the primary
+    and the transaction commits once, in ``commit()``. Methods' own commits
+    only flush (their sessions join the transaction in
+    ``rollback_only`` mode). With SQLite the unit takes the writer slot
+    and the write lock (``BEGIN IMMEDIATE``) when it checks out its
+    connection and keeps them until it commits, so commit before awaiting
+    anything else.
+    """
+
+    def __init__(self, database: "Database"):
+        self.database = database
+        self.connection = None
+        self._transaction = None
+        self._holds_writer = False
+
+    def session(self) -> SQLSession:
+        """Open a session on the unit's connection, checking one out if needed."""
+        if self.connection is None:
+            self._acquire_writer()
+            self.connection = self.database.engine.connect()
+            self._transaction = self.connection.begin()
+        return self.database.SessionLocal(
+            bind=self.connection, join_transaction_mode="rollback_only"
+        )
+
+    def run_write(self, method, *args, **kwargs):
+        """Run a ``@writes`` method in the unit, rolling the unit back if it fails."""
+        self._acquire_writer()
+        token = _holding_writer.set(True)
+        try:
+            return method(*args, **kwargs)
+        except BaseException:
+            self.rollback()
+            raise
+        finally:
+            _holding_writer.reset(token)
+
+    def _acquire_writer(self) -> None:
+        """Take the SQLite writer slot for the rest of the unit (no-op elsewhere)."""
+        if self.database.serialize_writes and not self._holds_writer:
+            self.database._writer.acquire(SQLITE_BUSY_TIMEOUT / 1000)
+            self._holds_writer = True
+
+    def commit(self) -> None:
+        """Commit the unit's writes and return its connection (later calls start anew)."""
+        try:
+            if self._transaction is not None and self._transaction.is_active:
+                self._transaction.commit()
+        finally:
+            self._end()
+
+    def rollback(self) -> None:
+        """Discard the unit's writes and return its connection."""
+        try:
+            if self._transaction is not None and self._transaction.is_active:
+                self._transaction.rollback()
+        finally:
+            self._end()
+
+    def _end(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+        self.connection = None
+        self._transaction = None
+        if self._holds_writer:
+            self._holds_writer = False
+            self.database._writer.release()
+
+
+class Replica:
+    """A read replica, connected on first use and skipped for a while after failing."""
+
+    def __init__(self, database_url: str):
+        self.database_url = _driver_url(database_url)
+        self.down_until = 0.0  # time.monotonic() deadline; 0 while healthy
+        self._engine = None
+        self._session_factory = None
+        self._lock = threading.Lock()
+        self._prober: Optional[threading.Thread] = None
+
+    def __repr__(self) -> str:
+        return f"Replica({make_url(self.database_url).render_as_string(hide_password=True)!r})"
+
+    @property
+    def engine(self):
+        """The replica's engine, created (without connecting) on first access."""
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine, self._session_factory = _make_engine(self.database_url)
+        return self._engine
+
+    def session(self) -> SQLSession:
+        """Open a session on the replica."""
+        self.engine
+        return self._session_factory()
+
+    def mark_down(self) -> None:
+        """Take the replica out of rotation for ``REPLICA_RETRY_INTERVAL`` seconds."""
+        self.down_until = time.monotonic() + REPLICA_RETRY_INTERVAL
+
+    def probe(self) -> bool:
+        """Check that the replica answers a trivial query."""
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return True
+        except (OperationalError, InterfaceError):
+            return False
+
+    def probe_in_background(self) -> None:
+        """Start a probe unless one is running; it puts the replica back if it answers.
+
+        Requests never wait on the probe (a blackholed replica can take the
+        full connect timeout to fail); they read the primary meanwhile.
+        """
+        with self._lock:
+            if self._prober is not None and self._prober.is_alive():
+                return
+            self._prober = threading.Thread(
+                target=self._probe_and_mark, name="replica-probe", daemon=True
+            )
+            self._prober.start()
+
+    def _probe_and_mark(self) -> None:
+        """Put the replica back in rotation if it answers, else wait another interval."""
+        if self.probe():
+            logger.info("Read replica %s is back", self)
+            self.down_until = 0.0
+        else:
+            self.mark_down()
+
+
+def _driver_url(database_url: str) -> str:
+    """Use the psycopg (v3) driver we depend on for plain ``postgresql://`` URLs."""
+    for prefix in ("postgresql://", "postgres://"):
+        if database_url.startswith(prefix):
+            return "postgresql+psycopg://" + database_url[len(prefix):]
+    return database_url
+
+
+def _user_from_model(user: UserModel) -> User:
+    """Build a User from a row without re-validating data we wrote ourselves."""
+    return User.model_construct(**user.to_dict())
+
+
+def _session_from_model(
+    session: SessionModel, last_execution: Optional[ExecutionRecord] = None
+) -> Session:
+    """Build a Session from a row without re-validating data we wrote ourselves."""
+    data = session.to_dict()
+    data["users"] = [User.model_construct(**u) for u in data["users"]]
+    return Session.model_construct(**data, lastExecution=last_execution)
+
+
+def _execution_preview(row) -> Optional[ExecutionRecord]:
+    """Build a run from ``_EXECUTION_PREVIEW`` columns, marking cut-off output."""
+    if row is None or row.created_at is None:
+        return None
+    return ExecutionRecord.model_construct(
+        revision=row.revision,
+        language=row.language,
+        createdAt=row.created_at,
+        result=ExecutionResult.model_construct(
+            output=row.output,
+            error=row.error,
+            executionTime=row.execution_time,
+            outputTruncated=row.output_length > len(row.output),
+        ),
+    )
+
+
+def _last_execution(db: SQLSession, session_id: str) -> Optional[ExecutionRecord]:
+    """Preview of the most recent run recorded in a session."""
+    return _execution_preview(db.execute(_LAST_EXECUTION, {"session_id": session_id}).first())
+
+
+def _initial_revision(session_id: str, code: str, created_at: int) -> RevisionModel:
+    """First revision (a keyframe) of a new session."""
+    return RevisionModel(
+        session_id=session_id,
+        revision=1,
+        kind=revisions.KEYFRAME,
+        data=revisions.encode_keyframe(code),
+        length=len(code),
+        created_at=created_at,
+    )
+
+
+def _record_revision(
+    db: SQLSession, session_id: str, base: Optional[str], code: str, created_at: int
+) -> None:
+    """Append a revision inside the caller's transaction, pruning old ones.
+
+    The caller must hold the session's write lock (``_SESSION_FOR_UPDATE``
+    on Postgres, ``BEGIN IMMEDIATE`` on SQLite) so the next number is not
+    taken concurrently.
+
+    Args:
+        base: Code of the previous revision, or None for a session's first revision
+    """
+    latest, last_keyframe, oldest = db.execute(
+        select(
+            func.max(RevisionModel.revision),
+            func.max(RevisionModel.revision).filter(RevisionModel.kind == revisions.KEYFRAME),
+            func.min(RevisionModel.revision),
+        ).where(RevisionModel.session_id == session_id)
+    ).one()
+    number = (latest or 0) + 1
+    if base is None or last_keyframe is None or number - last_keyframe >= revisions.REVISION_KEYFRAME_INTERVAL:
+        kind, data = revisions.KEYFRAME, revisions.encode_keyframe(code)
+    else:
+        kind, data = revisions.DELTA, revisions.encode_delta(base, code)
+    db.add(
+        RevisionModel(
+            session_id=session_id,
+            revision=number,
+            kind=kind,
+            data=data,
+            length=len(code),
+            created_at=created_at,
+        )
+    )
+
+    # Drop the oldest keyframe group once over the limit, so history still starts at a keyframe
+    if oldest is not None and number - oldest + 1 > revisions.REVISION_MAX_PER_SESSION:
+        next_keyframe = db.scalar(
+            select(func.min(RevisionModel.revision)).where(
+                RevisionModel.session_id == session_id,
+                RevisionModel.kind == revisions.KEYFRAME,
+                RevisionModel.revision > oldest,
+            )
+        )
+        if kind == revisions.KEYFRAME and next_keyframe is None:
+            next_keyframe = number
+        if next_keyframe is not None:
+            db.query(RevisionModel).filter(
+                RevisionModel.session_id == session_id,
+                RevisionModel.revision < next_keyframe,
+            ).delete(synchronize_session=False)
 
 
 class Database:
     """SQLAlchemy database service for sessions and users."""
 
-    def __init__(self, database_url: str = "postgresql://postgres:postgres@db:5432/code_interview"):
-        """Initialize database connection.
-        
+    def __init__(
+        self,
+        database_url: str = "postgresql://postgres:postgres@db:5432/code_interview",
+        replica_urls: Iterable[str] = (),
+    ):
+        """Configure the database without connecting.
+
+        The engine is created on first use and tables by ``init()``, which
+        the app lifespan calls, so importing the app never touches the
+        database.
+
         Args:
-            database_url: Database connection string (default: SQLite file)
+            database_url: Database connection string (the primary)
+            replica_urls: Connection strings of read replicas of the primary
         """
-        connect_args = {"check_same_thread": False} if "sqlite" in database_url else {}
-        # For Postgres, prefer using psycopg drivers (psycopg-binary) which provides required lib
-        self.engine = create_engine(database_url, connect_args=connect_args, echo=False)
-        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
-        
-        # Create tables
+        self.database_url = _driver_url(database_url)
+        self.replicas = [Replica(url) for url in replica_urls]
+        self._next_replica = itertools.count()
+        self._engine = None
+        self._session_factory = None
+        self._lock = threading.Lock()
+        self._writer = WriterQueue()
+        self.serialize_writes = self.database_url.startswith("sqlite")
+        self.ready = False  # Set once init() has prepared the tables
+
+    @property
+    def engine(self):
+        """The SQLAlchemy engine, created (without connecting) on first access."""
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._create_engine()
+        return self._engine
+
+    @property
+    def SessionLocal(self) -> sessionmaker:
+        """Session factory bound to the engine."""
+        if self._session_factory is None:
+            self.engine  # Creates the engine and the session factory
+        return self._session_factory
+
+    def _create_engine(self) -> None:
+        engine, session_factory = _make_engine(self.database_url)
+        if self.serialize_writes:
+            event.listen(engine, "before_cursor_execute", self._claim_writer)
+            event.listen(engine, "commit", self._release_writer)
+            event.listen(engine, "rollback", self._release_writer)
+            event.listen(engine.pool, "checkin", self._release_writer_on_checkin)
+        self._session_factory = session_factory
+        self._engine = engine
+
+    def _choose_replica(self) -> Optional[Replica]:
+        """Next usable replica in round-robin order, or None if all are down."""
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._next_replica) % len(self.replicas)]
+            if not replica.down_until:
+                return replica
+            if replica.down_until <= now:
+                replica.probe_in_background()
+        return None
+
+    def _claim_writer(self, conn, cursor, statement, parameters, context, executemany):
+        """Take the writer slot before a transaction's first write (SQLite only).
+
+        Covers writes outside ``@writes`` methods, such as the rate limiter's.
+        """
+        if conn.info.get("writer") or _holding_writer.get():
+            return
+        words = statement.lstrip()[:8].split(None, 1)
+        if not words or words[0].upper() not in _WRITE_STATEMENTS:
+            return
+        self._writer.acquire(SQLITE_BUSY_TIMEOUT / 1000)
+        conn.info["writer"] = True
+
+    def _release_writer(self, conn):
+        """Give up the writer slot when the transaction ends."""
+        if conn.info.pop("writer", False):
+            self._writer.release()
+
+    def _release_writer_on_checkin(self, dbapi_connection, connection_record):
+        """Give up the writer slot of a connection returned without commit or rollback."""
+        if connection_record is not None and connection_record.info.pop("writer", False):
+            self._writer.release()
+
+    def init(self) -> None:
+        """Create missing tables and indexes (idempotent; connects to the database)."""
         Base.metadata.create_all(bind=self.engine)
+        # create_all only indexes new tables; add indexes introduced after a table existed
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(self.engine, checkfirst=True)
+        self.ready = True
+
+    def dispose(self) -> None:
+        """Close pooled connections, e.g. before forking (no-op before first use)."""
+        if self._engine is not None:
+            self._engine.dispose()
 
     def get_session(self) -> SQLSession:
-        """Get a database session."""
+        """Get a database session.
+
+        Inside ``@reads`` methods routed to a replica it is on the replica;
+        inside a unit of work it shares the unit's connection and transaction.
+        """
+        replica = _current_replica.get()
+        if replica is not None:
+            return replica.session()
+        unit = _current_unit.get()
+        if unit is not None and unit.database is self:
+            return unit.session()
         return self.SessionLocal()
 
+    @contextmanager
+    def unit_of_work(self) -> Iterator[UnitOfWork]:
+        """Share one connection and transaction across the Database calls in the block.
+
+        Commits when the block ends (unless ``commit()`` was called already)
+        and rolls back if it raises. Nested blocks join the outer unit.
+        """
+        unit = _current_unit.get()
+        if unit is not None and unit.database is self:
+            yield unit
+            return
+        unit = UnitOfWork(self)
+        token = _current_unit.set(unit)
+        try:
+            yield unit
+        except BaseException:
+            unit.rollback()
+            raise
+        else:
+            unit.commit()
+        finally:
+            _current_unit.reset(token)
+
     # Session operations
+    @instrumented
+    @writes
     def create_session(
         self, session_id: str, language: Language, code: str, created_at: int
     ) -> Session:
@@ -44,23 +822,118 @@ class Database:
                 updated_at=created_at,
             )
             db.add(session)
+            db.add(_initial_revision(session_id, code, created_at))
             db.commit()
             db.refresh(session)
-            return Session(**session.to_dict())
+            return _session_from_model(session)
+        finally:
+            db.close()
+
+    @instrumented
+    @writes
+    def create_sessions(
+        self, sessions: list[tuple[str, Language, str]], created_at: int
+    ) -> list[Session]:
+        """Create many sessions in a single transaction.
+
+        Args:
+            sessions: (session_id, language, code) for each new session
+            created_at: Creation timestamp shared by all sessions
+        """
+        db = self.get_session()
+        try:
+            db.add_all(
+                SessionModel(
+                    id=session_id,
+                    code=code,
+                    language=language,
+                    created_at=created_at,
+                    updated_at=created_at,
+                )
+                for session_id, language, code in sessions
+            )
+            # Flush sessions first so revision rows never precede their parent
+            db.flush()
+            db.add_all(
+                _initial_revision(session_id, code, created_at)
+                for session_id, _, code in sessions
+            )
+            db.commit()
+            return [
+                Session.model_construct(
+                    id=session_id,
+                    code=code,
+                    language=language,
+                    users=[],
+                    createdAt=created_at,
+                    status="active",
+                )
+                for session_id, language, code in sessions
+            ]
         finally:
             db.close()
 
+    @instrumented
+    @reads
+    def list_sessions(
+        self,
+        status: Optional[SessionStatus] = None,
+        updated_after: Optional[int] = None,
+        after: Optional[tuple[int, str]] = None,
+        limit: int = 50,
+    ) -> list[SessionSummary]:
+        """List sessions ordered by (updated_at, id) using keyset pagination.
+
+        Args:
+            status: Only sessions with this status
+            updated_after: Only sessions updated after this timestamp
+            after: (updated_at, id) of the last row of the previous page
+            limit: Maximum number of sessions to return
+        """
+        db = self.get_session()
+        try:
+            query = select(
+                SessionModel.id,
+                SessionModel.language,
+                SessionModel.status,
+                SessionModel.created_at,
+                SessionModel.updated_at,
+            )
+            if status is not None:
+                query = query.where(SessionModel.status == status)
+            if updated_after is not None:
+                query = query.where(SessionModel.updated_at > updated_after)
+            if after is not None:
+                query = query.where(tuple_(SessionModel.updated_at, SessionModel.id) > after)
+            query = query.order_by(SessionModel.updated_at, SessionModel.id).limit(limit)
+            return [
+                SessionSummary.model_construct(
+                    id=row.id,
+                    language=row.language,
+                    status=row.status,
+                    createdAt=row.created_at,
+                    updatedAt=row.updated_at,
+                )
+                for row in db.execute(query)
+            ]
+        finally:
+            db.close()
+
+    @instrumented
+    @reads
     def get_session_by_id(self, session_id: str) -> Optional[Session]:
         """Get a session by ID."""
         db = self.get_session()
         try:
-            session = db.query(SessionModel).filter(SessionModel.id == session_id).first()
-            if session:
-                return Session(**session.to_dict())
+            row = db.execute(_SESSION_WITH_LAST_EXECUTION, {"session_id": session_id}).first()
+            if row:
+                return _session_from_model(row.SessionModel, _execution_preview(row))
             return None
         finally:
             db.close()
 
+    @instrumented
+    @writes
     def update_session(
         self,
         session_id: str,
@@ -68,60 +941,74 @@ class Database:
         language: Optional[Language] = None,
         status: Optional[SessionStatus] = None,
     ) -> Optional[Session]:
-        """Update a session."""
+        """Update a session.
+
+        The session row is locked first, so concurrent updates number their
+        revisions one after another.
+        """
         db = self.get_session()
         try:
-            session = db.query(SessionModel).filter(SessionModel.id == session_id).first()
+            session = db.scalar(_SESSION_FOR_UPDATE, {"session_id": session_id})
             if not session:
                 return None
 
-            if code is not None:
+            updated_at = int(__import__('time').time() * 1000)
+            if code is not None and code != session.code:
+                _record_revision(db, session_id, session.code, code, updated_at)
                 session.code = code
             if language is not None:
                 session.language = language
             if status is not None:
                 session.status = status
             
-            session.updated_at = int(__import__('time').time() * 1000)
+            session.updated_at = updated_at
             db.commit()
             db.refresh(session)
-            return Session(**session.to_dict())
+            return _session_from_model(session, _last_execution(db, session_id))
         finally:
             db.close()
 
+    @instrumented
+    @writes
     def delete_session(self, session_id: str) -> bool:
         """Delete a session."""
         db = self.get_session()
         try:
-            session = db.query(SessionModel).filter(SessionModel.id == session_id).first()
+            session = db.scalar(_SESSION_BY_ID, {"session_id": session_id})
             if not session:
                 return False
             
+            db.query(RevisionModel).filter(RevisionModel.session_id == session_id).delete()
+            db.query(ExecutionModel).filter(ExecutionModel.session_id == session_id).delete()
             db.delete(session)
             db.commit()
             return True
         finally:
             db.close()
 
+    @instrumented
+    @reads
     def session_exists(self, session_id: str) -> bool:
         """Check if a session exists."""
         db = self.get_session()
         try:
-            return db.query(SessionModel).filter(SessionModel.id == session_id).first() is not None
+            return db.scalar(_SESSION_ID_EXISTS, {"session_id": session_id}) is not None
         finally:
             db.close()
 
     # User operations
+    @instrumented
+    @writes
     def add_user(self, session_id: str, user: User) -> Optional[Session]:
         """Add a user to a session."""
         db = self.get_session()
         try:
-            session = db.query(SessionModel).filter(SessionModel.id == session_id).first()
+            session = db.scalar(_SESSION_BY_ID, {"session_id": session_id})
             if not session:
                 return None
 
             # Check if user already exists, if not create
-            user_obj = db.query(UserModel).filter(UserModel.id == user.id).first()
+            user_obj = db.scalar(_USER_BY_ID, {"user_id": user.id})
             if not user_obj:
                 user_obj = UserModel(
                     id=user.id,
@@ -137,58 +1024,271 @@ class Database:
             
             db.commit()
             db.refresh(session)
-            return Session(**session.to_dict())
+            return _session_from_model(session)
         finally:
             db.close()
 
+    @instrumented
+    @reads
     def get_session_users(self, session_id: str) -> Optional[list[User]]:
         """Get all users in a session."""
         db = self.get_session()
         try:
-            session = db.query(SessionModel).filter(SessionModel.id == session_id).first()
+            session = db.scalar(_SESSION_BY_ID, {"session_id": session_id})
             if not session:
                 return None
-            return [User(**u.to_dict()) for u in session.users]
+            return [_user_from_model(u) for u in session.users]
         finally:
             db.close()
 
+    @instrumented
+    @writes
     def remove_user(self, session_id: str, user_id: str) -> Optional[Session]:
         """Remove a user from a session."""
         db = self.get_session()
         try:
-            session = db.query(SessionModel).filter(SessionModel.id == session_id).first()
+            session = db.scalar(_SESSION_BY_ID, {"session_id": session_id})
             if not session:
                 return None
 
-            user = db.query(UserModel).filter(UserModel.id == user_id).first()
+            user = db.scalar(_USER_BY_ID, {"user_id": user_id})
             if user and user in session.users:
                 session.users.remove(user)
                 db.commit()
             
             db.refresh(session)
-            return Session(**session.to_dict())
+            return _session_from_model(session)
         finally:
             db.close()
 
+    @instrumented
+    @writes
+    def expire_user(self, session_id: str, user_id: str) -> bool:
+        """Remove a user from a session in one DELETE.
+
+        Returns:
+            True if this call removed the user, so when several workers
+            expire the same user only one of them reports it
+        """
+        db = self.get_session()
+        try:
+            result = db.execute(
+                delete(session_users).where(
+                    session_users.c.session_id == session_id,
+                    session_users.c.user_id == user_id,
+                )
+            )
+            db.commit()
+            return result.rowcount > 0
+        finally:
+            db.close()
+
+    @instrumented
+    @reads
     def get_user_in_session(self, session_id: str, user_id: str) -> Optional[User]:
         """Get a specific user in a session."""
         db = self.get_session()
         try:
-            session = db.query(SessionModel).filter(SessionModel.id == session_id).first()
-            if not session:
+            user = db.scalar(_USER_IN_SESSION, {"session_id": session_id, "user_id": user_id})
+            return _user_from_model(user) if user is not None else None
+        finally:
+            db.close()
+
+    # Revision operations
+    @instrumented
+    @reads
+    def revision_of_code(self, session_id: str, code: str) -> Optional[int]:
+        """Number of the session's latest revision if its code is ``code``.
+
+        Returns:
+            The revision number, or None if the session is missing or its
+            current code differs
+        """
+        db = self.get_session()
+        try:
+            row = db.execute(
+                select(
+                    SessionModel.code,
+                    select(func.max(RevisionModel.revision))
+                    .where(RevisionModel.session_id == SessionModel.id)
+                    .correlate(SessionModel)
+                    .scalar_subquery(),
+                ).where(SessionModel.id == session_id)
+            ).first()
+            return row[1] if row is not None and row[0] == code else None
+        finally:
+            db.close()
+
+    @instrumented
+    @reads
+    def list_revisions(self, session_id: str) -> list[Revision]:
+        """List the recorded revisions of a session, oldest first."""
+        db = self.get_session()
+        try:
+            rows = db.scalars(
+                select(RevisionModel)
+                .where(RevisionModel.session_id == session_id)
+                .order_by(RevisionModel.revision)
+            )
+            return [Revision.model_construct(**r.to_dict()) for r in rows]
+        finally:
+            db.close()
+
+    @instrumented
+    @reads
+    def get_revision_code(self, session_id: str, revision: int) -> Optional[tuple[int, str]]:
+        """Reconstruct the code at a revision from its keyframe and deltas.
+
+        Returns:
+            Tuple of (created_at, code) or None if the revision is not stored
+        """
+        db = self.get_session()
+        try:
+            keyframe = db.scalar(
+                select(func.max(RevisionModel.revision)).where(
+                    RevisionModel.session_id == session_id,
+                    RevisionModel.kind == revisions.KEYFRAME,
+                    RevisionModel.revision <= revision,
+                )
+            )
+            if keyframe is None:
                 return None
+            chain = db.execute(
+                select(
+                    RevisionModel.revision,
+                    RevisionModel.kind,
+                    RevisionModel.data,
+                    RevisionModel.created_at,
+                )
+                .where(
+                    RevisionModel.session_id == session_id,
+                    RevisionModel.revision.between(keyframe, revision),
+                )
+                .order_by(RevisionModel.revision)
+            ).all()
+            if not chain or chain[-1].revision != revision:
+                return None
+            return chain[-1].created_at, revisions.reconstruct([(r.kind, r.data) for r in chain])
+        finally:
+            db.close()
 
-            for user in session.users:
-                if user.id == user_id:
-                    return User(**user.to_dict())
-            return None
+    @instrumented
+    @reads
+    def get_revision_page(
+        self, session_id: str, after: int = 0, limit: int = 200
+    ) -> list[tuple[int, str, bytes, int]]:
+        """Read stored revisions in order, one page at a time (keyset on revision).
+
+        Returns:
+            (revision, kind, data, created_at) rows with revision > ``after``
+        """
+        db = self.get_session()
+        try:
+            return [
+                tuple(row)
+                for row in db.execute(
+                    select(
+                        RevisionModel.revision,
+                        RevisionModel.kind,
+                        RevisionModel.data,
+                        RevisionModel.created_at,
+                    )
+                    .where(RevisionModel.session_id == session_id, RevisionModel.revision > after)
+                    .order_by(RevisionModel.revision)
+                    .limit(limit)
+                )
+            ]
+        finally:
+            db.close()
+
+    # Execution operations
+    @instrumented
+    @writes
+    def record_execution(
+        self,
+        session_id: str,
+        language: Language,
+        result: ExecutionResult,
+        created_at: int,
+        revision: Optional[int] = None,
+    ) -> Optional[ExecutionRecord]:
+        """Record a run in a session.
+
+        Args:
+            revision: Revision whose code ran, from ``revision_of_code`` when
+                the run started (None if the code was not a saved revision)
+        """
+        db = self.get_session()
+        try:
+            if db.get(SessionModel, session_id) is None:
+                return None
+            execution = ExecutionModel(
+                session_id=session_id,
+                revision=revision,
+                language=language,
+                output=result.output,
+                error=result.error,
+                execution_time=result.executionTime,
+                created_at=created_at,
+            )
+            db.add(execution)
+            db.commit()
+            return ExecutionRecord(**execution.to_dict())
         finally:
             db.close()
 
+    @instrumented
+    @reads
+    def get_execution_page(
+        self, session_id: str, after_id: int = 0, limit: int = 200
+    ) -> list[tuple[int, ExecutionRecord]]:
+        """Read recorded runs in order, one page at a time (keyset on id).
+
+        Returns:
+            (id, record) pairs with id > ``after_id``
+        """
+        db = self.get_session()
+        try:
+            rows = db.scalars(
+                select(ExecutionModel)
+                .where(ExecutionModel.session_id == session_id, ExecutionModel.id > after_id)
+                .order_by(ExecutionModel.id)
+                .limit(limit)
+            )
+            return [(row.id, ExecutionRecord(**row.to_dict())) for row in rows]
+        finally:
+            db.close()
+
+    @instrumented
+    @reads
+    def count_active_sessions(self) -> int:
+        """Count sessions with status 'active'."""
+        db = self.get_session()
+        try:
+            return db.scalar(
+                select(func.count()).select_from(SessionModel).where(SessionModel.status == "active")
+            )
+        finally:
+            db.close()
+
+    @instrumented
+    @reads
+    def count_session_users(self) -> int:
+        """Count user memberships across all sessions."""
+        db = self.get_session()
+        try:
+            return db.scalar(select(func.count()).select_from(session_users))
+        finally:
+            db.close()
+
+    @writes
     def clear(self):
         """Clear all sessions (for testing)."""
         db = self.get_session()
         try:
+            db.execute(session_users.delete())
+            db.query(RevisionModel).delete()
+            db.query(ExecutionModel).delete()
             db.query(SessionModel).delete()
             db.query(UserModel).delete()
             db.commit()
@@ -196,6 +1296,14 @@ class Database:
             db.close()
 
 
-# Global database instance
+# Global database instance (no connection until first use)
 database_url = os.getenv("DATABASE_URL", "postgresql://postgres:postgres@db:5432/code_interview")
-db = Database(database_url)
+replica_urls = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+db = Database(database_url, replica_urls)
+
+registry.gauge("sessions_active", "Sessions with status 'active'").set_function(
+    db.count_active_sessions
+)
+registry.gauge("session_users_active", "Users currently joined to sessions").set_function(
+    db.count_session_users
+)
@@ -0,0 +1,308 @@
+"""Pluggable event bus fanning session events out to push-channel subscribers.
+
+Every worker keeps its own subscribers (open event streams) and delivers
+events that reach it through the bus backend:
+
+* ``InProcessEventBus`` delivers directly; correct for a single worker.
+* ``PostgresEventBus`` publishes with ``NOTIFY`` and every worker ``LISTEN``s,
+  so a mutation handled by one worker reaches streams held by another.
+* ``LoopbackEventBus`` attaches several buses to a shared in-memory hub and
+  stands in for separate workers in tests.
+
+Configuration:
+    EVENT_BUS: ``inprocess`` (default) or ``postgres``
+    EVENT_BUS_URL: Postgres URL for ``postgres`` (default: DATABASE_URL)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Events buffered per subscriber before the oldest are dropped
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class Subscription:
+    """A subscriber's queue of events for one session."""
+
+    def __init__(self, bus: "EventBus", session_id: str):
+        self.bus = bus
+        self.session_id = session_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def _put(self, event: dict) -> None:
+        """Enqueue an event, dropping the oldest one for slow consumers."""
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self) -> dict:
+        """Wait for the next event."""
+        return await self.queue.get()
+
+    def close(self) -> None:
+        """Stop receiving events."""
+        self.bus.unsubscribe(self)
+
+
+class EventBus(ABC):
+    """Base class: local fan-out shared by every backend.
+
+    Backends implement ``publish`` and call ``_deliver`` for each event that
+    reaches this worker (including the worker's own events).
+    """
+
+    def __init__(self):
+        self._subscribers: dict[str, set[Subscription]] = defaultdict(set)
+        self._listeners: list[Callable[[dict], None]] = []
+        self._lock = threading.Lock()
+
+    async def start(self) -> None:
+        """Open backend connections (called from the app lifespan)."""
+
+    async def stop(self) -> None:
+        """Close backend connections."""
+
+    @abstractmethod
+    def publish(self, session_id: str, event_type: str, data: Any) -> None:
+        """Send an event to every subscriber of a session on every worker.
+
+        Called from async routes, so it must not block on the network.
+        """
+
+    def subscribe(self, session_id: str) -> Subscription:
+        """Subscribe the running event loop to a session's events."""
+        subscription = Subscription(self, session_id)
+        with self._lock:
+            self._subscribers[session_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a subscription."""
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.session_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.session_id]
+
+    def subscriber_count(self, session_id: str) -> int:
+        """Number of local subscribers of a session."""
+        return len(self._subscribers.get(session_id, ()))
+
+    def add_listener(self, callback: Callable[[dict], None]) -> None:
+        """Call ``callback(event)`` for every event of every session reaching this worker.
+
+        Used to keep replicated in-memory state (e.g. presence) in sync.
+        Callbacks may run on a backend thread and must be thread-safe.
+        """
+        self._listeners.append(callback)
+
+    @staticmethod
+    def make_event(session_id: str, event_type: str, data: Any) -> dict:
+        """Build the event envelope."""
+        return {"type": event_type, "sessionId": session_id, "data": data}
+
+    def _deliver(self, event: dict) -> None:
+        """Hand an event to local listeners and subscribers (thread-safe)."""
+        for callback in self._listeners:
+            try:
+                callback(event)
+            except Exception:
+                logger.exception("Event listener failed")
+        with self._lock:
+            subscribers = list(self._subscribers.get(event["sessionId"], ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._put, event)
+            except RuntimeError:
+                # Subscriber's loop is closed; it will never read again
+                self.unsubscribe(subscription)
+
+
+class InProcessEventBus(EventBus):
+    """Single-process bus: events are delivered immediately."""
+
+    def publish(self, session_id: str, event_type: str, data: Any) -> None:
+        self._deliver(self.make_event(session_id, event_type, data))
+
+
+class LoopbackHub:
+    """Shared in-memory hub connecting several ``LoopbackEventBus`` instances."""
+
+    def __init__(self):
+        self.buses: list["LoopbackEventBus"] = []
+
+    def broadcast(self, event: dict) -> None:
+        for bus in list(self.buses):
+            bus._deliver(event)
+
+
+class LoopbackEventBus(EventBus):
+    """Bus standing in for one worker attached to a shared ``LoopbackHub`` (for tests)."""
+
+    def __init__(self, hub: LoopbackHub):
+        super().__init__()
+        self.hub = hub
+        hub.buses.append(self)
+
+    def publish(self, session_id: str, event_type: str, data: Any) -> None:
+        # Round-trip through JSON like a real transport would
+        self.hub.broadcast(json.loads(json.dumps(self.make_event(session_id, event_type, data))))
+
+
+def _psycopg_dsn(database_url: str) -> str:
+    """Turn a SQLAlchemy URL into a libpq connection string."""
+    for prefix in ("postgresql+psycopg://", "postgresql+psycopg2://", "postgres://"):
+        if database_url.startswith(prefix):
+            return "postgresql://" + database_url[len(prefix):]
+    return database_url
+
+
+class PostgresEventBus(EventBus):
+    """Cross-worker bus using Postgres ``LISTEN/NOTIFY``.
+
+    A background thread per worker holds a dedicated ``LISTEN`` connection
+    and reconnects on failure. ``publish`` only queues the event; a
+    publisher thread sends queued events in order, so routes never wait on
+    the database (or its connect timeout when it is down). Events are
+    dropped, with a log line, when the queue is full or Postgres still
+    fails after a reconnect. Postgres limits ``NOTIFY`` payloads to 8000
+    bytes; larger events are sent without ``data`` and marked
+    ``"truncated": true`` so clients refetch over HTTP.
+    """
+
+    MAX_PAYLOAD = 7900
+    # Events waiting for the publisher thread before new ones are dropped
+    OUTBOX_SIZE = 10_000
+
+    def __init__(self, database_url: str, channel: str = "session_events"):
+        super().__init__()
+        if not channel.isidentifier():
+            raise ValueError(f"Invalid channel name: {channel!r}")
+        self.dsn = _psycopg_dsn(database_url)
+        self.channel = channel
+        self._publish_conn = None
+        self._outbox: queue.Queue = queue.Queue(self.OUTBOX_SIZE)
+        self._publisher: Optional[threading.Thread] = None
+        self._publisher_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    async def start(self) -> None:
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._listen, name="event-bus-listener", daemon=True)
+        self._thread.start()
+        self._start_publisher()
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join, 5)
+            self._thread = None
+        with self._publisher_lock:
+            publisher, self._publisher = self._publisher, None
+        if publisher is not None:
+            self._outbox.put(None)  # Sent after the events queued before it
+            await asyncio.to_thread(publisher.join, 5)
+
+    def _connect(self):
+        import psycopg
+
+        return psycopg.connect(self.dsn, autocommit=True)
+
+    def _start_publisher(self) -> None:
+        """Start the publisher thread unless it is running."""
+        with self._publisher_lock:
+            if self._publisher is None:
+                self._publisher = threading.Thread(
+                    target=self._publish_loop, name="event-bus-publisher", daemon=True
+                )
+                self._publisher.start()
+
+    def publish(self, session_id: str, event_type: str, data: Any) -> None:
+        event = self.make_event(session_id, event_type, data)
+        payload = json.dumps(event, separators=(",", ":"))
+        if len(payload.encode()) > self.MAX_PAYLOAD:
+            payload = json.dumps(
+                {**self.make_event(session_id, event_type, None), "truncated": True},
+                separators=(",", ":"),
+            )
+        self._start_publisher()
+        try:
+            self._outbox.put_nowait((event_type, payload))
+        except queue.Full:
+            logger.error("Event bus outbox full; dropping %s event", event_type)
+
+    def _publish_loop(self) -> None:
+        """Publisher thread: send queued events until ``stop()`` queues None."""
+        while (item := self._outbox.get()) is not None:
+            self._send(*item)
+        self._close_publish_conn()
+
+    def _send(self, event_type: str, payload: str) -> None:
+        """NOTIFY one event, reconnecting once if the connection broke."""
+        for attempt in range(2):
+            try:
+                if self._publish_conn is None or self._publish_conn.closed:
+                    self._publish_conn = self._connect()
+                self._publish_conn.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+                return
+            except Exception:
+                self._close_publish_conn()
+                if attempt:
+                    logger.exception("Failed to publish %s event", event_type)
+
+    def _close_publish_conn(self) -> None:
+        """Close the publishing connection, ignoring errors of a broken one."""
+        conn, self._publish_conn = self._publish_conn, None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _listen(self) -> None:
+        """Listener thread: deliver notifications until stopped."""
+        backoff = 0.5
+        while not self._stopping.is_set():
+            try:
+                with self._connect() as conn:
+                    conn.execute(f"LISTEN {self.channel}")
+                    backoff = 0.5
+                    while not self._stopping.is_set():
+                        for notify in conn.notifies(timeout=1.0):
+                            try:
+                                self._deliver(json.loads(notify.payload))
+                            except ValueError:
+                                logger.warning("Ignoring malformed event payload")
+            except Exception:
+                logger.exception("Event bus listener disconnected; retrying in %.1fs", backoff)
+                self._stopping.wait(backoff)
+                backoff = min(backoff * 2, 10.0)
+
+
+def create_event_bus() -> EventBus:
+    """Build the event bus selected by ``EVENT_BUS``."""
+    kind = os.getenv("EVENT_BUS", "inprocess").lower()
+    if kind == "postgres":
+        url = os.getenv("EVENT_BUS_URL") or os.getenv(
+            "DATABASE_URL", "postgresql://postgres:postgres@db:5432/code_interview"
+        )
+        return PostgresEventBus(url)
+    if kind != "inprocess":
+        raise ValueError(f"Unknown EVENT_BUS backend: {kind!r}")
+    return InProcessEventBus()
+
+
+# Global event bus
+bus = create_event_bus()
@@ -1,12 +1,147 @@
 """Code execution service."""
 
 import asyncio
+import json
+import os
+import signal
 import subprocess
+import sys
 import tempfile
+import threading
 import time
-import traceback
+from contextlib import contextmanager
 from typing import Optional
-from app.models import Language, ExecutionResult
+from app.models import Language, ExecutionResult, ExecutionTelemetry
+from app.services.metrics import registry, BYTES_BUCKETS
+from app.services.kernels import KernelLimitReached, kernels
+from app.services.outputs import outputs
+from app.services.tracing import tracer
+from app.services.zygote import FORK_AVAILABLE, OutputCapture, ZygoteTimeout, run_python, zygote
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+# Maximum number of executions running at the same time; the rest wait in a queue
+MAX_CONCURRENT_EXECUTIONS = int(
+    os.getenv("MAX_CONCURRENT_EXECUTIONS", str(os.cpu_count() or 2))
+)
+# Hard wall-clock limits for an execution in seconds
+PYTHON_TIMEOUT = 30
+JAVASCRIPT_TIMEOUT = 30
+# Marker the Node.js wrapper uses to report in-process timings on stderr
+TELEMETRY_MARKER = "__CCH_TELEMETRY__"
+
+_execution_slots = threading.BoundedSemaphore(MAX_CONCURRENT_EXECUTIONS)
+_queue_lock = threading.Lock()
+_queue_depth = 0
+
+execution_phase_seconds = registry.histogram(
+    "execution_phase_seconds",
+    "Time spent in each code execution phase",
+    ["language", "phase"],
+)
+execution_peak_rss_bytes = registry.histogram(
+    "execution_peak_rss_bytes",
+    "Peak resident set size of execution processes",
+    ["language"],
+    buckets=BYTES_BUCKETS,
+)
+execution_cpu_seconds = registry.histogram(
+    "execution_cpu_seconds",
+    "CPU time consumed by code executions",
+    ["language", "mode"],
+)
+execution_output_bytes = registry.histogram(
+    "execution_output_bytes",
+    "Size of captured execution output",
+    ["language"],
+    buckets=BYTES_BUCKETS,
+)
+execution_queue_depth = registry.gauge(
+    "execution_queue_depth",
+    "Number of executions waiting for a free slot",
+)
+execution_queue_depth.set_function(lambda: _queue_depth)
+
+
+def _elapsed_ms(start: float) -> float:
+    """Milliseconds elapsed since a ``time.perf_counter()`` reading."""
+    return (time.perf_counter() - start) * 1000
+
+
+def _maxrss_bytes(maxrss: int) -> int:
+    """Convert ``ru_maxrss`` to bytes (kilobytes everywhere but macOS)."""
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def _read_head_and_tail(f, limit: int, tail: int = 4096) -> str:
+    """Read a file from the start, keeping only its first ``limit`` and last ``tail`` bytes."""
+    size = os.fstat(f.fileno()).st_size
+    f.seek(0)
+    if size <= limit + tail:
+        return f.read().decode(errors="replace")
+    head = f.read(limit)
+    f.seek(size - tail)
+    return (head + b"\n...\n" + f.read()).decode(errors="replace")
+
+
+def _cap_file_size(max_bytes: int):
+    """``preexec_fn`` limiting every file the child writes, its output included, to ``max_bytes``.
+
+    Writes past the limit fail with EFBIG instead of raising SIGXFSZ, so
+    output written around the console wrapper cannot grow without bound.
+    """
+    if resource is None:
+        return None
+
+    def preexec() -> None:
+        signal.signal(signal.SIGXFSZ, signal.SIG_IGN)
+        resource.setrlimit(resource.RLIMIT_FSIZE, (max_bytes, max_bytes))
+
+    return preexec
+
+
+@contextmanager
+def _execution_slot():
+    """Wait for a free execution slot, yielding the queue wait in milliseconds."""
+    global _queue_depth
+    start = time.perf_counter()
+    with _queue_lock:
+        _queue_depth += 1
+    try:
+        with tracer.start_span("execution.queue_wait"):
+            _execution_slots.acquire()
+    finally:
+        with _queue_lock:
+            _queue_depth -= 1
+    try:
+        yield _elapsed_ms(start)
+    finally:
+        _execution_slots.release()
+
+
+def _record_telemetry(language: Language, telemetry: ExecutionTelemetry) -> None:
+    """Aggregate a run's telemetry into the execution histograms."""
+    phases = {
+        "queue": telemetry.queueWaitTime,
+        "spawn": telemetry.spawnTime,
+        "compile": telemetry.compileTime,
+        "run": telemetry.runTime,
+    }
+    for phase, value in phases.items():
+        if value is not None:
+            execution_phase_seconds.observe(value / 1000, language=language, phase=phase)
+    if telemetry.peakRssBytes is not None:
+        execution_peak_rss_bytes.observe(telemetry.peakRssBytes, language=language)
+    if telemetry.cpuUserTime is not None:
+        execution_cpu_seconds.observe(telemetry.cpuUserTime / 1000, language=language, mode="user")
+    if telemetry.cpuSystemTime is not None:
+        execution_cpu_seconds.observe(
+            telemetry.cpuSystemTime / 1000, language=language, mode="system"
+        )
+    execution_output_bytes.observe(telemetry.outputBytes, language=language)
 
 
 class CodeExecutionService:
@@ -14,31 +149,51 @@ class CodeExecutionService:
 
     @staticmethod
     async def execute(
-        code: str, language: Language, timeout: int = 30000
+        code: str, language: Language, timeout: int = 30000, kernel: Optional[str] = None
     ) -> ExecutionResult:
         """Execute code and return the result.
 
+        Execution runs in a worker thread so the event loop keeps serving
+        other requests; at most ``MAX_CONCURRENT_EXECUTIONS`` run at once.
+
         Args:
             code: The code to execute
             language: Programming language
             timeout: Timeout in milliseconds
+            kernel: Session ID whose persistent kernel runs the (Python) code
 
         Returns:
-            ExecutionResult with output, error, and execution time
+            ExecutionResult with output, error, execution time and telemetry
+
+        Raises:
+            KernelLimitReached: If ``kernel`` needs a new kernel and none is free
         """
+        return await asyncio.to_thread(
+            CodeExecutionService._execute_queued, code, language, timeout, kernel
+        )
+
+    @staticmethod
+    def _execute_queued(
+        code: str, language: Language, timeout: int, kernel: Optional[str] = None
+    ) -> ExecutionResult:
+        """Run an execution once a slot is free and record its telemetry."""
         start_time = time.time()
 
         try:
-            if language == "python":
-                return CodeExecutionService._execute_python(code)
-            elif language in ["javascript", "typescript"]:
-                return CodeExecutionService._execute_javascript(code)
-            else:
-                return ExecutionResult(
-                    output="",
-                    error=f"Unsupported language: {language}",
-                    executionTime=0,
-                )
+            with tracer.start_span("CodeExecutionService.execute", {"language": language}), \
+                    _execution_slot() as queue_wait:
+                if language == "python":
+                    result = CodeExecutionService._execute_python(code, kernel)
+                elif language in ["javascript", "typescript"]:
+                    result = CodeExecutionService._execute_javascript(code)
+                else:
+                    return ExecutionResult(
+                        output="",
+                        error=f"Unsupported language: {language}",
+                        executionTime=0,
+                    )
+        except KernelLimitReached:
+            raise
         except Exception as e:
             execution_time = (time.time() - start_time) * 1000
             return ExecutionResult(
@@ -47,62 +202,110 @@ class CodeExecutionService:
                 executionTime=execution_time,
             )
 
+        if result.telemetry is None:
+            result.telemetry = ExecutionTelemetry()
+        result.telemetry.queueWaitTime = queue_wait
+        _record_telemetry(language, result.telemetry)
+        return result
+
     @staticmethod
-    def _execute_python(code: str) -> ExecutionResult:
-        """Execute Python code in a sandboxed environment.
+    def _execute_python(code: str, kernel: Optional[str] = None) -> ExecutionResult:
+        """Execute Python code in a fresh interpreter forked by the zygote.
 
-        Note: This is a simplified implementation. In production,
-        use a proper sandbox like RestrictedPython or Docker.
+        With ``kernel``, the code runs in that session's persistent kernel
+        instead. Where ``fork`` is unavailable the code runs in this process.
+        The sandbox itself (restricted builtins) is ``zygote.run_python``.
         """
         start_time = time.time()
-        output_buffer = []
-        error_output: Optional[str] = None
+        start_ns = time.time_ns()
+        telemetry = ExecutionTelemetry(spawnTime=0)
+        output_id, spill_path = outputs.allocate()
+        capture = {
+            "preview_bytes": outputs.preview_bytes,
+            "max_bytes": outputs.max_bytes,
+            "spill_path": str(spill_path),
+        }
 
-        try:
-            # Create a safe execution environment
-            safe_globals = {
-                "__builtins__": {
-                    "print": lambda *args, **kwargs: output_buffer.append(
-                        " ".join(str(arg) for arg in args)
-                    ),
-                    "len": len,
-                    "range": range,
-                    "str": str,
-                    "int": int,
-                    "float": float,
-                    "list": list,
-                    "dict": dict,
-                    "tuple": tuple,
-                    "set": set,
-                    "sum": sum,
-                    "max": max,
-                    "min": min,
-                },
-                "__name__": "__main__",
-            }
-            safe_locals = {}
-
-            # Execute the code
-            exec(code, safe_globals, safe_locals)
-
-            # Capture any returned values
-            if "result" in safe_locals:
-                output_buffer.append(f"Result: {safe_locals['result']}")
-
-        except SyntaxError as e:
-            error_output = f"SyntaxError: {e.msg} (line {e.lineno})"
-        except Exception as e:
-            error_output = f"{type(e).__name__}: {str(e)}\n{traceback.format_exc()}"
+        if FORK_AVAILABLE:
+            try:
+                if kernel is not None:
+                    with tracer.start_span("execution.process", {"process.command": "kernel"}):
+                        run = kernels.run(kernel, code, PYTHON_TIMEOUT, capture)
+                    telemetry.kernelStarted = run["kernelStarted"]
+                else:
+                    with tracer.start_span("execution.process", {"process.command": "zygote"}):
+                        run = zygote.run(code, PYTHON_TIMEOUT, capture)
+            except ZygoteTimeout:
+                error = f"Execution timed out ({PYTHON_TIMEOUT} second limit)"
+                if kernel is not None:
+                    error += "; the session kernel was reset"
+                return ExecutionResult(
+                    output="",
+                    error=error,
+                    executionTime=(time.time() - start_time) * 1000,
+                    telemetry=telemetry,
+                )
+            telemetry.spawnTime = run["spawnTime"]
+            telemetry.cpuUserTime = run.get("cpuUserTime")
+            telemetry.cpuSystemTime = run.get("cpuSystemTime")
+            if run.get("maxrss") is not None:
+                telemetry.peakRssBytes = _maxrss_bytes(run["maxrss"])
+        else:
+            run = run_python(code, output=OutputCapture(**capture))
+
+        telemetry.compileTime = run["compileTime"]
+        telemetry.runTime = run["runTime"]
+        phase_ns = start_ns + int(telemetry.spawnTime * 1e6)
+        for phase in ("compile", "run"):
+            if run[f"{phase}Time"] is not None:
+                end_ns = phase_ns + int(run[f"{phase}Time"] * 1e6)
+                tracer.record_span(f"execution.{phase}", phase_ns, end_ns)
+                phase_ns = end_ns
 
         execution_time = (time.time() - start_time) * 1000
-        output = "\n".join(output_buffer) if output_buffer else ""
+        telemetry.outputBytes = run["outputBytes"]
 
         return ExecutionResult(
-            output=output or (output or "Code executed successfully (no output)"),
-            error=error_output,
+            output=run["output"] or "Code executed successfully (no output)",
+            error=run["error"],
             executionTime=execution_time,
+            telemetry=telemetry,
+            outputTruncated=run["truncated"],
+            outputId=output_id if run["spilled"] else None,
         )
 
+    @staticmethod
+    def _wait_for_process(proc: subprocess.Popen, timeout: float):
+        """Wait for a process, killing it after ``timeout`` seconds.
+
+        Returns:
+            Tuple of (timed_out, resource usage or None)
+        """
+        if not hasattr(os, "wait4"):
+            try:
+                proc.wait(timeout=timeout)
+                return False, None
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+                return True, None
+
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            proc.kill()
+
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+        try:
+            # wait4 reports the rusage of this child only, unlike RUSAGE_CHILDREN
+            _, status, rusage = os.wait4(proc.pid, 0)
+        finally:
+            timer.cancel()
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        return timed_out.is_set(), rusage
+
     @staticmethod
     def _execute_javascript(code: str) -> ExecutionResult:
         """Execute JavaScript code using Node.js.
@@ -114,6 +317,10 @@ class CodeExecutionService:
             ExecutionResult with output, error, and execution time
         """
         start_time = time.time()
+        phase_start = time.perf_counter()
+        phase_start_ns = time.time_ns()
+        telemetry = ExecutionTelemetry()
+        temp_file = None
 
         try:
             # Create a temporary file for the code
@@ -122,77 +329,145 @@ class CodeExecutionService:
             ) as f:
                 # Wrap code with console output capture
                 wrapped_code = f"""
+const __bootTime = performance.now();
 const originalLog = console.log;
 const originalError = console.error;
 const originalWarn = console.warn;
-const outputs = [];
+// Stream output to stdout (a file) instead of holding it; stop writing at the cap.
+// Direct writes past it fail with EFBIG (the files are size-limited); drop them.
+for (const __stream of [process.stdout, process.stderr]) {{
+    __stream.on('error', e => {{ if (e.code !== 'EFBIG') throw e; }});
+}}
+const __maxBytes = {outputs.max_bytes};
+let __outputBytes = 0;
+let __outputLines = 0;
+function __emit(line) {{
+    const data = Buffer.from((__outputLines++ === 0 ? '' : '\\n') + line);
+    if (__outputBytes < __maxBytes) {{
+        process.stdout.write(data.subarray(0, __maxBytes - __outputBytes));
+    }}
+    __outputBytes += data.length;
+}}
 
 console.log = function(...args) {{
-    outputs.push(args.map(arg => 
+    __emit(args.map(arg =>
         typeof arg === 'object' ? JSON.stringify(arg, null, 2) : String(arg)
     ).join(' '));
 }};
 
 console.error = function(...args) {{
-    outputs.push('Error: ' + args.map(arg => 
+    __emit('Error: ' + args.map(arg =>
         typeof arg === 'object' ? JSON.stringify(arg, null, 2) : String(arg)
     ).join(' '));
 }};
 
 console.warn = function(...args) {{
-    outputs.push('Warning: ' + args.map(arg => 
+    __emit('Warning: ' + args.map(arg =>
         typeof arg === 'object' ? JSON.stringify(arg, null, 2) : String(arg)
     ).join(' '));
 }};
 
+const __runStart = performance.now();
 try {{
     {code}
 }} catch (e) {{
-    outputs.push('Error: ' + e.message);
+    __emit('Error: ' + e.message);
 }}
+const __runTime = performance.now() - __runStart;
 
 console.log = originalLog;
 console.error = originalError;
 console.warn = originalWarn;
 
-if (outputs.length > 0) {{
-    originalLog(outputs.join('\\n'));
-}} else {{
-    originalLog('Code executed successfully (no output)');
-}}
+process.stderr.write('\\n{TELEMETRY_MARKER}' + JSON.stringify({{boot: __bootTime, run: __runTime, outputBytes: __outputBytes}}) + '\\n');
 """
                 f.write(wrapped_code)
                 temp_file = f.name
+            write_time = _elapsed_ms(phase_start)
 
-            # Execute the Node.js code with timeout
-            result = subprocess.run(
-                ["node", temp_file],
-                capture_output=True,
-                text=True,
-                timeout=30,
-            )
+            tracer.record_span("execution.write_script", phase_start_ns, time.time_ns())
+
+            # Execute the Node.js code with timeout; output goes to files so
+            # the child can be reaped with os.wait4 for its resource usage.
+            # stdout is written where a spill file would live and kept only
+            # if it is larger than the preview.
+            output_id, spill_path = outputs.allocate()
+            with open(spill_path, "w+b") as stdout_file, tempfile.TemporaryFile() as stderr_file:
+                process_start_ns = time.time_ns()
+                with tracer.start_span("execution.process", {"process.command": "node"}):
+                    proc = subprocess.Popen(
+                        ["node", temp_file],
+                        stdout=stdout_file,
+                        stderr=stderr_file,
+                        preexec_fn=_cap_file_size(outputs.max_bytes),
+                    )
+                    timed_out, rusage = CodeExecutionService._wait_for_process(
+                        proc, JAVASCRIPT_TIMEOUT
+                    )
+                stdout_size = os.fstat(stdout_file.fileno()).st_size
+                stdout_file.seek(0)
+                stdout = stdout_file.read(outputs.preview_bytes).decode(errors="ignore")
+                stderr = _read_head_and_tail(stderr_file, outputs.preview_bytes)
+            spilled = stdout_size > outputs.preview_bytes and not timed_out
+            if not spilled:
+                os.unlink(spill_path)
+
+            if rusage is not None:
+                telemetry.peakRssBytes = _maxrss_bytes(rusage.ru_maxrss)
+                telemetry.cpuUserTime = rusage.ru_utime * 1000
+                telemetry.cpuSystemTime = rusage.ru_stime * 1000
 
             execution_time = (time.time() - start_time) * 1000
-            output = result.stdout.strip() if result.stdout else ""
-            error = result.stderr.strip() if result.stderr else None
+
+            if timed_out:
+                return ExecutionResult(
+                    output="",
+                    error="Execution timed out (30 second limit)",
+                    executionTime=execution_time,
+                    telemetry=telemetry,
+                )
+
+            stderr_lines = []
+            for line in stderr.splitlines():
+                if line.startswith(TELEMETRY_MARKER):
+                    timings = json.loads(line[len(TELEMETRY_MARKER):])
+                    # Node's clock starts at process start, so boot covers spawn and parse
+                    telemetry.spawnTime = write_time + timings["boot"]
+                    telemetry.runTime = timings["run"]
+                    telemetry.outputBytes = timings["outputBytes"]
+                    boot_end_ns = process_start_ns + int(timings["boot"] * 1e6)
+                    tracer.record_span("execution.spawn", process_start_ns, boot_end_ns)
+                    tracer.record_span(
+                        "execution.run", boot_end_ns, boot_end_ns + int(timings["run"] * 1e6)
+                    )
+                else:
+                    stderr_lines.append(line)
+
+            output = stdout.strip() if stdout else ""
+            error = "\n".join(stderr_lines).strip() or None
+            # Output written around the wrapper is only seen in the file size
+            telemetry.outputBytes = max(telemetry.outputBytes, stdout_size)
 
             return ExecutionResult(
                 output=output or "Code executed successfully (no output)",
                 error=error,
                 executionTime=execution_time,
+                telemetry=telemetry,
+                outputTruncated=telemetry.outputBytes > outputs.preview_bytes,
+                outputId=output_id if spilled else None,
             )
 
-        except subprocess.TimeoutExpired:
-            execution_time = (time.time() - start_time) * 1000
-            return ExecutionResult(
-                output="",
-                error="Execution timed out (30 second limit)",
-                executionTime=execution_time,
-            )
         except Exception as e:
             execution_time = (time.time() - start_time) * 1000
             return ExecutionResult(
                 output="",
                 error=f"{type(e).__name__}: {str(e)}",
                 executionTime=execution_time,
+                telemetry=telemetry,
             )
+        finally:
+            if temp_file is not None:
+                try:
+                    os.unlink(temp_file)
+                except OSError:
+                    pass
@@ -0,0 +1,196 @@
+"""Persistent per-session Python kernels for incremental execution.
+
+A kernel is a long-lived sandboxed interpreter forked from the zygote and
+bound to one session. Snippets sent to it run in a namespace that survives
+between runs, so setup code (building inputs, defining helpers) runs once
+and later runs only pay for what changed.
+
+Each kernel listens on ``<KERNEL_DIR>/<session id>.sock``, so every worker
+on a host shares one kernel per session. Kernels exit after
+``KERNEL_IDLE_TIMEOUT`` seconds without a run, and at most
+``KERNEL_MAX_PER_HOST`` run at once. Workers start kernels one at a time
+(under ``<KERNEL_DIR>/.start.lock``) and count only sockets a kernel
+still answers on, removing those left behind by killed kernels.
+
+Configuration:
+    KERNEL_DIR: Directory for kernel sockets (default: ``<tmp>/code-collab-kernels``)
+    KERNEL_IDLE_TIMEOUT: Seconds before an unused kernel exits (default: 300)
+    KERNEL_MAX_PER_HOST: Kernels allowed at once on this host (default: 16)
+"""
+
+import json
+import logging
+import os
+import re
+import socket
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+from app.services.events import bus
+from app.services.metrics import registry
+from app.services.zygote import Zygote, ZygoteTimeout, call, zygote
+
+logger = logging.getLogger(__name__)
+
+KERNEL_DIR = Path(os.getenv("KERNEL_DIR") or Path(tempfile.gettempdir()) / "code-collab-kernels")
+KERNEL_IDLE_TIMEOUT = float(os.getenv("KERNEL_IDLE_TIMEOUT", "300"))
+KERNEL_MAX_PER_HOST = int(os.getenv("KERNEL_MAX_PER_HOST", "16"))
+
+# Session IDs become file names
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+kernel_starts_total = registry.counter(
+    "kernel_starts_total",
+    "Session kernels started by this worker",
+)
+
+
+class KernelLimitReached(Exception):
+    """Raised when the host already runs ``KERNEL_MAX_PER_HOST`` kernels."""
+
+
+class KernelManager:
+    """Finds, starts and stops the kernels of this host."""
+
+    def __init__(
+        self,
+        directory: Path = KERNEL_DIR,
+        idle_timeout: float = KERNEL_IDLE_TIMEOUT,
+        max_kernels: int = KERNEL_MAX_PER_HOST,
+        fork_server: Zygote = zygote,
+    ):
+        self.directory = Path(directory)
+        self.idle_timeout = idle_timeout
+        self.max_kernels = max_kernels
+        self.fork_server = fork_server
+
+    def _path(self, session_id: str) -> Path:
+        if not SESSION_ID_PATTERN.match(session_id):
+            raise ValueError(f"Invalid session ID for a kernel: {session_id!r}")
+        return self.directory / f"{session_id}.sock"
+
+    def count(self) -> int:
+        """Number of kernels running on this host, removing sockets of dead ones."""
+        try:
+            paths = list(self.directory.glob("*.sock"))
+        except OSError:
+            return 0
+        return sum(1 for path in paths if self._alive(path))
+
+    def _alive(self, path: Path) -> bool:
+        """Whether a kernel listens on ``path`` (kernels ignore a bare connect)."""
+        sock = self._connect(path)
+        if sock is None:
+            return False
+        sock.close()
+        return True
+
+    def _connect(self, path: Path) -> socket.socket | None:
+        """Connect to a kernel, removing its socket if nothing listens there."""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(str(path))
+            return sock
+        except FileNotFoundError:
+            sock.close()
+        except ConnectionRefusedError:
+            sock.close()
+            path.unlink(missing_ok=True)  # Left behind by a killed kernel
+        return None
+
+    def _start(self, path: Path) -> bool:
+        """Start a kernel on ``path``; False if another worker just did.
+
+        Starts on this host are serialized with a lock file, so concurrent
+        workers cannot all pass the cap check before any kernel exists.
+        """
+        import fcntl  # Kernels need fork, so POSIX only
+
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        with open(self.directory / ".start.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)  # Released when the file closes
+            if self._alive(path):
+                return False
+            if self.count() >= self.max_kernels:
+                raise KernelLimitReached(
+                    f"All {self.max_kernels} kernels on this server are in use; retry later"
+                )
+            started = self.fork_server.spawn_kernel(str(path), self.idle_timeout)
+        if started:
+            kernel_starts_total.inc()
+        return started
+
+    def run(self, session_id: str, code: str, timeout: float, output: Optional[dict] = None) -> dict:
+        """Run a snippet in the session's kernel, starting it if needed.
+
+        Args:
+            session_id: Session whose kernel runs the snippet
+            code: Python source
+            timeout: Wall-clock limit in seconds
+            output: ``OutputCapture`` arguments (preview and spill limits)
+
+        Returns:
+            ``run_python``'s result plus ``spawnTime``, resource usage and
+            ``kernelStarted`` (whether this run started the kernel)
+
+        Raises:
+            KernelLimitReached: If a new kernel is needed but none is free
+            ZygoteTimeout: If the snippet timed out; the kernel and its
+                namespace are gone
+        """
+        path = self._path(session_id)
+        request = {"code": code, "timeout": timeout, "output": output or {}}
+        for _ in range(2):
+            started = False
+            sock = self._connect(path)
+            if sock is None:
+                started = self._start(path)
+                sock = self._connect(path)
+                if sock is None:
+                    raise RuntimeError("Session kernel failed to start")
+            try:
+                result = call(sock, request, timeout)
+            except ZygoteTimeout:
+                path.unlink(missing_ok=True)
+                raise
+            except ConnectionError:
+                continue  # The kernel idled out as we connected; start a new one
+            result["kernelStarted"] = started
+            return result
+        raise RuntimeError("Session kernel exited before running the snippet")
+
+    def stop(self, session_id: str, wait: float = 1.0) -> bool:
+        """Ask a session's kernel to exit.
+
+        Args:
+            session_id: Session whose kernel to stop
+            wait: Seconds to wait for the kernel to go away (it finishes a
+                snippet it is running first)
+
+        Returns:
+            True if a kernel was running
+        """
+        path = self._path(session_id)
+        sock = self._connect(path)
+        if sock is None:
+            return False
+        with sock:
+            sock.sendall(json.dumps({"shutdown": True}).encode())
+        deadline = time.monotonic() + wait
+        while path.exists() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return True
+
+    def apply_event(self, event: dict) -> None:
+        """Stop the kernel of a deleted session (event bus listener)."""
+        if event["type"] == "session.deleted" and SESSION_ID_PATTERN.match(event["sessionId"]):
+            try:
+                self.stop(event["sessionId"], wait=0)
+            except OSError:
+                logger.warning("Could not stop kernel of session %s", event["sessionId"], exc_info=True)
+
+
+# Global kernel manager
+kernels = KernelManager()
+bus.add_listener(kernels.apply_event)
@@ -0,0 +1,253 @@
+"""In-process metrics registry with Prometheus text exposition."""
+
+import bisect
+import math
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable, Optional
+
+# Default latency buckets in seconds (1 ms .. 30 s)
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+# Buckets for byte sizes (1 KiB .. 1 GiB)
+BYTES_BUCKETS = tuple(float(1024 * 4**i) for i in range(11))
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value the way Prometheus expects."""
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    """Escape a label value."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    """Render a label set as ``{a="1",b="2"}``."""
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric(ABC):
+    """Base class for labelled metrics."""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: dict[tuple[str, ...], object] = {}
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Metric '{self.name}' expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    @abstractmethod
+    def _samples(self) -> list[str]:
+        """Sample lines of the metric in text exposition format."""
+
+    def render(self) -> str:
+        """Render the metric in text exposition format."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Increment the counter for a label set."""
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = self._children.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Return the current value for a label set."""
+        return self._children.get(self._key(labels), 0.0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._children.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}"
+            for k, v in items
+        ]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be computed at scrape time."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the gauge for a label set."""
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Increment the gauge for a label set."""
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = self._children.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        """Decrement the gauge for a label set."""
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Compute the (unlabelled) gauge value lazily on every scrape."""
+        self._function = function
+
+    def value(self, **labels: str) -> float:
+        """Return the current value for a label set."""
+        if self._function is not None and not self.labelnames:
+            return float(self._function())
+        return self._children.get(self._key(labels), 0.0)
+
+    def _samples(self) -> list[str]:
+        if self._function is not None:
+            try:
+                return [f"{self.name} {_format_value(float(self._function()))}"]
+            except Exception:
+                return []
+        with self._lock:
+            items = sorted(self._children.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}"
+            for k, v in items
+        ]
+
+
+class _HistogramChild:
+    """Bucket counts, sum and count for one label set."""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed upper bounds."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record an observation for a label set."""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = _HistogramChild(len(self.buckets) + 1)
+            child.counts[index] += 1
+            child.sum += value
+            child.count += 1
+
+    def count(self, **labels: str) -> int:
+        """Return the number of observations for a label set."""
+        child = self._children.get(self._key(labels))
+        return child.count if child else 0
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = [
+                (k, list(c.counts), c.sum, c.count) for k, c in sorted(self._children.items())
+            ]
+        lines = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together on ``/metrics``."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric '{metric.name}' already registered")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        """Get or create a counter."""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        """Get or create a gauge."""
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Get or create a histogram."""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Render every registered metric in Prometheus text format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(m.render() for m in metrics) + "\n"
+
+
+# Global metrics registry
+registry = MetricsRegistry()
@@ -0,0 +1,107 @@
+"""Spill files holding the full output of executions too large to return inline.
+
+An execution keeps the first ``OUTPUT_PREVIEW_BYTES`` of its output in
+memory and returns them in ``ExecutionResult.output``. Anything larger is
+written to a file here (up to ``OUTPUT_MAX_BYTES``) and can be paged through
+by byte range with ``GET /api/v1/execute/outputs/{outputId}``. Files are
+shared by the workers of a host and removed after ``OUTPUT_RETENTION``
+seconds.
+
+Configuration:
+    OUTPUT_DIR: Directory for spill files (default: ``<tmp>/code-collab-outputs``)
+    OUTPUT_PREVIEW_BYTES: Output returned inline (default: 65536)
+    OUTPUT_MAX_BYTES: Output kept per run (default: 16 MiB)
+    OUTPUT_RETENTION: Seconds spill files are kept (default: 3600)
+"""
+
+import mmap
+import os
+import re
+import secrets
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+OUTPUT_DIR = Path(os.getenv("OUTPUT_DIR") or Path(tempfile.gettempdir()) / "code-collab-outputs")
+OUTPUT_PREVIEW_BYTES = int(os.getenv("OUTPUT_PREVIEW_BYTES", str(64 * 1024)))
+OUTPUT_MAX_BYTES = int(os.getenv("OUTPUT_MAX_BYTES", str(16 * 1024 * 1024)))
+OUTPUT_RETENTION = float(os.getenv("OUTPUT_RETENTION", "3600"))
+
+OUTPUT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+# Sweep expired files at most this often (seconds)
+SWEEP_INTERVAL = 60.0
+
+
+class OutputStore:
+    """Creates, reads and expires spill files."""
+
+    def __init__(
+        self,
+        directory: Path = OUTPUT_DIR,
+        preview_bytes: int = OUTPUT_PREVIEW_BYTES,
+        max_bytes: int = OUTPUT_MAX_BYTES,
+        retention: float = OUTPUT_RETENTION,
+    ):
+        self.directory = Path(directory)
+        self.preview_bytes = preview_bytes
+        self.max_bytes = max_bytes
+        self.retention = retention
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+
+    def allocate(self) -> tuple[str, Path]:
+        """Reserve an ID and path for a run's spill file (created only if needed)."""
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self.sweep()
+        output_id = secrets.token_urlsafe(16)
+        return output_id, self.directory / output_id
+
+    def path(self, output_id: str) -> Optional[Path]:
+        """Path of an existing spill file, or None."""
+        if not OUTPUT_ID_PATTERN.match(output_id):
+            return None
+        path = self.directory / output_id
+        return path if path.is_file() else None
+
+    def read(self, output_id: str, offset: int, length: int) -> Optional[tuple[bytes, int]]:
+        """Read a byte range through a memory map, so only that range is loaded.
+
+        Returns:
+            Tuple of (bytes, total size), or None if the output does not exist
+        """
+        path = self.path(output_id)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size == 0 or offset >= size:
+                    return b"", size
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return mapped[offset:offset + length], size
+        except FileNotFoundError:  # Expired meanwhile
+            return None
+
+    def sweep(self) -> None:
+        """Remove spill files older than the retention period."""
+        now = time.time()
+        with self._lock:
+            if now - self._last_sweep < SWEEP_INTERVAL:
+                return
+            self._last_sweep = now
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            try:
+                if now - entry.stat().st_mtime > self.retention:
+                    os.unlink(entry.path)
+            except FileNotFoundError:
+                pass
+
+
+# Global output store
+outputs = OutputStore()
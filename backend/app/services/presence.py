@@ -0,0 +1,147 @@
+"""Ephemeral per-session presence kept in memory, never in the database.
+
+Each worker holds a replica of every session's presence, kept in sync by
+applying the ``presence.*`` events that arrive over the event bus.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from time import time
+from typing import Optional
+from app.models import CursorPosition, Presence, Selection
+from app.services.events import bus
+from app.services.sharding import shards
+
+logger = logging.getLogger(__name__)
+
+# Users without a heartbeat for this long are removed from the session
+PRESENCE_TIMEOUT = float(os.getenv("PRESENCE_TIMEOUT", "30"))
+# How often the reaper looks for expired users
+PRESENCE_SWEEP_INTERVAL = float(os.getenv("PRESENCE_SWEEP_INTERVAL", "5"))
+
+
+def _now_ms() -> int:
+    return int(time() * 1000)
+
+
+class PresenceRegistry:
+    """In-memory map of session → user → cursor/selection/last-seen."""
+
+    def __init__(self, timeout: float = PRESENCE_TIMEOUT):
+        self.timeout = timeout
+        self._sessions: dict[str, dict[str, Presence]] = {}
+        self._lock = threading.Lock()
+
+    def is_tracked(self, session_id: str, user_id: str) -> bool:
+        """Whether a user currently has presence in a session."""
+        return user_id in self._sessions.get(session_id, {})
+
+    def heartbeat(
+        self,
+        session_id: str,
+        user_id: str,
+        cursor: Optional[CursorPosition] = None,
+        selection: Optional[Selection] = None,
+    ) -> Presence:
+        """Record a heartbeat and publish the user's presence."""
+        presence = Presence(
+            userId=user_id, cursor=cursor, selection=selection, lastSeen=_now_ms()
+        )
+        with self._lock:
+            self._sessions.setdefault(session_id, {})[user_id] = presence
+        bus.publish(session_id, "presence.updated", presence.model_dump())
+        return presence
+
+    def leave(self, session_id: str, user_id: str, publish: bool = True) -> bool:
+        """Drop a user's presence, publishing the departure unless ``publish`` is false."""
+        with self._lock:
+            users = self._sessions.get(session_id)
+            removed = users.pop(user_id, None) if users else None
+            if users is not None and not users:
+                del self._sessions[session_id]
+        if removed is not None and publish:
+            bus.publish(session_id, "presence.left", {"userId": user_id})
+        return removed is not None
+
+    def drop_session(self, session_id: str) -> None:
+        """Forget all presence of a deleted session."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def snapshot(self, session_id: str) -> list[Presence]:
+        """Presence of every tracked user in a session."""
+        with self._lock:
+            return list(self._sessions.get(session_id, {}).values())
+
+    def expired(self, now_ms: Optional[int] = None) -> list[tuple[str, str]]:
+        """(session_id, user_id) pairs whose last heartbeat is older than the timeout."""
+        cutoff = (now_ms if now_ms is not None else _now_ms()) - int(self.timeout * 1000)
+        with self._lock:
+            return [
+                (session_id, user_id)
+                for session_id, users in self._sessions.items()
+                for user_id, presence in users.items()
+                if presence.lastSeen < cutoff
+            ]
+
+    def apply_event(self, event: dict) -> None:
+        """Apply a presence event published by any worker (event bus listener)."""
+        session_id, data = event["sessionId"], event["data"]
+        if event["type"] == "presence.updated" and data is not None:
+            with self._lock:
+                self._sessions.setdefault(session_id, {})[data["userId"]] = Presence(**data)
+        elif event["type"] == "presence.left" and data is not None:
+            with self._lock:
+                users = self._sessions.get(session_id)
+                if users is not None:
+                    users.pop(data["userId"], None)
+                    if not users:
+                        del self._sessions[session_id]
+        elif event["type"] == "session.deleted":
+            self.drop_session(session_id)
+
+    def clear(self) -> None:
+        """Forget all presence (for testing)."""
+        with self._lock:
+            self._sessions.clear()
+
+
+# Global presence registry
+presence = PresenceRegistry()
+bus.add_listener(presence.apply_event)
+
+
+def sweep_expired(database, now_ms: Optional[int] = None) -> list[tuple[str, str]]:
+    """Remove users that stopped heartbeating from presence and from ``session.users``.
+
+    With sharding enabled only sessions owned by this worker are swept.
+    Otherwise every worker sweeps every session; only the one whose delete
+    removed the user publishes ``presence.left`` and ``user.left``.
+
+    Returns:
+        The (session_id, user_id) pairs this worker removed
+    """
+    removed = []
+    for session_id, user_id in presence.expired(now_ms):
+        if not shards.is_local(session_id):
+            continue
+        left = database.expire_user(session_id, user_id)
+        presence.leave(session_id, user_id, publish=left)
+        if left:
+            bus.publish(session_id, "user.left", {"userId": user_id})
+            removed.append((session_id, user_id))
+    return removed
+
+
+async def run_presence_reaper(database, interval: float = PRESENCE_SWEEP_INTERVAL) -> None:
+    """Background task expiring idle users until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            removed = await asyncio.to_thread(sweep_expired, database)
+            if removed:
+                logger.info("Expired %d idle users", len(removed))
+        except Exception:
+            logger.exception("Presence sweep failed")
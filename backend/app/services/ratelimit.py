@@ -0,0 +1,221 @@
+"""Token-bucket rate limiting with pluggable counter storage.
+
+Buckets are stored in GCRA form: a single "theoretical arrival time" (TAT)
+per key, equivalent to a token bucket refilling at ``rate`` tokens per
+second up to ``burst`` tokens. One float per key keeps the shared backend
+to a single atomic upsert per request.
+
+Configuration:
+    RATE_LIMIT_ENABLED: ``0`` disables rate limiting (default: ``1``)
+    RATE_LIMIT_BACKEND: ``memory`` (default, per worker) or ``database``
+        (shared across workers through the ``rate_limit_buckets`` table)
+    RATE_LIMIT_<NAME>: Override a limit as ``rate/burst``, e.g.
+        ``RATE_LIMIT_EXECUTE_CLIENT=5/20``
+"""
+
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy import Column, Float, MetaData, String, Table, case, select
+from app.services.metrics import registry
+
+rate_limited_total = registry.counter(
+    "rate_limited_total",
+    "Requests rejected by the rate limiter, by limit",
+    ["limit"],
+)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Allow ``rate`` requests per second on average, bursting to ``burst``."""
+
+    rate: float
+    burst: int
+
+    def __post_init__(self):
+        if not 0 < self.rate < math.inf:
+            raise ValueError(f"Rate limit rate must be positive and finite, got {self.rate!r}")
+        if self.burst < 1:
+            raise ValueError(f"Rate limit burst must be at least 1, got {self.burst!r}")
+
+    @property
+    def increment(self) -> float:
+        """Seconds one request adds to the bucket's arrival time."""
+        return 1.0 / self.rate
+
+    @property
+    def tolerance(self) -> float:
+        """How far ahead of now the arrival time may run (the burst)."""
+        return self.burst * self.increment
+
+    @classmethod
+    def from_env(cls, name: str, default: "RateLimit") -> "RateLimit":
+        """Read ``RATE_LIMIT_<NAME>`` (``rate/burst``), falling back to ``default``.
+
+        Raises:
+            ValueError: If the variable is malformed or the rate is not positive
+        """
+        variable = f"RATE_LIMIT_{name.upper()}"
+        value = os.getenv(variable)
+        if not value:
+            return default
+        rate, _, burst = value.partition("/")
+        try:
+            return cls(float(rate), int(burst or max(1, math.ceil(float(rate)))))
+        except (ValueError, OverflowError) as exc:
+            raise ValueError(f"Invalid {variable}={value!r}: {exc}") from None
+
+
+class RateLimitBackend(ABC):
+    """Base class for bucket storage."""
+
+    @abstractmethod
+    def acquire(self, key: str, limit: RateLimit, now: float) -> float:
+        """Take one token from a bucket.
+
+        Returns:
+            0 if allowed, otherwise seconds until a token is available
+        """
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Forget all buckets (for testing)."""
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Per-process buckets, bounded to the most recently used keys."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._tats: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, limit: RateLimit, now: float) -> float:
+        with self._lock:
+            tat = max(self._tats.get(key, now), now)
+            new_tat = tat + limit.increment
+            if new_tat - now > limit.tolerance:
+                return new_tat - now - limit.tolerance
+            self._tats[key] = new_tat
+            self._tats.move_to_end(key)
+            if len(self._tats) > self.max_keys:
+                self._tats.popitem(last=False)
+            return 0.0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tats.clear()
+
+
+_metadata = MetaData()
+rate_limit_buckets = Table(
+    "rate_limit_buckets",
+    _metadata,
+    Column("key", String(200), primary_key=True),
+    Column("tat", Float, nullable=False),
+)
+
+
+class DatabaseRateLimitBackend(RateLimitBackend):
+    """Buckets shared by every worker through one table.
+
+    Each request is one ``INSERT ... ON CONFLICT DO UPDATE ... WHERE``
+    statement that only advances the arrival time when a token is
+    available. Runs on Postgres, and on SQLite as a local stand-in.
+    """
+
+    def __init__(self, engine):
+        """Configure the backend without connecting.
+
+        Args:
+            engine: SQLAlchemy engine, or a callable returning one on first use
+        """
+        self._engine = engine
+        self._insert = None
+
+    @property
+    def engine(self):
+        """The engine, resolved on first access."""
+        if callable(self._engine):
+            self._engine = self._engine()
+        return self._engine
+
+    def _prepare(self) -> None:
+        """Pick the dialect's upsert and create the table on first use."""
+        if self.engine.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        _metadata.create_all(self.engine)
+        self._insert = insert
+
+    def acquire(self, key: str, limit: RateLimit, now: float) -> float:
+        if self._insert is None:
+            self._prepare()
+        table = rate_limit_buckets
+        start = case((table.c.tat > now, table.c.tat), else_=now)
+        statement = self._insert(table).values(key=key, tat=now + limit.increment)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.key],
+            set_={"tat": start + limit.increment},
+            where=start + limit.increment - now <= limit.tolerance,
+        ).returning(table.c.tat)
+        with self.engine.begin() as conn:
+            if conn.execute(statement).first() is not None:
+                return 0.0
+            tat = conn.scalar(select(table.c.tat).where(table.c.key == key))
+        return max(tat + limit.increment - now - limit.tolerance, 0.001)
+
+    def clear(self) -> None:
+        if self._insert is None:
+            self._prepare()
+        with self.engine.begin() as conn:
+            conn.execute(rate_limit_buckets.delete())
+
+
+class RateLimiter:
+    """Checks named limits against the configured backend."""
+
+    def __init__(self, backend: Optional[RateLimitBackend] = None, enabled: bool = True):
+        self.backend = backend or InMemoryRateLimitBackend()
+        self.enabled = enabled
+
+    def hit(self, name: str, key: str, limit: RateLimit) -> float:
+        """Count a request against ``name:key``.
+
+        Returns:
+            0 if allowed, otherwise the ``Retry-After`` delay in seconds
+        """
+        if not self.enabled:
+            return 0.0
+        retry_after = self.backend.acquire(f"{name}:{key}", limit, time.time())
+        if retry_after:
+            rate_limited_total.inc(limit=name)
+        return retry_after
+
+    def clear(self) -> None:
+        """Reset every bucket (for testing)."""
+        self.backend.clear()
+
+
+def create_rate_limiter() -> RateLimiter:
+    """Build the rate limiter selected by ``RATE_LIMIT_*``."""
+    enabled = os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+    kind = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+    if kind == "database":
+        from app.services.database import db
+
+        return RateLimiter(DatabaseRateLimitBackend(lambda: db.engine), enabled)
+    if kind != "memory":
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {kind!r}")
+    return RateLimiter(InMemoryRateLimitBackend(), enabled)
+
+
+# Global rate limiter
+limiter = create_rate_limiter()
@@ -0,0 +1,58 @@
+"""Lazy session timeline for interview replay.
+
+Edits (stored revisions) and runs (recorded executions) are read from the
+database one page at a time and merged by timestamp, so replaying a long
+session never holds more than a page of each in memory.
+"""
+
+import heapq
+from typing import Iterator
+from app.services.revisions import RevisionDecoder
+
+# Rows read per database round trip
+REPLAY_PAGE_SIZE = 200
+
+# (created_at, event type, data)
+TimelineEvent = tuple[int, str, dict]
+
+
+def _edits(database, session_id: str, page_size: int) -> Iterator[TimelineEvent]:
+    """Yield every stored revision with its reconstructed code."""
+    decoder = RevisionDecoder()
+    after = 0
+    while True:
+        page = database.get_revision_page(session_id, after, page_size)
+        for revision, kind, data, created_at in page:
+            code = decoder.apply(kind, data)
+            yield created_at, "edit", {"revision": revision, "createdAt": created_at, "code": code}
+        if len(page) < page_size:
+            return
+        after = page[-1][0]
+
+
+def _runs(database, session_id: str, page_size: int) -> Iterator[TimelineEvent]:
+    """Yield every recorded execution."""
+    after_id = 0
+    while True:
+        page = database.get_execution_page(session_id, after_id, page_size)
+        for _, record in page:
+            yield record.createdAt, "execution", record.model_dump()
+        if len(page) < page_size:
+            return
+        after_id = page[-1][0]
+
+
+def _order(event: TimelineEvent) -> tuple[int, float]:
+    """Sort by time; within a millisecond a run follows the revision it ran against."""
+    created_at, event_type, data = event
+    revision = data["revision"] or 0
+    return created_at, revision + 0.5 if event_type == "execution" else revision
+
+
+def timeline(database, session_id: str, page_size: int = REPLAY_PAGE_SIZE) -> Iterator[TimelineEvent]:
+    """Edits and runs of a session in time order, read lazily from storage."""
+    return heapq.merge(
+        _edits(database, session_id, page_size),
+        _runs(database, session_id, page_size),
+        key=_order,
+    )
@@ -0,0 +1,125 @@
+"""Compact encoding of code revisions: zlib-compressed keyframes and line deltas.
+
+Every ``REVISION_KEYFRAME_INTERVAL``-th revision of a session stores the full
+code; the revisions in between store a line-based delta against the previous
+revision. Reconstructing any revision therefore applies at most
+``REVISION_KEYFRAME_INTERVAL - 1`` deltas to the nearest keyframe.
+
+Deltas are computed while the session's write lock is held, so their cost
+is bounded: lines shared at the start and end are matched in linear time,
+and the changed middle is only diffed line by line when it is small
+(``difflib`` is quadratic on repeated lines); otherwise it is stored whole.
+
+Configuration:
+    REVISION_DIFF_MAX_CELLS: Largest product of the changed middle's line
+        counts (old x new) that is diffed line by line (default: 250000)
+    REVISION_KEYFRAME_INTERVAL: Revisions per keyframe (default: 20)
+    REVISION_MAX_PER_SESSION: Revisions kept per session; the oldest keyframe
+        group is pruned beyond this (default: 500)
+"""
+
+import difflib
+import json
+import os
+import zlib
+from typing import Union
+
+REVISION_KEYFRAME_INTERVAL = max(1, int(os.getenv("REVISION_KEYFRAME_INTERVAL", "20")))
+REVISION_MAX_PER_SESSION = max(
+    REVISION_KEYFRAME_INTERVAL * 2, int(os.getenv("REVISION_MAX_PER_SESSION", "500"))
+)
+
+REVISION_DIFF_MAX_CELLS = int(os.getenv("REVISION_DIFF_MAX_CELLS", "250000"))
+
+KEYFRAME = "keyframe"
+DELTA = "delta"
+
+# A delta is a list of ``[start, end]`` line ranges copied from the base
+# revision and strings inserted verbatim
+DeltaOp = Union[list[int], str]
+
+
+def make_delta(base: str, code: str) -> list[DeltaOp]:
+    """Line-based delta turning ``base`` into ``code``."""
+    base_lines = base.splitlines(keepends=True)
+    lines = code.splitlines(keepends=True)
+    limit = min(len(base_lines), len(lines))
+    prefix = 0
+    while prefix < limit and base_lines[prefix] == lines[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and base_lines[-1 - suffix] == lines[-1 - suffix]:
+        suffix += 1
+    base_end, end = len(base_lines) - suffix, len(lines) - suffix
+
+    ops: list[DeltaOp] = []
+    if prefix:
+        ops.append([0, prefix])
+    if (base_end - prefix) * (end - prefix) <= REVISION_DIFF_MAX_CELLS:
+        matcher = difflib.SequenceMatcher(
+            None, base_lines[prefix:base_end], lines[prefix:end], autojunk=False
+        )
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                ops.append([prefix + i1, prefix + i2])
+            elif j2 > j1:
+                ops.append("".join(lines[prefix + j1:prefix + j2]))
+    elif end > prefix:
+        ops.append("".join(lines[prefix:end]))
+    if suffix:
+        ops.append([base_end, len(base_lines)])
+    return ops
+
+
+def apply_delta(base: str, ops: list[DeltaOp]) -> str:
+    """Rebuild a revision from its base and delta."""
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in ops:
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(base_lines[op[0]:op[1]])
+    return "".join(parts)
+
+
+def encode_keyframe(code: str) -> bytes:
+    """Compress full code for a keyframe revision."""
+    return zlib.compress(code.encode("utf-8"))
+
+
+def encode_delta(base: str, code: str) -> bytes:
+    """Compress the delta from ``base`` to ``code``."""
+    return zlib.compress(json.dumps(make_delta(base, code), separators=(",", ":")).encode("utf-8"))
+
+
+class RevisionDecoder:
+    """Rebuilds successive revisions from rows read in revision order."""
+
+    def __init__(self):
+        self.code: str | None = None
+
+    def apply(self, kind: str, data: bytes) -> str:
+        """Decode the next revision and return its code."""
+        raw = zlib.decompress(data).decode("utf-8")
+        if kind == KEYFRAME:
+            self.code = raw
+        elif self.code is None:
+            raise ValueError("Revision chain does not start at a keyframe")
+        else:
+            self.code = apply_delta(self.code, json.loads(raw))
+        return self.code
+
+
+def reconstruct(chain: list[tuple[str, bytes]]) -> str:
+    """Rebuild the code of the last revision in ``chain``.
+
+    Args:
+        chain: (kind, data) pairs in revision order, starting at a keyframe
+    """
+    decoder = RevisionDecoder()
+    for kind, data in chain:
+        decoder.apply(kind, data)
+    if decoder.code is None:
+        raise ValueError("Empty revision chain")
+    return decoder.code
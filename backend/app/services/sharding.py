@@ -0,0 +1,106 @@
+"""Session-affinity sharding: map each session ID to an owner worker.
+
+A consistent-hash ring assigns every session to one worker, which then owns
+the session's hot in-memory state (presence, event streams). Adding or
+removing a worker only moves about ``1/N`` of the sessions.
+
+Configuration:
+    SHARD_NODES: Comma-separated base URLs of every worker (unset disables sharding)
+    SHARD_SELF: This worker's base URL (must be one of SHARD_NODES)
+    SHARD_MODE: ``forward`` (default, proxy to the owner; needs httpx) or
+        ``redirect`` (307 to the owner; SHARD_NODES must then be URLs clients can reach)
+    SHARD_VNODES: Virtual nodes per worker on the ring (default: 128)
+"""
+
+import bisect
+import hashlib
+import importlib.util
+import os
+from typing import Optional
+
+SHARD_MODES = ("redirect", "forward")
+
+
+def _hash(key: str) -> int:
+    """Stable 64-bit hash (Python's ``hash()`` is salted per process)."""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent-hash ring with virtual nodes."""
+
+    def __init__(self, nodes: list[str], vnodes: int = 128):
+        if not nodes:
+            raise ValueError("HashRing needs at least one node")
+        self.nodes = list(dict.fromkeys(nodes))
+        self.vnodes = vnodes
+        points = sorted(
+            (_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes)
+        )
+        self._hashes = [h for h, _ in points]
+        self._owners = [node for _, node in points]
+
+    def owner(self, key: str) -> str:
+        """Node owning a key: the first ring point clockwise from its hash."""
+        index = bisect.bisect(self._hashes, _hash(key))
+        return self._owners[index % len(self._owners)]
+
+
+class ShardMap:
+    """This worker's view of the ring."""
+
+    def __init__(
+        self,
+        nodes: Optional[list[str]] = None,
+        self_node: Optional[str] = None,
+        mode: str = "forward",
+        vnodes: int = 128,
+    ):
+        self.configure(nodes, self_node, mode, vnodes)
+
+    def configure(
+        self,
+        nodes: Optional[list[str]],
+        self_node: Optional[str] = None,
+        mode: str = "forward",
+        vnodes: int = 128,
+    ) -> None:
+        """Replace the ring (``nodes=None`` disables sharding)."""
+        if mode not in SHARD_MODES:
+            raise ValueError(f"Unknown SHARD_MODE: {mode!r}")
+        nodes = [n.rstrip("/") for n in nodes or [] if n.strip()]
+        if nodes and (self_node or "").rstrip("/") not in nodes:
+            raise ValueError("SHARD_SELF must be one of SHARD_NODES")
+        if len(nodes) > 1 and mode == "forward" and importlib.util.find_spec("httpx") is None:
+            raise ValueError("SHARD_MODE=forward needs httpx (install the sharding extra)")
+        self.ring = HashRing(nodes, vnodes) if nodes else None
+        self.self_node = self_node.rstrip("/") if nodes else None
+        self.mode = mode
+
+    @classmethod
+    def from_env(cls) -> "ShardMap":
+        """Build the shard map from the ``SHARD_*`` environment variables."""
+        nodes = os.getenv("SHARD_NODES", "")
+        return cls(
+            nodes.split(",") if nodes else None,
+            os.getenv("SHARD_SELF"),
+            os.getenv("SHARD_MODE", "forward").lower(),
+            int(os.getenv("SHARD_VNODES", "128")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """Whether more than one worker shares the sessions."""
+        return self.ring is not None and len(self.ring.nodes) > 1
+
+    def owner(self, session_id: str) -> Optional[str]:
+        """Base URL of the worker owning a session (None when sharding is off)."""
+        return self.ring.owner(session_id) if self.ring is not None else None
+
+    def is_local(self, session_id: str) -> bool:
+        """Whether this worker owns a session (always true when sharding is off)."""
+        return self.ring is None or self.ring.owner(session_id) == self.self_node
+
+
+# Global shard map
+shards = ShardMap.from_env()
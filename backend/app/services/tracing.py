@@ -0,0 +1,375 @@
+"""In-process request tracing with OpenTelemetry-compatible export.
+
+Spans are kept per trace and exported as one OTLP/JSON
+``ExportTraceServiceRequest`` line when the local root span ends, so the
+output of the file exporter can be shipped by an OpenTelemetry Collector
+(``otlpjsonfile`` receiver) without any SDK in the app process.
+
+Configuration:
+    TRACE_EXPORTER: ``console`` (stderr), ``file`` or unset to disable tracing
+    TRACE_FILE: Output path for the file exporter (default: traces.jsonl)
+    TRACE_SAMPLE_RATE: Fraction of new traces to record (default: 1.0)
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from typing import Any, Optional
+
+SERVICE_NAME = "code-collab-hub-api"
+SCOPE_NAME = "app.services.tracing"
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+# OTLP status codes
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_MAX_TRACE_ID = 2**64
+
+
+def _attribute_value(value: Any) -> dict:
+    """Encode an attribute value as an OTLP ``AnyValue``."""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class SpanExporter(ABC):
+    """Base class for span exporters."""
+
+    @abstractmethod
+    def export(self, spans: list["Span"]) -> None:
+        """Export the finished spans of one trace."""
+
+    @staticmethod
+    def encode(spans: list["Span"]) -> str:
+        """Encode spans as a single OTLP/JSON line."""
+        return json.dumps(
+            {
+                "resourceSpans": [
+                    {
+                        "resource": {
+                            "attributes": [
+                                {"key": "service.name", "value": {"stringValue": SERVICE_NAME}}
+                            ]
+                        },
+                        "scopeSpans": [
+                            {
+                                "scope": {"name": SCOPE_NAME},
+                                "spans": [span.to_otlp() for span in spans],
+                            }
+                        ],
+                    }
+                ]
+            },
+            separators=(",", ":"),
+        )
+
+
+class ConsoleSpanExporter(SpanExporter):
+    """Write traces to stderr as OTLP/JSON lines."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+        self._lock = threading.Lock()
+
+    def export(self, spans: list["Span"]) -> None:
+        line = self.encode(spans)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+class FileSpanExporter(SpanExporter):
+    """Append traces to a file as OTLP/JSON lines."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, spans: list["Span"]) -> None:
+        line = self.encode(spans)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Keep finished spans in memory (for tests)."""
+
+    def __init__(self):
+        self.spans: list[Span] = []
+
+    def export(self, spans: list["Span"]) -> None:
+        self.spans.extend(spans)
+
+    def clear(self) -> None:
+        """Forget all exported spans."""
+        self.spans.clear()
+
+
+class _Trace:
+    """Finished spans of a trace collected in this process."""
+
+    __slots__ = ("spans", "lock")
+
+    def __init__(self):
+        self.spans: list[Span] = []
+        self.lock = threading.Lock()
+
+
+class Span:
+    """A recorded span."""
+
+    __slots__ = (
+        "tracer", "name", "trace_id", "span_id", "parent_id", "kind",
+        "start_time", "end_time", "attributes", "status", "status_message",
+        "_trace", "_is_local_root", "_token",
+    )
+
+    recording = True
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        trace_id: int,
+        parent_id: Optional[int],
+        trace: _Trace,
+        is_local_root: bool,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[dict] = None,
+        start_time: Optional[int] = None,
+    ):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = random.getrandbits(64) or 1
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_time = start_time or time.time_ns()
+        self.end_time: Optional[int] = None
+        self.attributes = dict(attributes or {})
+        self.status = STATUS_UNSET
+        self.status_message = ""
+        self._trace = trace
+        self._is_local_root = is_local_root
+        self._token = None
+
+    @property
+    def traceparent(self) -> str:
+        """W3C ``traceparent`` header value for this span."""
+        return f"00-{self.trace_id:032x}-{self.span_id:016x}-01"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Set a span attribute."""
+        self.attributes[key] = value
+
+    def set_error(self, exc: BaseException) -> None:
+        """Mark the span as failed."""
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"
+
+    def end(self, end_time: Optional[int] = None) -> None:
+        """Finish the span, exporting the trace when the local root ends."""
+        if self.end_time is not None:
+            return
+        self.end_time = end_time or time.time_ns()
+        with self._trace.lock:
+            self._trace.spans.append(self)
+        if self._is_local_root:
+            self.tracer._export(self._trace.spans)
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc is not None:
+            self.set_error(exc)
+        _current_span.reset(self._token)
+        self.end()
+
+    def to_otlp(self) -> dict:
+        """Encode the span as an OTLP/JSON span."""
+        span = {
+            "traceId": f"{self.trace_id:032x}",
+            "spanId": f"{self.span_id:016x}",
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_time),
+            "endTimeUnixNano": str(self.end_time),
+            "attributes": [
+                {"key": k, "value": _attribute_value(v)} for k, v in self.attributes.items()
+            ],
+            "status": {"code": self.status},
+        }
+        if self.parent_id is not None:
+            span["parentSpanId"] = f"{self.parent_id:016x}"
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+class _NonRecordingSpan:
+    """Span returned when the trace is not sampled; every operation is a no-op."""
+
+    recording = False
+    traceparent = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_error(self, exc: BaseException) -> None:
+        pass
+
+    def end(self, end_time: Optional[int] = None) -> None:
+        pass
+
+    def __enter__(self) -> "_NonRecordingSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NON_RECORDING_SPAN = _NonRecordingSpan()
+
+# Span that new spans are parented to
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[tuple[int, int, bool]]:
+    """Parse a W3C ``traceparent`` header.
+
+    Returns:
+        Tuple of (trace_id, parent span_id, sampled) or None if invalid
+    """
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        trace_id = int(parts[1], 16)
+        span_id = int(parts[2], 16)
+        flags = int(parts[3][:2], 16)
+    except ValueError:
+        return None
+    if trace_id == 0 or span_id == 0:
+        return None
+    return trace_id, span_id, bool(flags & 1)
+
+
+class Tracer:
+    """Creates spans, applies sampling and hands finished traces to the exporter."""
+
+    def __init__(self, exporter: Optional[SpanExporter] = None, sample_rate: float = 1.0):
+        self.configure(exporter, sample_rate)
+
+    def configure(self, exporter: Optional[SpanExporter], sample_rate: float = 1.0) -> None:
+        """Replace the exporter and sample rate (``exporter=None`` disables tracing)."""
+        self.exporter = exporter
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        """Build a tracer from the ``TRACE_*`` environment variables."""
+        kind = os.getenv("TRACE_EXPORTER", "").lower()
+        if kind == "console":
+            exporter = ConsoleSpanExporter()
+        elif kind == "file":
+            exporter = FileSpanExporter(os.getenv("TRACE_FILE", "traces.jsonl"))
+        else:
+            exporter = None
+        return cls(exporter, float(os.getenv("TRACE_SAMPLE_RATE", "1.0")))
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any span can be recorded."""
+        return self.exporter is not None
+
+    def _should_sample(self, trace_id: int) -> bool:
+        """Trace-ID ratio sampling, consistent across services for the same trace."""
+        return (trace_id & (_MAX_TRACE_ID - 1)) < self.sample_rate * _MAX_TRACE_ID
+
+    def start_span(
+        self,
+        name: str,
+        attributes: Optional[dict] = None,
+        kind: int = SPAN_KIND_INTERNAL,
+        start_time: Optional[int] = None,
+    ):
+        """Start a child of the current span.
+
+        Outside a sampled trace this returns a shared no-op span, so
+        instrumented code costs one context variable lookup.
+        """
+        parent = _current_span.get()
+        if parent is None:
+            return NON_RECORDING_SPAN
+        return Span(
+            self, name, parent.trace_id, parent.span_id, parent._trace, False,
+            kind, attributes, start_time,
+        )
+
+    def start_trace(
+        self,
+        name: str,
+        traceparent: Optional[str] = None,
+        attributes: Optional[dict] = None,
+        kind: int = SPAN_KIND_SERVER,
+    ):
+        """Start a local root span, continuing an incoming W3C trace if given."""
+        if self.exporter is None:
+            return NON_RECORDING_SPAN
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id = random.getrandbits(128) or 1, None
+            sampled = self._should_sample(trace_id)
+        if not sampled:
+            return NON_RECORDING_SPAN
+        return Span(self, name, trace_id, parent_id, _Trace(), True, kind, attributes)
+
+    def record_span(
+        self, name: str, start_time: int, end_time: int, attributes: Optional[dict] = None
+    ) -> None:
+        """Record an already finished child span from measured timestamps."""
+        span = self.start_span(name, attributes, start_time=start_time)
+        span.end(end_time)
+
+    def _export(self, spans: list[Span]) -> None:
+        exporter = self.exporter
+        if exporter is None:
+            return
+        try:
+            exporter.export(list(spans))
+        except Exception:
+            # Tracing must never break a request
+            pass
+
+
+def current_span():
+    """Return the active span (or the no-op span)."""
+    return _current_span.get() or NON_RECORDING_SPAN
+
+
+# Global tracer
+tracer = Tracer.from_env()
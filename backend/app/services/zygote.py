@@ -0,0 +1,447 @@
+"""Fork server ("zygote") giving every Python execution a fresh interpreter.
+
+The zygote is a small single-threaded process started once per API worker.
+It imports the execution runtime, then forks one child per run, so each run
+gets a clean copy-on-write interpreter in about a millisecond instead of a
+full ``python`` boot, and nothing a candidate's code does can leak into the
+next run or into the API process.
+
+Protocol, over one Unix socket connection per run:
+    1. The caller sends the request as JSON and shuts down its write side
+    2. The forked child sends ``{"pid": ...}`` (so the caller can kill it)
+    3. The child sends the result as JSON and exits
+
+A ``{"kernel": <socket path>, "idle": <seconds>}`` request instead turns the
+child into a persistent kernel: it listens on its own socket, runs snippets
+sent there with the same protocol in one namespace that survives between
+them, and exits after ``idle`` seconds without a request.
+
+Every child gets an address-space limit, so a run or kernel fails with
+``MemoryError`` instead of exhausting the host, and a CPU-time limit backing
+up the caller's wall-clock kill (for kernels, counted from each snippet).
+
+This module runs as a plain script (``python -I zygote.py <socket>``) and
+must only import the standard library.
+
+Configuration:
+    EXECUTION_MEMORY_LIMIT: Address space of each run and kernel in bytes;
+        ``0`` disables (default: 512 MiB)
+"""
+
+import json
+import math
+import os
+import select
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+# Whether runs can be forked; elsewhere they execute in the calling process
+FORK_AVAILABLE = hasattr(os, "fork") and hasattr(socket, "AF_UNIX")
+# Read again by the zygote process, which inherits the worker's environment
+EXECUTION_MEMORY_LIMIT = int(os.getenv("EXECUTION_MEMORY_LIMIT", str(512 * 1024 * 1024)))
+
+
+def _elapsed_ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
+
+
+class OutputCapture:
+    """Printed output, kept in memory up to a preview size and spilled beyond.
+
+    The first ``preview_bytes`` stay in memory. Past that, everything
+    captured so far goes to ``spill_path`` (if given) and later output is
+    appended there, up to ``max_bytes`` in total; the rest is only counted.
+    """
+
+    def __init__(self, preview_bytes: int = 64 * 1024, max_bytes: int = 16 * 1024 * 1024,
+                 spill_path: Optional[str] = None):
+        self.preview_bytes = preview_bytes
+        self.max_bytes = max_bytes
+        self.spill_path = spill_path
+        self.total = 0  # Bytes produced, including any dropped
+        self._lines = 0
+        self._memory = bytearray()
+        self._spill = None
+
+    def print_line(self, text: str) -> None:
+        """Capture one printed line."""
+        data = (text if self._lines == 0 else "\n" + text).encode(errors="replace")
+        self._lines += 1
+        kept = self.total
+        self.total += len(data)
+        if kept >= self.max_bytes:
+            return
+        data = data[: self.max_bytes - kept]
+        if self._spill is None and kept + len(data) <= self.preview_bytes:
+            self._memory += data
+            return
+        if self._spill is None:
+            if self.spill_path is None:
+                self._memory += data[: max(0, self.preview_bytes - kept)]
+                return
+            self._spill = open(self.spill_path, "wb")
+            self._spill.write(self._memory)
+            self._memory = self._memory[: self.preview_bytes]
+        if len(self._memory) < self.preview_bytes:
+            self._memory += data[: self.preview_bytes - len(self._memory)]
+        self._spill.write(data)
+
+    @property
+    def spilled(self) -> bool:
+        """Whether the full output is in ``spill_path``."""
+        return self._spill is not None
+
+    def close(self) -> dict:
+        """Finish capturing; returns ``output`` (preview), ``outputBytes``,
+        ``truncated`` (the preview is not all of it) and ``spilled``."""
+        if self._spill is not None:
+            self._spill.close()
+        return {
+            "output": self._memory.decode(errors="ignore"),
+            "outputBytes": self.total,
+            "truncated": self.total > len(self._memory),
+            "spilled": self.spilled,
+        }
+
+
+def _sandbox_builtins(output: OutputCapture) -> dict:
+    """The only builtins sandboxed code can reach; ``print`` writes to ``output``."""
+    return {
+        "print": lambda *args, **kwargs: output.print_line(" ".join(str(arg) for arg in args)),
+        "len": len,
+        "range": range,
+        "str": str,
+        "int": int,
+        "float": float,
+        "list": list,
+        "dict": dict,
+        "tuple": tuple,
+        "set": set,
+        "sum": sum,
+        "max": max,
+        "min": min,
+    }
+
+
+def run_python(
+    code: str, namespace: Optional[dict] = None, output: Optional[OutputCapture] = None
+) -> dict:
+    """Execute Python code with restricted builtins and capture its output.
+
+    Note: This is a simplified sandbox. In production, use a proper sandbox
+    like RestrictedPython or Docker.
+
+    Args:
+        code: Python source
+        namespace: Module namespace kept between runs (kernels); a fresh one
+            is used if None
+        output: Where printed output goes (default: in memory, capped)
+
+    Returns:
+        Dict with ``error``, ``compileTime`` and ``runTime`` (milliseconds)
+        and the output fields of ``OutputCapture.close()``
+    """
+    if output is None:
+        output = OutputCapture()
+    result = {"error": None, "compileTime": None, "runTime": None}
+    try:
+        # Create a safe execution environment
+        if namespace is None:
+            scope_globals = {"__builtins__": _sandbox_builtins(output), "__name__": "__main__"}
+            scope_locals = {}
+        else:
+            namespace["__builtins__"] = _sandbox_builtins(output)
+            namespace.setdefault("__name__", "__main__")
+            scope_globals = scope_locals = namespace
+
+        # Compile separately so compile and run time can be told apart
+        phase_start = time.perf_counter()
+        compiled = compile(code, "<string>", "exec")
+        result["compileTime"] = _elapsed_ms(phase_start)
+
+        phase_start = time.perf_counter()
+        try:
+            exec(compiled, scope_globals, scope_locals)
+        finally:
+            result["runTime"] = _elapsed_ms(phase_start)
+
+        # Capture any returned values (assigned by this run, not an earlier one)
+        if "result" in scope_locals and "result" in compiled.co_names:
+            output.print_line(f"Result: {scope_locals['result']}")
+
+    except SyntaxError as e:
+        result["error"] = f"SyntaxError: {e.msg} (line {e.lineno})"
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {str(e)}\n{traceback.format_exc()}"
+    result.update(output.close())
+    return result
+
+
+def _read_request(conn: socket.socket) -> dict:
+    with conn.makefile("rb") as reader:
+        return json.loads(reader.read() or b"{}")
+
+
+def _run_snippet(conn: socket.socket, request: dict, namespace: Optional[dict] = None) -> None:
+    """Report the pid, run the request's code and reply with the result."""
+    conn.sendall(json.dumps({"pid": os.getpid()}).encode() + b"\n")
+    before = resource.getrusage(resource.RUSAGE_SELF) if resource is not None else None
+    result = run_python(request["code"], namespace, OutputCapture(**request.get("output", {})))
+    if before is not None:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        result["cpuUserTime"] = (usage.ru_utime - before.ru_utime) * 1000
+        result["cpuSystemTime"] = (usage.ru_stime - before.ru_stime) * 1000
+        result["maxrss"] = usage.ru_maxrss
+    conn.sendall(json.dumps(result).encode())
+
+
+def _limit_snippet_cpu(timeout: float) -> None:
+    """Let a kernel use at most ``timeout`` + 1 more CPU seconds (SIGXCPU kills it).
+
+    Only the soft limit moves, so the next snippet can raise it again.
+    """
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    limit = math.ceil(usage.ru_utime + usage.ru_stime + timeout) + 1
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (limit, hard))
+
+
+def _serve_kernel(conn: socket.socket, path: str, idle: float) -> None:
+    """Body of a kernel child: serve snippets on ``path`` until idle."""
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        listener.bind(path)
+    except OSError:
+        # Another worker started this session's kernel first
+        conn.sendall(json.dumps({"ready": False}).encode())
+        return
+    listener.listen(16)
+    conn.sendall(json.dumps({"ready": True}).encode())
+    conn.close()
+
+    namespace = {}
+    # Only runs count as use; liveness probes must not keep a kernel alive
+    deadline = time.monotonic() + idle
+    try:
+        while select.select([listener], [], [], max(0.0, deadline - time.monotonic()))[0]:
+            client, _ = listener.accept()
+            with client:
+                try:
+                    request = _read_request(client)
+                    if not request:
+                        continue  # A liveness probe (connect and close)
+                    if request.get("shutdown"):
+                        return
+                    if resource is not None:
+                        _limit_snippet_cpu(request["timeout"])
+                    _run_snippet(client, request, namespace)
+                    deadline = time.monotonic() + idle
+                except OSError:
+                    pass  # The caller gave up; keep the namespace for the next one
+    finally:
+        # Unlink first so new callers start a fresh kernel rather than queue here
+        os.unlink(path)
+        listener.close()
+
+
+def _run_child(conn: socket.socket) -> None:
+    """Body of a forked child: run one request, or become a kernel."""
+    request = _read_request(conn)
+    if resource is not None and EXECUTION_MEMORY_LIMIT > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (EXECUTION_MEMORY_LIMIT, EXECUTION_MEMORY_LIMIT))
+    if "kernel" in request:
+        _serve_kernel(conn, request["kernel"], request["idle"])
+        return
+    if resource is not None:
+        # Backstop for the caller's wall-clock kill
+        cpu_limit = int(request["timeout"]) + 1
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit))
+    _run_snippet(conn, request)
+
+
+def serve(path: str) -> None:
+    """Run the zygote: fork a child per connection until stdin closes."""
+    # Children are reaped by the kernel; callers get resource usage from the child
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(128)
+    run_python("pass")  # Warm the compiler and the runtime's code paths
+    sys.stdout.write("ready\n")
+    sys.stdout.flush()
+
+    try:
+        # The parent holds our stdin; EOF means it is gone
+        while True:
+            readable, _, _ = select.select([listener, sys.stdin], [], [])
+            if sys.stdin in readable and not os.read(sys.stdin.fileno(), 1024):
+                return
+            if listener not in readable:
+                continue
+            conn, _ = listener.accept()
+            pid = os.fork()
+            if pid == 0:
+                listener.close()
+                code = 0
+                try:
+                    _run_child(conn)
+                except BaseException:
+                    code = 1
+                finally:
+                    os._exit(code)
+            conn.close()
+    finally:
+        os.unlink(path)
+        os.rmdir(os.path.dirname(path))
+
+
+class ZygoteTimeout(Exception):
+    """Raised when a run exceeds its time limit (the child has been killed)."""
+
+
+class Zygote:
+    """Client for a zygote process, started on first use and restarted if it dies."""
+
+    def __init__(self):
+        self._proc: Optional[subprocess.Popen] = None
+        self._path: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the zygote process and wait until it accepts runs."""
+        with self._lock:
+            if self._proc is not None and self._proc.poll() is None:
+                return
+            if self._path is not None:
+                # Left behind by a zygote that was killed
+                shutil.rmtree(os.path.dirname(self._path), ignore_errors=True)
+            self._path = os.path.join(tempfile.mkdtemp(prefix="zygote-"), "zygote.sock")
+            # -I: the script's directory would otherwise shadow the standard library
+            self._proc = subprocess.Popen(
+                [sys.executable, "-I", os.path.abspath(__file__), self._path],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+            )
+            if self._proc.stdout.readline() != b"ready\n":
+                raise RuntimeError("Execution zygote failed to start")
+
+    def stop(self) -> None:
+        """Stop the zygote; runs already forked finish on their own."""
+        with self._lock:
+            if self._proc is None:
+                return
+            self._proc.stdin.close()
+            self._proc.wait()
+            self._proc = None
+
+    def _connect(self) -> socket.socket:
+        if self._proc is None or self._proc.poll() is not None:
+            self.start()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self._path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def run(self, code: str, timeout: float, output: Optional[dict] = None) -> dict:
+        """Execute code in a freshly forked interpreter.
+
+        Args:
+            code: Python source
+            timeout: Wall-clock limit in seconds
+            output: ``OutputCapture`` arguments (preview and spill limits)
+
+        Returns:
+            ``run_python``'s result plus ``spawnTime`` (ms from request to the
+            child running), ``cpuUserTime``/``cpuSystemTime`` (ms) and
+            ``maxrss`` where available
+
+        Raises:
+            ZygoteTimeout: If the run did not finish within ``timeout``
+        """
+        try:
+            sock = self._connect()
+        except OSError:
+            # The zygote died since the last run; start a new one
+            self.start()
+            sock = self._connect()
+        return call(sock, {"code": code, "timeout": timeout, "output": output or {}}, timeout)
+
+    def spawn_kernel(self, path: str, idle: float) -> bool:
+        """Fork a persistent kernel listening on ``path``.
+
+        Returns:
+            False if a kernel is already listening there
+        """
+        try:
+            sock = self._connect()
+        except OSError:
+            self.start()
+            sock = self._connect()
+        with sock:
+            sock.sendall(json.dumps({"kernel": path, "idle": idle}).encode())
+            sock.shutdown(socket.SHUT_WR)
+            sock.settimeout(10)
+            with sock.makefile("rb") as reader:
+                return json.loads(reader.read())["ready"]
+
+
+def call(sock: socket.socket, request: dict, timeout: float) -> dict:
+    """Send a run request over a connected socket and wait for its result.
+
+    Raises:
+        ZygoteTimeout: If there is no result within ``timeout`` seconds; the
+            process running the code has been killed
+        ConnectionError: If the process exited before reporting its pid
+    """
+    start = time.perf_counter()
+    deadline = time.monotonic() + timeout
+    with sock:
+        sock.settimeout(timeout)
+        sock.sendall(json.dumps(request).encode())
+        sock.shutdown(socket.SHUT_WR)
+        reader = sock.makefile("rb")
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("Execution process closed the connection")
+        pid = json.loads(line)["pid"]
+        spawn_time = _elapsed_ms(start)
+        try:
+            sock.settimeout(max(0.0, deadline - time.monotonic()))
+            data = reader.read()
+        except socket.timeout:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            raise ZygoteTimeout(f"Execution exceeded {timeout:g} seconds")
+    if not data:
+        raise RuntimeError("Execution process exited without a result")
+    result = json.loads(data)
+    result["spawnTime"] = spawn_time
+    return result
+
+
+# Per-process zygote used by the execution service
+zygote = Zygote()
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1])
@@ -0,0 +1,117 @@
+"""Static frontend serving with precompressed assets and cache headers.
+
+Build-time precompression (run once after ``npm run build``)::
+
+    python -m app.static ../frontend/dist
+"""
+
+import gzip
+import mimetypes
+import os
+import sys
+from pathlib import Path
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from app.middleware.compression import choose_encoding
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional speedup
+    brotli = None
+
+# Vite emits content-hashed file names under /assets, so they never change
+IMMUTABLE_PREFIX = "assets/"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Everything else (index.html, favicon, robots.txt) must be revalidated
+DEFAULT_CACHE_CONTROL = "no-cache"
+
+# Precompressed sibling suffix per content coding, in server preference order
+PRECOMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+COMPRESSIBLE_SUFFIXES = {".js", ".mjs", ".css", ".html", ".svg", ".json", ".txt", ".map", ".wasm", ".ico"}
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves ``.br``/``.gz`` siblings and sets cache headers."""
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        relative = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+        media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+        headers = {
+            "cache-control": (
+                IMMUTABLE_CACHE_CONTROL if relative.startswith(IMMUTABLE_PREFIX) else DEFAULT_CACHE_CONTROL
+            ),
+            "vary": "Accept-Encoding",
+        }
+
+        encoding = None
+        accept = request_headers.get("accept-encoding")
+        if accept and status_code == 200:
+            # Only offer codings that actually have a sibling file on disk
+            available = tuple(
+                coding for coding, suffix in PRECOMPRESSED_SUFFIXES.items()
+                if os.path.isfile(f"{full_path}{suffix}")
+            )
+            encoding = choose_encoding(accept, available) if available else None
+
+        if encoding is not None:
+            compressed_path = f"{full_path}{PRECOMPRESSED_SUFFIXES[encoding]}"
+            response = FileResponse(
+                compressed_path,
+                status_code=status_code,
+                media_type=media_type,
+                headers={**headers, "content-encoding": encoding},
+                stat_result=os.stat(compressed_path),
+            )
+        else:
+            response = FileResponse(
+                full_path,
+                status_code=status_code,
+                media_type=media_type,
+                headers=headers,
+                stat_result=stat_result,
+            )
+
+        if self.is_not_modified(response.headers, request_headers):
+            return Response(status_code=304, headers={
+                k: v for k, v in response.headers.items()
+                if k in ("cache-control", "etag", "last-modified", "vary", "content-location")
+            })
+        return response
+
+
+def precompress(directory: str | Path, min_size: int = 1024) -> list[Path]:
+    """Write ``.gz`` (and ``.br`` when brotli is installed) next to compressible files.
+
+    Returns:
+        Paths of the files written
+    """
+    written = []
+    for path in sorted(Path(directory).rglob("*")):
+        if not path.is_file() or path.suffix not in COMPRESSIBLE_SUFFIXES:
+            continue
+        data = path.read_bytes()
+        if len(data) < min_size:
+            continue
+        outputs = {".gz": gzip.compress(data, 9, mtime=0)}
+        if brotli is not None:
+            outputs[".br"] = brotli.compress(data, quality=11)
+        for suffix, compressed in outputs.items():
+            if len(compressed) < len(data):
+                target = path.with_name(path.name + suffix)
+                target.write_bytes(compressed)
+                written.append(target)
+    return written
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else "frontend/dist"
+    files = precompress(target)
+    print(f"Precompressed {len(files)} files in {target}")
@@ -0,0 +1 @@
+"""Performance benchmarks (not collected by the default test run)."""
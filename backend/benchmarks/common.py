@@ -0,0 +1,141 @@
+"""Shared helpers for benchmarks: percentiles, result files and server boot."""
+
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Optional
+from urllib.error import URLError
+from urllib.request import urlopen
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = BACKEND_DIR / "benchmarks" / "results"
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: list[float]) -> dict:
+    """Summarize latencies (seconds) as milliseconds percentiles."""
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "mean_ms": (sum(values) / len(values) * 1000) if values else 0.0,
+        "p50_ms": percentile(values, 0.50) * 1000,
+        "p95_ms": percentile(values, 0.95) * 1000,
+        "p99_ms": percentile(values, 0.99) * 1000,
+        "max_ms": (values[-1] * 1000) if values else 0.0,
+    }
+
+
+def git_commit() -> Optional[str]:
+    """Return the current git commit hash, if available."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> dict:
+    """Describe the machine a benchmark ran on."""
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def save_results(name: str, results: dict, output: Optional[str] = None) -> Path:
+    """Write results as JSON, by default to ``benchmarks/results/<name>-<commit>.json``."""
+    if output:
+        path = Path(output)
+    else:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        commit = results.get("environment", {}).get("commit") or "nocommit"
+        path = RESULTS_DIR / f"{name}-{commit}.json"
+    path.write_text(json.dumps(results, indent=2, sort_keys=True))
+    return path
+
+
+def compare_results(baseline: dict, current: dict, metric: str = "p95_ms") -> list[str]:
+    """Render per-key deltas of ``metric`` between two result files."""
+    lines = [f"{'key':<48} {'baseline':>10} {'current':>10} {'change':>8}"]
+    base_rows = baseline.get("routes") or baseline.get("benchmarks") or {}
+    rows = current.get("routes") or current.get("benchmarks") or {}
+    for key in sorted(set(base_rows) | set(rows)):
+        old = base_rows.get(key, {}).get(metric)
+        new = rows.get(key, {}).get(metric)
+        if old is None or new is None:
+            lines.append(f"{key:<48} {old if old is not None else '-':>10} "
+                         f"{new if new is not None else '-':>10} {'n/a':>8}")
+            continue
+        change = ((new - old) / old * 100) if old else 0.0
+        lines.append(f"{key:<48} {old:>10.3f} {new:>10.3f} {change:>+7.1f}%")
+    return lines
+
+
+def free_port() -> int:
+    """Pick a free TCP port on localhost."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def run_server(
+    database_url: str, port: Optional[int] = None, extra_env: Optional[dict] = None
+) -> Iterator[str]:
+    """Boot the API with uvicorn in a subprocess and yield its base URL."""
+    port = port or free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        # Load generators hammer one client address; measure the app, not the limiter
+        "RATE_LIMIT_ENABLED": "0",
+        **(extra_env or {}),
+    }
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app:create_app", "--factory",
+            "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"Server exited with code {proc.returncode}")
+            try:
+                with urlopen(f"{base_url}/api/v1/health", timeout=1):
+                    break
+            except (URLError, OSError):
+                if time.monotonic() > deadline:
+                    raise RuntimeError("Server did not become healthy within 30 s")
+                time.sleep(0.1)
+        yield base_url
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
@@ -0,0 +1,70 @@
+"""Fixtures for microbenchmarks (run with ``pytest benchmarks/``)."""
+
+import os
+import tempfile
+
+# Point the app's global Database at a scratch SQLite file unless the caller
+# chose a database explicitly.
+_scratch_dir = tempfile.mkdtemp(prefix="cch-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_scratch_dir}/global.db")
+
+import pytest
+from nanoid import generate
+from app.models import User
+from app.models.orm import SessionModel, UserModel
+from app.services.database import Database
+
+ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyz"
+CODE_SIZES = {"1KB": 1024, "10KB": 10 * 1024, "100KB": 100 * 1024, "1MB": 1024 * 1024}
+USER_COUNTS = [0, 1, 10]
+
+
+def make_code(size: int) -> str:
+    """Build JavaScript-looking code of roughly ``size`` bytes."""
+    line = 'console.log("The quick brown fox jumps over the lazy dog");\n'
+    return (line * (size // len(line) + 1))[:size]
+
+
+def make_user(index: int = 0) -> User:
+    """Build a user with a unique ID."""
+    return User(
+        id=generate(alphabet=ALPHABET, size=8),
+        name=f"Bench{index}",
+        color="#22d3ee",
+        joinedAt=1702000000000,
+    )
+
+
+def make_session_model(code_size: int, user_count: int) -> SessionModel:
+    """Build a detached SessionModel, as loaded from the database."""
+    session = SessionModel(
+        id=generate(alphabet=ALPHABET, size=10),
+        code=make_code(code_size),
+        language="javascript",
+        status="active",
+        created_at=1702000000000,
+        updated_at=1702000000000,
+    )
+    session.users = [
+        UserModel(id=f"user{i:04d}", name=f"Bench{i}", color="#22d3ee", joined_at=1702000000000)
+        for i in range(user_count)
+    ]
+    return session
+
+
+@pytest.fixture(scope="session")
+def database():
+    """A Database on its own SQLite file (or ``BENCH_DATABASE_URL``)."""
+    url = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{_scratch_dir}/bench.db")
+    database = Database(url)
+    database.init()
+    database.clear()
+    yield database
+    database.clear()
+    database.engine.dispose()
+
+
+@pytest.fixture
+def new_session_id():
+    """Factory for fresh session IDs."""
+    return lambda: generate(alphabet=ALPHABET, size=10)
@@ -0,0 +1,73 @@
+"""Microbenchmarks for Database service methods.
+
+Run with:
+    pytest benchmarks/test_database.py --benchmark-autosave
+    pytest benchmarks/ --benchmark-compare
+"""
+
+import pytest
+from benchmarks.conftest import CODE_SIZES, USER_COUNTS, make_code, make_user
+
+
+@pytest.mark.benchmark(group="create_session")
+@pytest.mark.parametrize("code_size", CODE_SIZES)
+def test_create_session(benchmark, database, new_session_id, code_size):
+    code = make_code(CODE_SIZES[code_size])
+    benchmark(lambda: database.create_session(new_session_id(), "javascript", code, 1702000000000))
+
+
+@pytest.mark.benchmark(group="get_session_by_id")
+@pytest.mark.parametrize("user_count", USER_COUNTS)
+@pytest.mark.parametrize("code_size", CODE_SIZES)
+def test_get_session_by_id(benchmark, database, new_session_id, code_size, user_count):
+    session_id = new_session_id()
+    database.create_session(session_id, "javascript", make_code(CODE_SIZES[code_size]), 1702000000000)
+    for i in range(user_count):
+        database.add_user(session_id, make_user(i))
+
+    session = benchmark(database.get_session_by_id, session_id)
+    assert len(session.users) == user_count
+
+
+@pytest.mark.benchmark(group="update_session")
+@pytest.mark.parametrize("code_size", CODE_SIZES)
+def test_update_session(benchmark, database, new_session_id, code_size):
+    session_id = new_session_id()
+    database.create_session(session_id, "javascript", "", 1702000000000)
+    code = make_code(CODE_SIZES[code_size])
+    benchmark(database.update_session, session_id, code=code)
+
+
+@pytest.mark.benchmark(group="add_user")
+@pytest.mark.parametrize("user_count", USER_COUNTS)
+def test_add_user(benchmark, database, new_session_id, user_count):
+    session_id = new_session_id()
+    database.create_session(session_id, "javascript", make_code(1024), 1702000000000)
+    for i in range(user_count):
+        database.add_user(session_id, make_user(i))
+
+    def setup():
+        return (session_id, make_user()), {}
+
+    def add_then_remove(sid, user):
+        database.add_user(sid, user)
+        database.remove_user(sid, user.id)
+
+    # Each round adds a fresh user and removes it again to keep the session size fixed
+    benchmark.pedantic(add_then_remove, setup=setup, rounds=200)
+
+
+@pytest.mark.benchmark(group="remove_user")
+@pytest.mark.parametrize("user_count", USER_COUNTS[1:])
+def test_remove_user(benchmark, database, new_session_id, user_count):
+    session_id = new_session_id()
+    database.create_session(session_id, "javascript", make_code(1024), 1702000000000)
+    for i in range(user_count - 1):
+        database.add_user(session_id, make_user(i))
+
+    def setup():
+        user = make_user()
+        database.add_user(session_id, user)
+        return (session_id, user.id), {}
+
+    benchmark.pedantic(database.remove_user, setup=setup, rounds=200)
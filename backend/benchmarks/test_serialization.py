@@ -0,0 +1,72 @@
+"""Microbenchmarks for the session response path.
+
+Measures each stage of ORM -> ``to_dict()`` -> ``Session(**...)`` ->
+``jsonable_encoder`` -> JSON bytes separately and end to end, across code
+sizes and user counts, to show where per-request CPU goes. The
+``serialize:fast`` group is the path the session routes use
+(``model_construct`` + ``FastJSONResponse``); compare it with
+``serialize:full``.
+"""
+
+import json
+import pytest
+from fastapi.encoders import jsonable_encoder
+from app.models import Session
+from app.responses import FastJSONResponse
+from app.services.database import _session_from_model
+from benchmarks.conftest import CODE_SIZES, USER_COUNTS, make_session_model
+
+CASES = [(size, users) for size in CODE_SIZES for users in USER_COUNTS]
+IDS = [f"{size}-{users}users" for size, users in CASES]
+
+
+def _dumps(content) -> bytes:
+    """Encode like ``JSONResponse.render``."""
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+@pytest.mark.benchmark(group="serialize:to_dict")
+@pytest.mark.parametrize("code_size,user_count", CASES, ids=IDS)
+def test_to_dict(benchmark, code_size, user_count):
+    model = make_session_model(CODE_SIZES[code_size], user_count)
+    benchmark(model.to_dict)
+
+
+@pytest.mark.benchmark(group="serialize:validate")
+@pytest.mark.parametrize("code_size,user_count", CASES, ids=IDS)
+def test_pydantic_validate(benchmark, code_size, user_count):
+    data = make_session_model(CODE_SIZES[code_size], user_count).to_dict()
+    benchmark(lambda: Session(**data))
+
+
+@pytest.mark.benchmark(group="serialize:encode")
+@pytest.mark.parametrize("code_size,user_count", CASES, ids=IDS)
+def test_jsonable_encoder(benchmark, code_size, user_count):
+    session = Session(**make_session_model(CODE_SIZES[code_size], user_count).to_dict())
+    benchmark(jsonable_encoder, session)
+
+
+@pytest.mark.benchmark(group="serialize:dumps")
+@pytest.mark.parametrize("code_size,user_count", CASES, ids=IDS)
+def test_json_dumps(benchmark, code_size, user_count):
+    content = jsonable_encoder(
+        Session(**make_session_model(CODE_SIZES[code_size], user_count).to_dict())
+    )
+    benchmark(_dumps, content)
+
+
+@pytest.mark.benchmark(group="serialize:full")
+@pytest.mark.parametrize("code_size,user_count", CASES, ids=IDS)
+def test_full_response_path(benchmark, code_size, user_count):
+    model = make_session_model(CODE_SIZES[code_size], user_count)
+    benchmark(lambda: _dumps(jsonable_encoder(Session(**model.to_dict()))))
+
+
+@pytest.mark.benchmark(group="serialize:fast")
+@pytest.mark.parametrize("code_size,user_count", CASES, ids=IDS)
+def test_fast_response_path(benchmark, code_size, user_count):
+    model = make_session_model(CODE_SIZES[code_size], user_count)
+    response = FastJSONResponse({})
+    benchmark(lambda: response.render(_session_from_model(model).model_dump()))
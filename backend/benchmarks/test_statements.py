@@ -0,0 +1,71 @@
+"""Per-query CPU overhead of building ORM queries vs reusing cached statements.
+
+Each pair runs the same lookup on one open connection, so the difference is
+the Python-side cost of building, cache-keying and compiling the query.
+
+Run with:
+    pytest benchmarks/test_statements.py --benchmark-group-by=group
+"""
+
+import pytest
+from app.models.orm import SessionModel, UserModel, session_users
+from app.services.database import _SESSION_BY_ID, _USER_IN_SESSION
+from benchmarks.conftest import make_code, make_user
+
+
+@pytest.fixture
+def seeded(database, new_session_id):
+    """A session with one user, and an open ORM session to query it with."""
+    session_id = new_session_id()
+    user = make_user()
+    database.create_session(session_id, "javascript", make_code(1024), 1702000000000)
+    database.add_user(session_id, user)
+    db = database.get_session()
+    yield db, session_id, user.id
+    db.close()
+
+
+@pytest.mark.benchmark(group="session_by_id")
+def test_session_by_id_query_per_call(benchmark, seeded):
+    db, session_id, _ = seeded
+
+    def lookup():
+        db.expunge_all()
+        return db.query(SessionModel).filter(SessionModel.id == session_id).first()
+
+    assert benchmark(lookup).id == session_id
+
+
+@pytest.mark.benchmark(group="session_by_id")
+def test_session_by_id_cached_statement(benchmark, seeded):
+    db, session_id, _ = seeded
+
+    def lookup():
+        db.expunge_all()
+        return db.scalar(_SESSION_BY_ID, {"session_id": session_id})
+
+    assert benchmark(lookup).id == session_id
+
+
+@pytest.mark.benchmark(group="user_in_session")
+def test_user_in_session_query_per_call(benchmark, seeded):
+    """The previous implementation: load the session, then scan its users."""
+    db, session_id, user_id = seeded
+
+    def lookup():
+        db.expunge_all()
+        session = db.query(SessionModel).filter(SessionModel.id == session_id).first()
+        return next(u for u in session.users if u.id == user_id)
+
+    assert benchmark(lookup).id == user_id
+
+
+@pytest.mark.benchmark(group="user_in_session")
+def test_user_in_session_cached_statement(benchmark, seeded):
+    db, session_id, user_id = seeded
+
+    def lookup():
+        db.expunge_all()
+        return db.scalar(_USER_IN_SESSION, {"session_id": session_id, "user_id": user_id})
+
+    assert benchmark(lookup).id == user_id
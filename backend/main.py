@@ -1,4 +1,7 @@
-"""Entry point for the FastAPI application."""
+"""Development entry point with auto-reload.
+
+Production runs ``python -m app.server`` (see ``app/server.py``).
+"""
 
 import uvicorn
 
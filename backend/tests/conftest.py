@@ -4,6 +4,14 @@ import pytest
 from fastapi.testclient import TestClient
 from app import create_app
 from app.services import db
+from app.services.presence import presence
+from app.services.ratelimit import limiter
+
+
+@pytest.fixture(scope="session", autouse=True)
+def init_db():
+    """Create tables once (the app lifespan does this in production)."""
+    db.init()
 
 
 @pytest.fixture
@@ -15,7 +23,11 @@ def client():
 
 @pytest.fixture(autouse=True)
 def clear_db():
-    """Clear the database before each test."""
+    """Clear the database, presence and rate limits before each test."""
     db.clear()
+    presence.clear()
+    limiter.clear()
     yield
     db.clear()
+    presence.clear()
+    limiter.clear()
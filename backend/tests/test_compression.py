@@ -0,0 +1,103 @@
+"""Tests for response compression and precompressed static assets."""
+
+import gzip
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.middleware.compression import choose_encoding, available_encodings
+from app.static import PrecompressedStaticFiles, precompress
+
+
+class TestResponseCompression:
+    """Tests for API response compression."""
+
+    def test_large_session_response_is_compressed(self, client: TestClient):
+        """Test that responses above the threshold are gzip-compressed."""
+        code = "console.log('hello');\n" * 500
+        session_id = client.post("/api/v1/sessions", json={"code": code}).json()["id"]
+
+        response = client.get(
+            f"/api/v1/sessions/{session_id}", headers={"Accept-Encoding": "gzip"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert int(response.headers["content-length"]) < len(code)
+        assert response.json()["code"] == code
+
+    def test_small_response_is_not_compressed(self, client: TestClient):
+        """Test that responses below the threshold are sent as-is."""
+        response = client.get("/api/v1/health", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+
+    def test_brotli_preferred_when_available(self, client: TestClient):
+        """Test that brotli is used when installed and accepted."""
+        if "br" not in available_encodings():
+            pytest.skip("brotli not installed")
+        code = "print('hello')\n" * 500
+        session_id = client.post("/api/v1/sessions", json={"code": code}).json()["id"]
+
+        response = client.get(
+            f"/api/v1/sessions/{session_id}", headers={"Accept-Encoding": "gzip, br"}
+        )
+        assert response.headers["content-encoding"] == "br"
+
+    def test_choose_encoding_respects_q_values(self):
+        """Test Accept-Encoding negotiation."""
+        assert choose_encoding("gzip;q=1.0, br;q=0.5", ("br", "gzip")) == "gzip"
+        assert choose_encoding("br;q=0, gzip;q=0", ("br", "gzip")) is None
+        assert choose_encoding("*", ("gzip",)) == "gzip"
+        assert choose_encoding("identity", ("br", "gzip")) is None
+
+
+class TestPrecompressedStaticFiles:
+    """Tests for serving the built frontend."""
+
+    @pytest.fixture
+    def static_client(self, tmp_path):
+        """Client for an app serving a fake frontend build."""
+        (tmp_path / "assets").mkdir()
+        (tmp_path / "assets" / "index-abc123.js").write_text("console.log('app');\n" * 200)
+        (tmp_path / "index.html").write_text("<html>" + "<div></div>" * 200 + "</html>")
+        precompress(tmp_path)
+
+        app = FastAPI()
+        app.mount("/", PrecompressedStaticFiles(directory=str(tmp_path), html=True))
+        return TestClient(app)
+
+    def test_serves_precompressed_sibling(self, static_client: TestClient):
+        """Test that the .gz sibling is served with the original content type."""
+        response = static_client.get(
+            "/assets/index-abc123.js", headers={"Accept-Encoding": "gzip"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["content-type"].startswith("text/javascript")
+        assert response.text == "console.log('app');\n" * 200
+
+    def test_hashed_assets_are_immutable(self, static_client: TestClient):
+        """Test long-lived cache headers for /assets and revalidation for HTML."""
+        asset = static_client.get(
+            "/assets/index-abc123.js", headers={"Accept-Encoding": "identity"}
+        )
+        assert asset.headers["cache-control"] == "public, max-age=31536000, immutable"
+        assert "content-encoding" not in asset.headers
+
+        index = static_client.get("/")
+        assert index.headers["cache-control"] == "no-cache"
+
+    def test_not_modified(self, static_client: TestClient):
+        """Test conditional requests against the precompressed file."""
+        first = static_client.get("/assets/index-abc123.js", headers={"Accept-Encoding": "gzip"})
+        second = static_client.get(
+            "/assets/index-abc123.js",
+            headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]},
+        )
+        assert second.status_code == 304
+
+    def test_precompress_writes_gzip(self, tmp_path):
+        """Test that precompress writes valid gzip siblings."""
+        (tmp_path / "app.css").write_text("body { color: red; }\n" * 100)
+        precompress(tmp_path)
+        data = gzip.decompress((tmp_path / "app.css.gz").read_bytes())
+        assert data == (tmp_path / "app.css").read_bytes()
@@ -0,0 +1,204 @@
+"""Tests for the event bus backends."""
+
+import asyncio
+import json
+import os
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.services.events import (
+    InProcessEventBus,
+    LoopbackEventBus,
+    LoopbackHub,
+    PostgresEventBus,
+    bus,
+)
+from app.services.presence import PresenceRegistry
+
+
+class TestInProcessEventBus:
+    """Tests for single-worker delivery."""
+
+    def test_publish_reaches_session_subscribers_only(self):
+        """Test that events are delivered to subscribers of the same session."""
+
+        async def scenario():
+            event_bus = InProcessEventBus()
+            mine = event_bus.subscribe("sess000001")
+            other = event_bus.subscribe("sess000002")
+
+            event_bus.publish("sess000001", "session.updated", {"code": "x"})
+            event = await asyncio.wait_for(mine.get(), 1)
+            assert event == {"type": "session.updated", "sessionId": "sess000001", "data": {"code": "x"}}
+            assert other.queue.empty()
+
+        asyncio.run(scenario())
+
+    def test_listener_sees_every_session(self):
+        """Test that listeners receive events of all sessions."""
+        event_bus = InProcessEventBus()
+        seen = []
+        event_bus.add_listener(seen.append)
+        event_bus.publish("a", "user.joined", {})
+        event_bus.publish("b", "user.left", {})
+        assert [e["sessionId"] for e in seen] == ["a", "b"]
+
+
+class TestLoopbackEventBus:
+    """Tests for cross-worker delivery through the local stand-in."""
+
+    def test_event_from_one_worker_reaches_another(self):
+        """Test that a subscriber on worker B receives an event published on worker A."""
+
+        async def scenario():
+            hub = LoopbackHub()
+            worker_a, worker_b = LoopbackEventBus(hub), LoopbackEventBus(hub)
+            subscription = worker_b.subscribe("sess000001")
+
+            worker_a.publish("sess000001", "user.joined", {"id": "user0001"})
+            event = await asyncio.wait_for(subscription.get(), 1)
+            assert event["type"] == "user.joined"
+            assert event["data"] == {"id": "user0001"}
+
+        asyncio.run(scenario())
+
+    def test_presence_replicates_across_workers(self):
+        """Test that presence registries on separate workers converge."""
+        hub = LoopbackHub()
+        worker_a, worker_b = LoopbackEventBus(hub), LoopbackEventBus(hub)
+        registry_b = PresenceRegistry()
+        worker_b.add_listener(registry_b.apply_event)
+
+        worker_a.publish(
+            "sess000001",
+            "presence.updated",
+            {"userId": "user0001", "cursor": {"line": 1, "column": 2}, "selection": None, "lastSeen": 1},
+        )
+        assert [p.userId for p in registry_b.snapshot("sess000001")] == ["user0001"]
+
+        worker_a.publish("sess000001", "presence.left", {"userId": "user0001"})
+        assert registry_b.snapshot("sess000001") == []
+
+
+class TestSessionMutationEvents:
+    """Tests that session mutations are published on the bus."""
+
+    def test_mutations_publish_events(self, client: TestClient):
+        """Test update, join and leave events."""
+        seen = []
+        bus.add_listener(seen.append)
+        try:
+            session_id = client.post("/api/v1/sessions").json()["id"]
+            user_id = client.post(f"/api/v1/sessions/{session_id}/users").json()["id"]
+            client.patch(f"/api/v1/sessions/{session_id}", json={"code": "print(1)"})
+            client.delete(f"/api/v1/sessions/{session_id}/users/{user_id}")
+            client.delete(f"/api/v1/sessions/{session_id}")
+        finally:
+            bus._listeners.remove(seen.append)
+
+        types = [e["type"] for e in seen if not e["type"].startswith("presence.")]
+        assert types == ["user.joined", "session.updated", "user.left", "session.deleted"]
+        updated = next(e for e in seen if e["type"] == "session.updated")
+        assert updated["data"]["code"] == "print(1)"
+
+    def test_recorded_run_published(self, client: TestClient):
+        """Test that a run recorded in a session is pushed to its participants."""
+        session_id = client.post("/api/v1/sessions").json()["id"]
+        seen = []
+        bus.add_listener(seen.append)
+        try:
+            client.post(
+                "/api/v1/execute",
+                json={"code": "print(42)", "language": "python", "sessionId": session_id},
+            )
+        finally:
+            bus._listeners.remove(seen.append)
+
+        completed = [e for e in seen if e["type"] == "execution.completed"]
+        assert len(completed) == 1
+        assert completed[0]["sessionId"] == session_id
+        assert completed[0]["data"]["result"]["output"] == "42"
+
+
+class _FakeNotifyConnection:
+    """Stands in for a psycopg connection; ``execute`` raises while ``broken``."""
+
+    def __init__(self, sent: list, broken: bool = False):
+        self.sent = sent
+        self.broken = broken
+        self.closed = False
+
+    def execute(self, query, params):
+        if self.broken:
+            raise OSError("connection lost")
+        self.sent.append(params[1])
+
+    def close(self):
+        self.closed = True
+
+
+class TestPostgresEventBusPublisher:
+    """Tests for queued publishing, without a database."""
+
+    def test_publish_does_not_wait_for_the_database(self, monkeypatch):
+        """Test that publish returns while the connection is still being opened."""
+        sent, connecting = [], threading.Event()
+
+        def slow_connect():
+            connecting.wait(5)
+            return _FakeNotifyConnection(sent)
+
+        event_bus = PostgresEventBus("postgresql://localhost/unused")
+        monkeypatch.setattr(event_bus, "_connect", slow_connect)
+        start = time.perf_counter()
+        event_bus.publish("sess000001", "user.joined", {})
+        event_bus.publish("sess000001", "user.left", {})
+        assert time.perf_counter() - start < 0.5
+
+        connecting.set()
+        asyncio.run(event_bus.stop())
+        assert [json.loads(p)["type"] for p in sent] == ["user.joined", "user.left"]
+
+    def test_broken_connection_closed_before_reconnecting(self, monkeypatch):
+        """Test that a failed NOTIFY closes its connection and retries on a new one."""
+        sent = []
+        broken = _FakeNotifyConnection(sent, broken=True)
+        connections = iter([broken, _FakeNotifyConnection(sent)])
+        event_bus = PostgresEventBus("postgresql://localhost/unused")
+        monkeypatch.setattr(event_bus, "_connect", lambda: next(connections))
+
+        event_bus.publish("sess000001", "user.joined", {})
+        asyncio.run(event_bus.stop())
+        assert broken.closed
+        assert len(sent) == 1
+
+
+@pytest.mark.skipif(
+    not os.getenv("EVENT_BUS_TEST_URL"), reason="EVENT_BUS_TEST_URL (Postgres) not set"
+)
+class TestPostgresEventBus:
+    """Tests for LISTEN/NOTIFY delivery against a real Postgres."""
+
+    def test_notify_reaches_other_bus(self):
+        """Test that two buses on one database see each other's events."""
+
+        async def scenario():
+            url = os.environ["EVENT_BUS_TEST_URL"]
+            worker_a, worker_b = PostgresEventBus(url), PostgresEventBus(url)
+            await worker_b.start()
+            try:
+                subscription = worker_b.subscribe("sess000001")
+                await asyncio.sleep(0.5)
+                worker_a.publish("sess000001", "session.updated", {"code": "x"})
+                event = await asyncio.wait_for(subscription.get(), 5)
+                assert event["data"] == {"code": "x"}
+
+                worker_a.publish("sess000001", "session.updated", {"code": "x" * 10000})
+                event = await asyncio.wait_for(subscription.get(), 5)
+                assert event["truncated"] is True
+            finally:
+                await worker_a.stop()
+                await worker_b.stop()
+
+        asyncio.run(scenario())
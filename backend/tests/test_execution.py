@@ -1,5 +1,14 @@
 """Tests for code execution endpoints."""
 
+import multiprocessing
+import shutil
+import signal
+import socket
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
 import pytest
 from fastapi.testclient import TestClient
 
@@ -129,3 +138,348 @@ class TestExecuteCode:
         data = response.json()
         assert isinstance(data["executionTime"], (int, float))
         assert data["executionTime"] >= 0
+
+
+class TestExecutionTelemetry:
+    """Tests for per-phase execution telemetry."""
+
+    def test_python_telemetry_phases(self, client: TestClient):
+        """Test that Python runs report compile and run phases."""
+        response = client.post(
+            "/api/v1/execute",
+            json={"code": "print('Hello, World!')", "language": "python"},
+        )
+        assert response.status_code == 200
+
+        telemetry = response.json()["telemetry"]
+        assert telemetry["queueWaitTime"] >= 0
+        assert telemetry["compileTime"] >= 0
+        assert telemetry["runTime"] >= 0
+        assert telemetry["outputBytes"] == len("Hello, World!")
+
+    def test_javascript_telemetry_resource_usage(self, client: TestClient):
+        """Test that JavaScript runs report spawn, run and resource usage."""
+        response = client.post(
+            "/api/v1/execute",
+            json={"code": "console.log('Hello')", "language": "javascript"},
+        )
+        assert response.status_code == 200
+
+        data = response.json()
+        assert data["output"] == "Hello"
+        assert data["error"] is None
+        telemetry = data["telemetry"]
+        assert telemetry["spawnTime"] > 0
+        assert telemetry["runTime"] >= 0
+        assert telemetry["peakRssBytes"] > 0
+        assert telemetry["cpuUserTime"] >= 0
+        assert telemetry["outputBytes"] == 5
+
+    def test_telemetry_aggregated_in_metrics(self, client: TestClient):
+        """Test that executions show up in the metrics histograms."""
+        client.post(
+            "/api/v1/execute",
+            json={"code": "print(1)", "language": "python"},
+        )
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert 'execution_phase_seconds_count{language="python",phase="run"}' in response.text
+        assert "execution_queue_depth 0" in response.text
+
+
+class TestPythonZygote:
+    """Tests for Python runs forked from the zygote."""
+
+    def test_python_runs_in_forked_process(self, client: TestClient):
+        """Test that Python runs report fork latency and their own resource usage."""
+        response = client.post(
+            "/api/v1/execute",
+            json={"code": "print(sum(range(10)))", "language": "python"},
+        )
+        data = response.json()
+        assert data["output"] == "45"
+        assert data["telemetry"]["spawnTime"] > 0
+        assert data["telemetry"]["peakRssBytes"] > 0
+
+    def test_python_timeout_kills_run(self, client: TestClient, monkeypatch):
+        """Test that a run past the limit is killed and the next run is unaffected."""
+        monkeypatch.setattr("app.services.execution.PYTHON_TIMEOUT", 1)
+        response = client.post(
+            "/api/v1/execute",
+            json={"code": "while True:\n    pass", "language": "python"},
+        )
+        assert response.json()["error"] == "Execution timed out (1 second limit)"
+
+        response = client.post("/api/v1/execute", json={"code": "print(1)", "language": "python"})
+        assert response.json()["output"] == "1"
+
+    def test_python_memory_limited(self, client: TestClient):
+        """Test that a run allocating past the address-space limit fails with MemoryError."""
+        response = client.post(
+            "/api/v1/execute",
+            json={"code": "hog = 'x' * 1024 ** 3", "language": "python"},
+        )
+        assert response.json()["error"].startswith("MemoryError")
+
+    def test_zygote_restarted_after_crash(self, client: TestClient):
+        """Test that a dead zygote is replaced on the next run."""
+        from app.services.zygote import zygote
+
+        client.post("/api/v1/execute", json={"code": "print(1)", "language": "python"})
+        zygote._proc.kill()
+        zygote._proc.wait()
+
+        response = client.post("/api/v1/execute", json={"code": "print(2)", "language": "python"})
+        assert response.json()["output"] == "2"
+
+
+@pytest.fixture
+def small_outputs(monkeypatch):
+    """Shrink the inline preview and give spill files a private directory."""
+    from app.services.outputs import outputs
+
+    directory = Path(tempfile.mkdtemp(prefix="outputs-"))
+    monkeypatch.setattr(outputs, "directory", directory)
+    monkeypatch.setattr(outputs, "preview_bytes", 100)
+    monkeypatch.setattr(outputs, "max_bytes", 1000)
+    yield directory
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+class TestOutputCapture:
+    """Tests for bounded output previews and ranged retrieval."""
+
+    def test_capture_keeps_preview_and_spills_rest(self, tmp_path):
+        """Test that output past the preview goes to disk up to the cap."""
+        from app.services.zygote import OutputCapture
+
+        capture = OutputCapture(preview_bytes=10, max_bytes=25, spill_path=str(tmp_path / "out"))
+        for i in range(10):
+            capture.print_line(f"line{i}")
+        result = capture.close()
+
+        assert result["output"] == "line0\nline"
+        assert result["outputBytes"] == 59
+        assert result["truncated"] and result["spilled"]
+        assert (tmp_path / "out").read_bytes() == b"line0\nline1\nline2\nline3\nl"
+
+    def test_small_output_stays_in_memory(self, tmp_path):
+        """Test that output within the preview never touches the disk."""
+        from app.services.zygote import OutputCapture
+
+        capture = OutputCapture(preview_bytes=100, spill_path=str(tmp_path / "out"))
+        capture.print_line("hello")
+        result = capture.close()
+
+        assert result == {"output": "hello", "outputBytes": 5, "truncated": False, "spilled": False}
+        assert not (tmp_path / "out").exists()
+
+    @pytest.mark.parametrize(
+        "language,code",
+        [
+            ("python", "for i in range(100):\n    print(f'{i:04d}')"),
+            ("javascript", "for (let i = 0; i < 100; i++) console.log(String(i).padStart(4, '0'))"),
+        ],
+    )
+    def test_truncated_output_paged_by_range(self, client: TestClient, small_outputs, language, code):
+        """Test that a large output is previewed and readable in byte ranges."""
+        response = client.post("/api/v1/execute", json={"code": code, "language": language})
+        data = response.json()
+        assert data["output"].splitlines() == [f"{i:04d}" for i in range(20)]
+        assert data["outputTruncated"] is True
+        assert data["telemetry"]["outputBytes"] == 499
+
+        url = f"/api/v1/execute/outputs/{data['outputId']}"
+        response = client.get(url, params={"offset": 490, "length": 100})
+        assert response.status_code == 206
+        assert response.text == "0098\n0099"
+        assert response.headers["content-range"] == "bytes 490-498/499"
+
+        response = client.get(url, params={"length": 1000})
+        assert response.status_code == 200
+        assert response.text.splitlines() == [f"{i:04d}" for i in range(100)]
+
+        assert client.get(url, params={"offset": 499}).status_code == 416
+
+    def test_direct_javascript_writes_capped(self, client: TestClient, small_outputs):
+        """Test that writing to stdout and stderr around console.* stops at the cap."""
+        code = (
+            "for (let i = 0; i < 10000; i++) process.stdout.write('x'.repeat(100));\n"
+            "for (let i = 0; i < 10000; i++) process.stderr.write('y'.repeat(100));"
+        )
+        response = client.post("/api/v1/execute", json={"code": code, "language": "javascript"})
+        data = response.json()
+        assert data["output"] == "x" * 100
+        assert data["outputTruncated"] is True
+        assert data["telemetry"]["outputBytes"] == 1000
+        assert "EFBIG" not in (data["error"] or "")
+        assert len(data["error"]) <= 1000
+        assert (small_outputs / data["outputId"]).stat().st_size == 1000
+
+    def test_small_output_not_spilled(self, client: TestClient, small_outputs):
+        """Test that output within the preview is returned whole without an ID."""
+        response = client.post("/api/v1/execute", json={"code": "print('hi')", "language": "python"})
+        data = response.json()
+        assert data["output"] == "hi"
+        assert data["outputTruncated"] is False
+        assert data["outputId"] is None
+        assert list(small_outputs.iterdir()) == []
+
+    def test_unknown_output(self, client: TestClient):
+        """Test that an unknown or malformed output ID is not found."""
+        for output_id in ["x" * 22, "bad.id"]:
+            response = client.get(f"/api/v1/execute/outputs/{output_id}")
+            assert response.status_code == 404
+            assert response.json()["detail"]["error"] == "OUTPUT_NOT_FOUND"
+
+
+@pytest.fixture
+def kernel_dir(monkeypatch):
+    """Give the kernels a private directory (short enough for socket paths)."""
+    from app.services.kernels import kernels
+
+    directory = Path(tempfile.mkdtemp(prefix="kernels-"))
+    monkeypatch.setattr(kernels, "directory", directory)
+    monkeypatch.setattr(kernels, "idle_timeout", 10)
+    yield directory
+    for path in directory.glob("*.sock"):
+        kernels.stop(path.stem)
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def _persistent(client: TestClient, session_id: str, code: str):
+    return client.post(
+        "/api/v1/execute",
+        json={"code": code, "language": "python", "sessionId": session_id, "persistent": True},
+    )
+
+
+def _burn_cpu_after_limit(conn) -> None:
+    """Child process: use CPU as earlier snippets would, then run a snippet forever."""
+    from app.services.zygote import _limit_snippet_cpu
+
+    while time.process_time() < 1.5:
+        pass
+    _limit_snippet_cpu(1)
+    # Past timeout + 1 CPU seconds in total, but not since the snippet started
+    while time.process_time() < 2.5:
+        pass
+    conn.send("alive")
+    while True:
+        pass
+
+
+class TestSessionKernels:
+    """Tests for persistent per-session kernels."""
+
+    def test_namespace_kept_between_runs(self, client: TestClient, kernel_dir):
+        """Test that definitions from one persistent run are visible in the next."""
+        session_id = client.post("/api/v1/sessions").json()["id"]
+
+        first = _persistent(client, session_id, "def double(x):\n    return x * 2\ndata = range(5)").json()
+        assert first["error"] is None
+        assert first["telemetry"]["kernelStarted"] is True
+
+        second = _persistent(client, session_id, "print(sum(double(x) for x in data))").json()
+        assert second["output"] == "20"
+        assert second["telemetry"]["kernelStarted"] is False
+
+        # Plain runs stay isolated
+        response = client.post(
+            "/api/v1/execute",
+            json={"code": "print(data)", "language": "python", "sessionId": session_id},
+        )
+        assert "NameError" in response.json()["error"]
+
+    def test_kernel_memory_limited(self, client: TestClient, kernel_dir):
+        """Test that a kernel cannot allocate past the address-space limit and survives trying."""
+        session_id = client.post("/api/v1/sessions").json()["id"]
+        _persistent(client, session_id, "kept = 1")
+
+        response = _persistent(client, session_id, "hog = 'x' * 1024 ** 3").json()
+        assert response["error"].startswith("MemoryError")
+        assert _persistent(client, session_id, "print(kept)").json()["output"] == "1"
+
+    def test_kernel_cpu_limit_counts_from_each_snippet(self):
+        """Test that a snippet's CPU limit starts from what the kernel already used."""
+        context = multiprocessing.get_context("fork")
+        reader, writer = context.Pipe(duplex=False)
+        process = context.Process(target=_burn_cpu_after_limit, args=(writer,))
+        process.start()
+        process.join(30)
+        assert process.exitcode == -signal.SIGXCPU
+        assert reader.poll() and reader.recv() == "alive"
+
+    def test_reset_and_session_delete_stop_kernel(self, client: TestClient, kernel_dir):
+        """Test that resetting or deleting the session discards the kernel."""
+        session_id = client.post("/api/v1/sessions").json()["id"]
+        _persistent(client, session_id, "x = 1")
+
+        assert client.delete(f"/api/v1/execute/kernels/{session_id}").status_code == 204
+        assert client.delete(f"/api/v1/execute/kernels/{session_id}").status_code == 404
+        response = _persistent(client, session_id, "print(x)").json()
+        assert "NameError" in response["error"]
+        assert response["telemetry"]["kernelStarted"] is True
+
+        client.delete(f"/api/v1/sessions/{session_id}")
+        deadline = time.monotonic() + 5
+        while (kernel_dir / f"{session_id}.sock").exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert not (kernel_dir / f"{session_id}.sock").exists()
+
+    def test_kernels_capped_per_host(self, client: TestClient, kernel_dir, monkeypatch):
+        """Test that a new kernel beyond the cap is refused with 503."""
+        from app.services.kernels import kernels
+
+        monkeypatch.setattr(kernels, "max_kernels", 1)
+        first = client.post("/api/v1/sessions").json()["id"]
+        second = client.post("/api/v1/sessions").json()["id"]
+        assert _persistent(client, first, "x = 1").status_code == 200
+
+        response = _persistent(client, second, "x = 1")
+        assert response.status_code == 503
+        assert response.json()["detail"]["error"] == "KERNEL_LIMIT_REACHED"
+
+    def test_dead_kernel_sockets_not_counted(self, client: TestClient, kernel_dir, monkeypatch):
+        """Test that a socket left by a killed kernel is pruned instead of filling the cap."""
+        from app.services.kernels import kernels
+
+        monkeypatch.setattr(kernels, "max_kernels", 1)
+        stale = kernel_dir / "killed0001.sock"
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.bind(str(stale))  # Bound but nothing listens: a kernel that died
+        session_id = client.post("/api/v1/sessions").json()["id"]
+
+        assert _persistent(client, session_id, "x = 1").status_code == 200
+        assert not stale.exists()
+        # Counting probes the live kernel without ending it or resetting its idle clock
+        assert kernels.count() == 1
+        assert _persistent(client, session_id, "print(x)").json()["output"] == "1"
+
+    def test_concurrent_starts_respect_cap(self, client: TestClient, kernel_dir, monkeypatch):
+        """Test that simultaneous starts for different sessions cannot overshoot the cap."""
+        from app.services.kernels import KernelLimitReached, kernels
+
+        monkeypatch.setattr(kernels, "max_kernels", 1)
+        session_ids = [client.post("/api/v1/sessions").json()["id"] for _ in range(4)]
+
+        def start(session_id: str) -> bool:
+            try:
+                kernels.run(session_id, "x = 1", 10)
+                return True
+            except KernelLimitReached:
+                return False
+
+        with ThreadPoolExecutor(4) as pool:
+            assert sorted(pool.map(start, session_ids)) == [False, False, False, True]
+        assert kernels.count() == 1
+
+    def test_persistent_requires_python_session(self, client: TestClient):
+        """Test that persistent runs need an existing session and Python."""
+        assert _persistent(client, "missing", "x = 1").status_code == 404
+        session_id = client.post("/api/v1/sessions").json()["id"]
+        response = client.post(
+            "/api/v1/execute",
+            json={"code": "1", "language": "javascript", "sessionId": session_id, "persistent": True},
+        )
+        assert response.status_code == 400
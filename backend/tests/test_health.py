@@ -1,8 +1,12 @@
 """Tests for health check endpoint."""
 
+import time
 import pytest
 from fastapi.testclient import TestClient
 from datetime import datetime
+import app as app_module
+from app import create_app
+from app.services import db
 
 
 class TestHealthCheck:
@@ -32,3 +36,33 @@ class TestHealthCheck:
             datetime.fromisoformat(timestamp_str)
         except ValueError:
             pytest.fail("Timestamp is not valid ISO format")
+
+    def test_unhealthy_until_database_prepared(self, monkeypatch):
+        """Test that a worker starts with the database down and turns healthy once it answers."""
+        attempts = []
+
+        def init():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise OSError("connection refused")
+            db.ready = True
+
+        monkeypatch.setattr(db, "ready", False)
+        monkeypatch.setattr(db, "init", init)
+        monkeypatch.setattr(app_module, "DATABASE_INIT_WAIT", 0)
+
+        async def fast_retries(database):
+            await original(database, retry_interval=0.1)
+
+        original = app_module.prepare_database
+        monkeypatch.setattr(app_module, "prepare_database", fast_retries)
+        with TestClient(create_app()) as client:
+            response = client.get("/api/v1/health")
+            assert response.status_code == 503
+            assert response.json()["status"] == "starting"
+
+            deadline = time.monotonic() + 5
+            while client.get("/api/v1/health").status_code != 200:
+                assert time.monotonic() < deadline
+                time.sleep(0.05)
+        assert len(attempts) == 3
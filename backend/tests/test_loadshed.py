@@ -0,0 +1,101 @@
+"""Tests for adaptive concurrency limiting and load shedding."""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.middleware import LoadSheddingMiddleware
+from app.middleware.loadshed import AdaptiveConcurrencyLimit, request_priority
+
+
+def _saturated_app(inflight: int, limit: int = 10) -> tuple[FastAPI, AdaptiveConcurrencyLimit]:
+    limiter = AdaptiveConcurrencyLimit(initial=limit, min_limit=1, max_limit=limit)
+    limiter.inflight = inflight
+    app = FastAPI()
+
+    @app.get("/api/v1/sessions/{session_id}")
+    async def poll(session_id: str):
+        return {}
+
+    @app.patch("/api/v1/sessions/{session_id}")
+    async def edit(session_id: str):
+        return {}
+
+    @app.post("/api/v1/sessions/{session_id}/users")
+    async def join(session_id: str):
+        return {}
+
+    @app.get("/api/v1/health")
+    async def health():
+        return {}
+
+    app.add_middleware(LoadSheddingMiddleware, limiter=limiter)
+    return app, limiter
+
+
+class TestRequestPriority:
+    """Tests for request classification."""
+
+    def test_priorities(self):
+        """Test that polling is lowest, joins highest and streams are exempt."""
+        assert request_priority("GET", "/api/v1/sessions/abc") == "low"
+        assert request_priority("PATCH", "/api/v1/sessions/abc") == "normal"
+        assert request_priority("POST", "/api/v1/sessions/abc/users") == "high"
+        assert request_priority("GET", "/api/v1/health") == "critical"
+        assert request_priority("GET", "/api/v1/sessions/abc/events") is None
+        assert request_priority("GET", "/assets/index.js") is None
+
+
+class TestAdaptiveConcurrencyLimit:
+    """Tests for the gradient limit."""
+
+    def test_limit_shrinks_when_latency_rises(self):
+        """Test that sustained latency above the baseline lowers the limit."""
+        limiter = AdaptiveConcurrencyLimit(initial=100, min_limit=4, max_limit=200)
+        for _ in range(200):
+            limiter.try_acquire("normal")
+            limiter.release(0.01)
+        baseline_limit = limiter.limit
+
+        for _ in range(100):
+            limiter.try_acquire("normal")
+            limiter.release(0.5)
+        assert limiter.limit < baseline_limit / 2
+
+    def test_limit_grows_when_saturated_and_healthy(self):
+        """Test that a fully used limit grows while latency stays flat."""
+        limiter = AdaptiveConcurrencyLimit(initial=10, min_limit=4, max_limit=200)
+        for _ in range(50):
+            limiter.inflight = int(limiter.limit)
+            limiter.release(0.01)
+        assert limiter.limit > 20
+
+
+class TestLoadSheddingMiddleware:
+    """Tests for priority shedding."""
+
+    def test_polling_shed_before_writes_and_joins(self):
+        """Test that at 80% of the limit only polling GETs are rejected."""
+        app, _ = _saturated_app(inflight=8)
+        client = TestClient(app)
+
+        response = client.get("/api/v1/sessions/abc")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        assert response.json()["detail"]["error"] == "OVERLOADED"
+
+        assert client.patch("/api/v1/sessions/abc").status_code == 200
+        assert client.post("/api/v1/sessions/abc/users").status_code == 200
+
+    def test_only_critical_at_limit(self):
+        """Test that a full limit sheds everything except health checks."""
+        app, limiter = _saturated_app(inflight=10)
+        client = TestClient(app)
+        assert client.post("/api/v1/sessions/abc/users").status_code == 503
+        assert client.get("/api/v1/health").status_code == 200
+        assert limiter.inflight == 10
+
+    def test_shedding_is_counted(self, client: TestClient):
+        """Test that shed requests appear on /metrics."""
+        app, _ = _saturated_app(inflight=10)
+        TestClient(app).get("/api/v1/sessions/abc")
+        body = client.get("/metrics").text
+        assert 'load_shed_total{priority="low"}' in body
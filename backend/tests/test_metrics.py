@@ -0,0 +1,78 @@
+"""Tests for the metrics endpoint and registry."""
+
+import pytest
+from fastapi.testclient import TestClient
+from app.services.metrics import MetricsRegistry
+
+
+class TestMetricsEndpoint:
+    """Tests for the /metrics endpoint."""
+
+    def test_metrics_text_format(self, client: TestClient):
+        """Test that metrics are exposed in Prometheus text format."""
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "# TYPE execution_phase_seconds histogram" in response.text
+
+    def test_request_latency_by_route_template(self, client: TestClient):
+        """Test that request latency is labelled with the route template."""
+        session_id = client.post("/api/v1/sessions").json()["id"]
+        client.get(f"/api/v1/sessions/{session_id}")
+
+        text = client.get("/metrics").text
+        assert (
+            'http_request_duration_seconds_count{method="GET",'
+            'route="/api/v1/sessions/{session_id}",status="200"}'
+        ) in text
+        assert session_id not in text
+        assert 'http_requests_in_flight{method="GET"} 1' in text
+
+    def test_database_metrics(self, client: TestClient):
+        """Test per-method DB metrics and session/user gauges."""
+        session_id = client.post("/api/v1/sessions").json()["id"]
+        client.post(f"/api/v1/sessions/{session_id}/users", json={"name": "Alice"})
+
+        text = client.get("/metrics").text
+        assert 'db_operation_seconds_count{method="create_session"}' in text
+        assert 'db_queries_total{method="add_user"}' in text
+        assert "sessions_active 1" in text
+        assert "session_users_active 1" in text
+
+
+class TestMetricsRegistry:
+    """Tests for the metrics registry."""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test histogram rendering with cumulative buckets."""
+        registry = MetricsRegistry()
+        histogram = registry.histogram("latency_seconds", "Latency", ["route"], buckets=(0.1, 1))
+        histogram.observe(0.05, route="/a")
+        histogram.observe(0.5, route="/a")
+        histogram.observe(5, route="/a")
+
+        text = registry.render()
+        assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{route="/a",le="1"} 2' in text
+        assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+        assert 'latency_seconds_count{route="/a"} 3' in text
+
+    def test_counter_and_gauge(self):
+        """Test counter increments and scrape-time gauges."""
+        registry = MetricsRegistry()
+        counter = registry.counter("requests_total", "Requests", ["method"])
+        counter.inc(method="GET")
+        counter.inc(2, method="GET")
+        gauge = registry.gauge("queue_depth", "Depth")
+        gauge.set_function(lambda: 7)
+
+        text = registry.render()
+        assert 'requests_total{method="GET"} 3' in text
+        assert "queue_depth 7" in text
+
+    def test_labels_must_match(self):
+        """Test that mismatched labels are rejected."""
+        registry = MetricsRegistry()
+        counter = registry.counter("errors_total", "Errors", ["code"])
+        with pytest.raises(ValueError):
+            counter.inc(status="500")
@@ -0,0 +1,136 @@
+"""Tests for presence tracking and the session event stream."""
+
+import asyncio
+from time import time
+from fastapi.testclient import TestClient
+from app.routes.events import event_stream
+from app.services import db
+from app.services.events import bus
+from app.services.presence import presence, sweep_expired
+
+
+def _join(client: TestClient, name: str = "Alice") -> tuple[str, str]:
+    session_id = client.post("/api/v1/sessions").json()["id"]
+    user_id = client.post(f"/api/v1/sessions/{session_id}/users", json={"name": name}).json()["id"]
+    return session_id, user_id
+
+
+class TestPresence:
+    """Tests for presence heartbeats."""
+
+    def test_heartbeat_with_cursor(self, client: TestClient):
+        """Test that a heartbeat stores cursor and selection."""
+        session_id, user_id = _join(client)
+
+        response = client.put(
+            f"/api/v1/sessions/{session_id}/presence/{user_id}",
+            json={
+                "cursor": {"line": 2, "column": 5},
+                "selection": {
+                    "anchor": {"line": 2, "column": 0},
+                    "head": {"line": 2, "column": 5},
+                },
+            },
+        )
+        assert response.status_code == 200
+        assert response.json()["cursor"] == {"line": 2, "column": 5}
+
+        listed = client.get(f"/api/v1/sessions/{session_id}/presence").json()["presence"]
+        assert [p["userId"] for p in listed] == [user_id]
+        assert listed[0]["selection"]["anchor"] == {"line": 2, "column": 0}
+
+    def test_heartbeat_unknown_user(self, client: TestClient):
+        """Test heartbeating for a user who never joined."""
+        session_id = client.post("/api/v1/sessions").json()["id"]
+        response = client.put(f"/api/v1/sessions/{session_id}/presence/nobody12")
+        assert response.status_code == 404
+        assert response.json()["detail"]["error"] == "USER_NOT_FOUND"
+
+    def test_heartbeat_does_not_touch_session(self, client: TestClient):
+        """Test that cursor updates never modify the session row."""
+        session_id, user_id = _join(client)
+        before = client.get(f"/api/v1/sessions/{session_id}").json()
+
+        client.put(
+            f"/api/v1/sessions/{session_id}/presence/{user_id}",
+            json={"cursor": {"line": 9, "column": 9}},
+        )
+        assert client.get(f"/api/v1/sessions/{session_id}").json() == before
+
+    def test_leave_removes_presence(self, client: TestClient):
+        """Test that leaving the session drops presence."""
+        session_id, user_id = _join(client)
+        client.delete(f"/api/v1/sessions/{session_id}/users/{user_id}")
+        assert client.get(f"/api/v1/sessions/{session_id}/presence").json()["presence"] == []
+
+
+class TestPresenceExpiry:
+    """Tests for heartbeat expiry."""
+
+    def test_idle_user_removed_from_session(self, client: TestClient):
+        """Test that users who stop heartbeating are removed from session.users."""
+        session_id, idle_user = _join(client, "Idle")
+        active_user = client.post(
+            f"/api/v1/sessions/{session_id}/users", json={"name": "Active"}
+        ).json()["id"]
+
+        later = int(time() * 1000) + int(presence.timeout * 1000) + 1000
+        presence.heartbeat(session_id, active_user)
+        presence._sessions[session_id][active_user].lastSeen = later
+
+        removed = sweep_expired(db, now_ms=later)
+        assert removed == [(session_id, idle_user)]
+
+        users = client.get(f"/api/v1/sessions/{session_id}/users").json()["users"]
+        assert [u["id"] for u in users] == [active_user]
+
+    def test_user_left_published_once_by_competing_sweepers(self, client: TestClient, monkeypatch):
+        """Test that when two workers expire the same user only one announces it."""
+        session_id, idle_user = _join(client, "Idle")
+        published = []
+        monkeypatch.setattr(bus, "publish", lambda *event: published.append(event))
+        later = int(time() * 1000) + int(presence.timeout * 1000) + 1000
+
+        assert sweep_expired(db, now_ms=later) == [(session_id, idle_user)]
+        # The other worker's registry still holds the user's last heartbeat
+        presence.heartbeat(session_id, idle_user)
+        assert sweep_expired(db, now_ms=later) == []
+        departures = [e for e in published if e[1] in ("presence.left", "user.left")]
+        assert departures == [
+            (session_id, "presence.left", {"userId": idle_user}),
+            (session_id, "user.left", {"userId": idle_user}),
+        ]
+        assert not presence.is_tracked(session_id, idle_user)
+
+
+class TestEventStream:
+    """Tests for the Server-Sent Events stream."""
+
+    def test_unknown_session(self, client: TestClient):
+        """Test subscribing to a missing session."""
+        response = client.get("/api/v1/sessions/nonexistent/events")
+        assert response.status_code == 404
+
+    def test_presence_updates_are_pushed(self):
+        """Test that heartbeats fan out to subscribers."""
+
+        async def scenario():
+            subscription = bus.subscribe("sess000001")
+            disconnected = False
+
+            async def is_disconnected():
+                return disconnected
+
+            stream = event_stream("sess000001", subscription, is_disconnected)
+            snapshot = await stream.__anext__()
+            assert snapshot.startswith("event: presence.snapshot")
+
+            presence.heartbeat("sess000001", "user0001")
+            update = await asyncio.wait_for(stream.__anext__(), 1)
+            assert update.startswith("event: presence.updated")
+            assert '"userId":"user0001"' in update
+
+            await stream.aclose()
+            assert bus.subscriber_count("sess000001") == 0
+
+        asyncio.run(scenario())
@@ -0,0 +1,85 @@
+"""Tests for rate limiting."""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from app.services.ratelimit import (
+    DatabaseRateLimitBackend,
+    InMemoryRateLimitBackend,
+    RateLimit,
+)
+
+
+@pytest.fixture(params=["memory", "database"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryRateLimitBackend()
+    return DatabaseRateLimitBackend(create_engine(f"sqlite:///{tmp_path / 'limits.db'}"))
+
+
+class TestBackends:
+    """Tests for token-bucket semantics shared by every backend."""
+
+    def test_burst_then_refill(self, backend):
+        """Test that a full bucket allows a burst, then refills at the rate."""
+        limit = RateLimit(rate=2, burst=3)
+        assert [backend.acquire("k", limit, 100.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+
+        retry_after = backend.acquire("k", limit, 100.0)
+        assert retry_after == pytest.approx(0.5)
+
+        assert backend.acquire("k", limit, 100.5) == 0.0
+        assert backend.acquire("k", limit, 100.5) > 0
+
+    def test_keys_are_independent(self, backend):
+        """Test that buckets do not share tokens."""
+        limit = RateLimit(rate=1, burst=1)
+        assert backend.acquire("a", limit, 10.0) == 0.0
+        assert backend.acquire("b", limit, 10.0) == 0.0
+        assert backend.acquire("a", limit, 10.0) > 0
+
+
+class TestRateLimitConfig:
+    """Tests for limit configuration."""
+
+    def test_env_override(self, monkeypatch):
+        """Test RATE_LIMIT_<NAME>=rate/burst."""
+        monkeypatch.setenv("RATE_LIMIT_EXECUTE_CLIENT", "5/20")
+        assert RateLimit.from_env("execute_client", RateLimit(1, 1)) == RateLimit(5, 20)
+        assert RateLimit.from_env("other", RateLimit(1, 1)) == RateLimit(1, 1)
+
+    @pytest.mark.parametrize("value", ["0", "0/5", "-1/5", "inf", "2/0", "fast"])
+    def test_invalid_env_rejected(self, monkeypatch, value):
+        """Test that non-positive or malformed limits fail at startup, naming the variable."""
+        monkeypatch.setenv("RATE_LIMIT_EXECUTE_CLIENT", value)
+        with pytest.raises(ValueError, match="RATE_LIMIT_EXECUTE_CLIENT"):
+            RateLimit.from_env("execute_client", RateLimit(1, 1))
+
+
+class TestRateLimitedRoutes:
+    """Tests for 429 responses."""
+
+    def test_session_updates_limited_per_session(self, client: TestClient):
+        """Test that a session rejects updates beyond its burst with Retry-After."""
+        first = client.post("/api/v1/sessions").json()["id"]
+        second = client.post("/api/v1/sessions").json()["id"]
+
+        for attempt in range(200):
+            response = client.patch(f"/api/v1/sessions/{first}", json={"code": f"x = {attempt}"})
+            if response.status_code != 200:
+                break
+        # The burst (30) always fits; refill during the loop may allow a few more
+        assert attempt >= 30
+        assert response.status_code == 429
+        assert response.json()["detail"]["error"] == "RATE_LIMITED"
+        assert int(response.headers["retry-after"]) >= 1
+
+        # Another session has its own bucket
+        assert client.patch(f"/api/v1/sessions/{second}", json={"code": "z"}).status_code == 200
+
+    def test_execute_limited_per_session(self, client: TestClient):
+        """Test that runs recorded in one session share a bucket."""
+        session_id = client.post("/api/v1/sessions").json()["id"]
+        body = {"code": "1", "language": "python", "sessionId": session_id}
+        statuses = [client.post("/api/v1/execute", json=body).status_code for _ in range(6)]
+        assert statuses == [200] * 5 + [429]
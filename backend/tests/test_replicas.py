@@ -0,0 +1,110 @@
+"""Tests for read replica routing."""
+
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from app import create_app
+from app.models.orm import Base
+from app.services import db
+from app.services.database import Database, ReadRouting, Replica, reset_read_routing, route_reads
+
+
+def _replica(path) -> Replica:
+    """A SQLite file with the schema but none of the primary's rows (a lagging replica)."""
+    replica = Replica(f"sqlite:///{path}")
+    Base.metadata.create_all(replica.engine)
+    return replica
+
+
+@pytest.fixture
+def replicated_db(tmp_path):
+    """A primary with two empty replicas."""
+    database = Database(f"sqlite:///{tmp_path / 'primary.db'}")
+    database.init()
+    database.replicas = [_replica(tmp_path / "a.db"), _replica(tmp_path / "b.db")]
+    yield database
+
+
+class TestReplicaRouting:
+    """Tests for sending reads to replicas."""
+
+    def test_reads_go_to_replicas_and_writes_to_primary(self, replicated_db):
+        """Test that reads use the replicas (which lack the row), in turn."""
+        replicated_db.create_session("replica001", "python", "", int(time.time() * 1000))
+        assert replicated_db.get_session_by_id("replica001") is None
+        assert replicated_db.session_exists("replica001") is False
+
+        # Healthy replicas take turns
+        a, b = replicated_db.replicas
+        first = replicated_db._choose_replica()
+        assert [replicated_db._choose_replica() for _ in range(3)] == (
+            [b, a, b] if first is a else [a, b, a]
+        )
+
+    def test_reads_after_writes_pinned_to_primary(self, replicated_db):
+        """Test that a request reads its own writes and pinned requests read the primary."""
+        token = route_reads(ReadRouting())
+        try:
+            replicated_db.create_session("replica001", "python", "", int(time.time() * 1000))
+            assert replicated_db.get_session_by_id("replica001") is not None
+        finally:
+            reset_read_routing(token)
+
+        token = route_reads(ReadRouting(pinned=True))
+        try:
+            assert replicated_db.session_exists("replica001")
+        finally:
+            reset_read_routing(token)
+
+    def test_failed_replica_skipped_until_probe_succeeds(self, replicated_db, tmp_path, monkeypatch):
+        """Test that a broken replica falls back to the primary and leaves the rotation."""
+        broken = Replica(f"sqlite:///{tmp_path / 'missing' / 'x.db'}")
+        replicated_db.replicas = [broken]
+        replicated_db.create_session("replica001", "python", "", int(time.time() * 1000))
+
+        assert replicated_db.get_session_by_id("replica001") is not None  # Fallback
+        assert broken.down_until > 0
+        assert replicated_db._choose_replica() is None
+
+        # Once the retry interval passes the replica is probed in the background,
+        # one probe at a time, while reads stay on the primary
+        monkeypatch.setattr(broken, "down_until", time.monotonic() - 1)
+        assert replicated_db._choose_replica() is None
+        broken._prober.join()
+        assert broken.down_until > time.monotonic()
+
+        (tmp_path / "missing").mkdir()
+        monkeypatch.setattr(broken, "down_until", time.monotonic() - 1)
+        release = threading.Event()
+
+        def slow_probe():
+            release.wait()
+            return Replica.probe(broken)
+
+        monkeypatch.setattr(broken, "probe", slow_probe)
+        assert replicated_db._choose_replica() is None
+        prober = broken._prober
+        assert replicated_db._choose_replica() is None
+        assert broken._prober is prober  # Single flight
+        release.set()
+        prober.join()
+        assert broken.down_until == 0
+        assert replicated_db._choose_replica() is broken
+
+
+class TestReadYourWritesMiddleware:
+    """Tests for pinning a client to the primary over HTTP."""
+
+    def test_client_reads_own_write(self, tmp_path, monkeypatch):
+        """Test that the writing client reads the primary and others read the replica."""
+        monkeypatch.setattr(db, "replicas", [_replica(tmp_path / "replica.db")])
+        writer = TestClient(create_app())
+        response = writer.post("/api/v1/sessions")
+        assert "db_primary=1" in response.headers["set-cookie"]
+        session_id = response.json()["id"]
+
+        assert writer.get(f"/api/v1/sessions/{session_id}").status_code == 200
+        other = TestClient(create_app())
+        assert other.get(f"/api/v1/sessions/{session_id}").status_code == 404
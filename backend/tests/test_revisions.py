@@ -0,0 +1,192 @@
+"""Tests for code history revisions."""
+
+import json
+import multiprocessing
+import random
+import time
+from fastapi.testclient import TestClient
+from app.services import db, revisions
+from app.services.database import Database
+from app.services.replay import timeline
+
+
+def _create_with_edits(client: TestClient, versions: list[str]) -> str:
+    session_id = client.post(
+        "/api/v1/sessions", json={"language": "python", "code": versions[0]}
+    ).json()["id"]
+    for code in versions[1:]:
+        client.patch(f"/api/v1/sessions/{session_id}", json={"code": code})
+    return session_id
+
+
+class TestDeltaEncoding:
+    """Tests for the keyframe/delta encoding."""
+
+    def test_delta_round_trip(self):
+        """Test that applying a delta reproduces the new code."""
+        base = "def f():\n    return 1\n\nprint(f())\n"
+        code = "import math\n\ndef f():\n    return 2\n\nprint(f())"
+        chain = [
+            (revisions.KEYFRAME, revisions.encode_keyframe(base)),
+            (revisions.DELTA, revisions.encode_delta(base, code)),
+        ]
+        assert revisions.reconstruct(chain) == code
+
+    def test_delta_is_smaller_than_code(self):
+        """Test that a one-line edit of a large file stores a small delta."""
+        base = "".join(f"line_{i} = {i}\n" for i in range(2000))
+        code = base.replace("line_1000 = 1000", "line_1000 = -1")
+        assert len(revisions.encode_delta(base, code)) < 200
+
+    def test_delta_round_trip_random_edits(self, monkeypatch):
+        """Test deltas of edits at the edges, in the middle and past the diff budget."""
+        rng = random.Random(0)
+        cases = []
+        for _ in range(200):
+            base = "".join(rng.choice(["a\n", "b\n", "\n"]) for _ in range(rng.randrange(30)))
+            code = "".join(rng.choice(["a\n", "b\n", "c"]) for _ in range(rng.randrange(30)))
+            cases.append((base, code))
+        for cells in (revisions.REVISION_DIFF_MAX_CELLS, 0):
+            monkeypatch.setattr(revisions, "REVISION_DIFF_MAX_CELLS", cells)
+            for base, code in cases:
+                assert revisions.apply_delta(base, revisions.make_delta(base, code)) == code
+
+
+def _edit_session(database_url: str, session_id: str, worker: int) -> None:
+    """Child process: update a session's code repeatedly, as one worker would."""
+    database = Database(database_url)
+    for i in range(25):
+        database.update_session(session_id, code=f"# {worker}-{i}\n")
+
+
+class TestRevisions:
+    """Tests for the revision endpoints."""
+
+    def test_list_and_fetch(self, client: TestClient):
+        """Test that every code change is recorded and can be fetched."""
+        versions = ["a = 1\n", "a = 1\nb = 2\n", "a = 3\nb = 2\n"]
+        session_id = _create_with_edits(client, versions)
+        # Status-only updates do not create revisions
+        client.patch(f"/api/v1/sessions/{session_id}", json={"status": "completed"})
+
+        listed = client.get(f"/api/v1/sessions/{session_id}/revisions").json()["revisions"]
+        assert [r["revision"] for r in listed] == [1, 2, 3]
+        assert [r["keyframe"] for r in listed] == [True, False, False]
+
+        for number, code in enumerate(versions, start=1):
+            response = client.get(f"/api/v1/sessions/{session_id}/revisions/{number}")
+            assert response.status_code == 200
+            assert response.json()["code"] == code
+
+    def test_keyframe_interval(self, client: TestClient, monkeypatch):
+        """Test that keyframes are written every REVISION_KEYFRAME_INTERVAL revisions."""
+        monkeypatch.setattr(revisions, "REVISION_KEYFRAME_INTERVAL", 3)
+        versions = [f"x = {i}\n" for i in range(7)]
+        session_id = _create_with_edits(client, versions)
+
+        listed = db.list_revisions(session_id)
+        assert [r.revision for r in listed if r.keyframe] == [1, 4, 7]
+        assert db.get_revision_code(session_id, 6)[1] == versions[5]
+
+    def test_storage_is_bounded(self, client: TestClient, monkeypatch):
+        """Test that the oldest keyframe group is pruned beyond the limit."""
+        monkeypatch.setattr(revisions, "REVISION_KEYFRAME_INTERVAL", 3)
+        monkeypatch.setattr(revisions, "REVISION_MAX_PER_SESSION", 6)
+        versions = [f"x = {i}\n" for i in range(10)]
+        session_id = _create_with_edits(client, versions)
+
+        listed = db.list_revisions(session_id)
+        assert len(listed) <= 6
+        assert listed[0].keyframe
+        assert listed[-1].revision == 10
+        assert client.get(f"/api/v1/sessions/{session_id}/revisions/1").status_code == 404
+        assert db.get_revision_code(session_id, listed[0].revision)[1] == versions[listed[0].revision - 1]
+
+    def test_concurrent_updates_number_revisions_once(self, client: TestClient):
+        """Test that updates from several worker processes get consecutive revisions."""
+        session_id = _create_with_edits(client, [""])
+        with multiprocessing.get_context("spawn").Pool(4) as pool:
+            pool.starmap(_edit_session, [(db.database_url, session_id, w) for w in range(4)])
+
+        assert [r.revision for r in db.list_revisions(session_id)] == list(range(1, 102))
+
+    def test_pathological_edit_is_fast(self, client: TestClient):
+        """Test that diffing many repeated lines stays cheap under the write lock."""
+        session_id = _create_with_edits(client, ["x = 1\n" * 5000])
+        started = time.perf_counter()
+        for code in ["\n" * 20000, "x = 1\n\n" * 10000]:
+            response = client.patch(f"/api/v1/sessions/{session_id}", json={"code": code})
+            assert response.status_code == 200
+        assert time.perf_counter() - started < 2
+        assert db.get_revision_code(session_id, 3)[1] == "x = 1\n\n" * 10000
+
+    def test_unknown_session(self, client: TestClient):
+        """Test listing revisions of a missing session."""
+        response = client.get("/api/v1/sessions/nonexistent/revisions")
+        assert response.status_code == 404
+        assert response.json()["detail"]["error"] == "SESSION_NOT_FOUND"
+
+    def test_unknown_revision(self, client: TestClient):
+        """Test fetching a revision that was never recorded."""
+        session_id = _create_with_edits(client, ["a = 1\n"])
+        response = client.get(f"/api/v1/sessions/{session_id}/revisions/99")
+        assert response.status_code == 404
+        assert response.json()["detail"]["error"] == "REVISION_NOT_FOUND"
+
+
+def _parse_events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+class TestReplay:
+    """Tests for the replay stream."""
+
+    def test_replays_edits_and_runs_in_order(self, client: TestClient):
+        """Test that edits and recorded runs stream in time order."""
+        session_id = _create_with_edits(client, ["print(1)\n"])
+        client.post(
+            "/api/v1/execute",
+            json={"code": "print(1)\n", "language": "python", "sessionId": session_id},
+        )
+        client.patch(f"/api/v1/sessions/{session_id}", json={"code": "print(2)\n"})
+
+        response = client.get(f"/api/v1/sessions/{session_id}/replay?speed=0")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+
+        events = _parse_events(response.text)
+        assert [e[0] for e in events] == ["edit", "execution", "edit", "replay.end"]
+        assert events[1][1]["result"]["output"].strip() == "1"
+        assert events[1][1]["revision"] == 1
+        assert events[2][1]["code"] == "print(2)\n"
+
+    def test_timeline_reads_in_pages(self, client: TestClient, monkeypatch):
+        """Test that the timeline is fetched lazily page by page."""
+        monkeypatch.setattr(revisions, "REVISION_KEYFRAME_INTERVAL", 4)
+        versions = [f"x = {i}\n" for i in range(10)]
+        session_id = _create_with_edits(client, versions)
+
+        calls = []
+        original = db.get_revision_page
+
+        def counting_page(*args, **kwargs):
+            calls.append(args)
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(db, "get_revision_page", counting_page)
+        events = timeline(db, session_id, page_size=3)
+        first = next(events)
+        assert first[2]["code"] == versions[0]
+        assert len(calls) == 1
+
+        codes = [first[2]["code"]] + [e[2]["code"] for e in events]
+        assert codes == versions
+        assert len(calls) == 4
+
+    def test_unknown_session(self, client: TestClient):
+        """Test replaying a missing session."""
+        assert client.get("/api/v1/sessions/nonexistent/replay").status_code == 404
@@ -0,0 +1,197 @@
+"""Tests for the production launcher."""
+
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+import pytest
+from app.server import Supervisor, available_cpus, make_config, parse_args, worker_count
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Busy loop lasting a second or two, long enough to span a restart
+SLOW_CODE = "x = 0\nfor i in range(8000000):\n    x += i\nprint(x)"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def server(tmp_path):
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", "2", "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path / 'server.db'}"},
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            with urlopen(f"{base_url}/api/v1/health", timeout=1):
+                break
+        except (URLError, OSError):
+            assert proc.poll() is None and time.monotonic() < deadline, "server did not start"
+            time.sleep(0.1)
+    yield proc, base_url
+    if proc.poll() is None:
+        proc.kill()
+        proc.wait()
+
+
+def _execute(base_url: str, code: str) -> dict:
+    body = json.dumps({"code": code, "language": "python"}).encode()
+    request = Request(f"{base_url}/api/v1/execute", body, {"Content-Type": "application/json"})
+    with urlopen(request, timeout=60) as response:
+        return json.load(response)
+
+
+class TestLauncher:
+    """Tests for forked workers and graceful restarts."""
+
+    def test_rolling_restart_and_stop_keep_in_flight_executions(self, server):
+        """Test that SIGHUP and SIGTERM let a running execution finish."""
+        proc, base_url = server
+        results = []
+
+        def run():
+            results.append(_execute(base_url, SLOW_CODE))
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        time.sleep(0.3)
+        proc.send_signal(signal.SIGHUP)
+        thread.join(60)
+        assert results[0]["output"].strip() == "31999996000000"
+
+        # Restarted workers serve requests
+        assert _execute(base_url, "print(1)")["output"].strip() == "1"
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        time.sleep(0.3)
+        proc.send_signal(signal.SIGTERM)
+        thread.join(60)
+        assert results[1]["output"].strip() == "31999996000000"
+        assert proc.wait(timeout=30) == 0
+
+
+class TestProxyHeaders:
+    """Tests for client addresses behind a reverse proxy."""
+
+    def test_forwarded_for_trusted_from_configured_proxy(self):
+        """Test that X-Forwarded-For sets the client address only when the proxy is trusted."""
+        seen = []
+
+        async def app(scope, receive, send):
+            seen.append(scope["client"][0])
+
+        def client_of(peer: str) -> str:
+            config = make_config(app, parse_args(["--forwarded-allow-ips", "10.0.0.2"]))
+            config.load()
+            scope = {
+                "type": "http", "scheme": "http", "client": (peer, 5000),
+                "headers": [(b"x-forwarded-for", b"203.0.113.7")],
+            }
+            asyncio.run(config.loaded_app(scope, None, None))
+            return seen.pop()
+
+        assert client_of("10.0.0.2") == "203.0.113.7"
+        assert client_of("198.51.100.1") == "198.51.100.1"
+
+
+class TestWorkerCount:
+    """Tests for sizing the worker pool."""
+
+    def test_cgroup_quota_caps_cpus(self, tmp_path):
+        """Test that a cgroup v2 quota of 1.5 CPUs allows two workers at most."""
+        (tmp_path / "cpu.max").write_text("150000 100000\n")
+        assert available_cpus(str(tmp_path)) == min(2, len(os.sched_getaffinity(0)))
+
+        (tmp_path / "cpu.max").write_text("max 100000\n")
+        assert available_cpus(str(tmp_path)) == len(os.sched_getaffinity(0))
+
+    def test_cgroup_v1_quota(self, tmp_path):
+        """Test the cgroup v1 CFS quota files."""
+        (tmp_path / "cpu").mkdir()
+        (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("50000\n")
+        (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+        assert available_cpus(str(tmp_path)) == 1
+
+    def test_single_worker_without_shared_bus(self, monkeypatch):
+        """Test that workers only default to one per CPU when they share the event bus."""
+        monkeypatch.setenv("EVENT_BUS", "inprocess")
+        assert worker_count(None, 8) == 1
+        assert worker_count(3, 8) == 3  # Explicit counts are kept (with a warning)
+
+        monkeypatch.setenv("EVENT_BUS", "postgres")
+        assert worker_count(None, 8) == 8
+
+
+class _IdleWorkerSupervisor(Supervisor):
+    """Supervisor whose workers sleep and never report ready (no uvicorn)."""
+
+    def __init__(self):
+        super().__init__(None, None, workers=2, graceful_timeout=1)
+        self._write_fds: list[int] = []
+
+    def spawn(self) -> int:
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            time.sleep(30)
+            os._exit(0)
+        self.workers[pid] = read_fd
+        self._write_fds.append(write_fd)  # Held open so the pipe never reads EOF
+        return pid
+
+
+@pytest.fixture
+def supervisor():
+    supervisor = _IdleWorkerSupervisor()
+    yield supervisor
+    for pid in list(supervisor.workers) + list(supervisor.retiring):
+        try:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
+    for fd in supervisor._write_fds:
+        os.close(fd)
+
+
+class TestSupervisor:
+    """Tests for supervising workers while a successor boots."""
+
+    def test_crashed_worker_replaced_while_waiting(self, supervisor):
+        """Test that waiting for a new worker still reaps and replaces crashed ones."""
+        crashed = supervisor.spawn()
+        booting = supervisor.spawn()
+        os.kill(crashed, signal.SIGKILL)
+
+        assert supervisor.wait_ready(booting, timeout=1) is False
+        assert crashed not in supervisor.workers
+        assert booting in supervisor.workers
+        assert len(supervisor.workers) == 2
+
+    def test_shutdown_ends_wait(self, supervisor):
+        """Test that a pending SIGTERM stops the wait instead of blocking for the timeout."""
+        booting = supervisor.spawn()
+        supervisor._signals.append(signal.SIGTERM)
+        start = time.monotonic()
+        assert supervisor.wait_ready(booting, timeout=30) is False
+        assert time.monotonic() - start < 1
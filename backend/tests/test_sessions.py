@@ -2,6 +2,18 @@
 
 import pytest
 from fastapi.testclient import TestClient
+from app import dependencies
+from app.models import ExecutionResult
+from app.services import CodeExecutionService, db
+from app.services.database import SESSION_OUTPUT_PREVIEW
+
+ADMIN_HEADERS = {"Authorization": "Bearer test-admin-token"}
+
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    """Enable admin endpoints with a known token."""
+    monkeypatch.setattr(dependencies, "ADMIN_API_TOKEN", "test-admin-token")
 
 
 class TestCreateSession:
@@ -69,6 +81,58 @@ class TestGetSession:
         assert data["detail"]["error"] == "SESSION_NOT_FOUND"
         assert data["detail"]["statusCode"] == 404
 
+    def test_get_session_includes_last_execution(self, client: TestClient):
+        """Test that the latest run in a session is returned with the revision it ran on."""
+        session_id = client.post("/api/v1/sessions").json()["id"]
+        assert client.get(f"/api/v1/sessions/{session_id}").json()["lastExecution"] is None
+
+        client.patch(f"/api/v1/sessions/{session_id}", json={"code": "print(1)"})
+        for code in ["print(2)", "print(1)"]:
+            client.post(
+                "/api/v1/execute",
+                json={"code": code, "language": "python", "sessionId": session_id},
+            )
+
+        last = client.get(f"/api/v1/sessions/{session_id}").json()["lastExecution"]
+        assert last["result"]["output"] == "1"
+        assert last["revision"] == 2
+        assert last["language"] == "python"
+
+    def test_run_overlapping_edit_keeps_revision_that_ran(self, client: TestClient, monkeypatch):
+        """Test that an edit saved during a run does not become the run's revision."""
+        session_id = client.post("/api/v1/sessions", json={"code": "print(1)"}).json()["id"]
+        execute = CodeExecutionService.execute
+
+        async def edit_while_running(**kwargs):
+            db.update_session(session_id, code="print(2)")
+            return await execute(**kwargs)
+
+        monkeypatch.setattr(CodeExecutionService, "execute", edit_while_running)
+        # The first run is the saved code; the second is neither it nor the edit
+        for code, output, revision in [("print(1)", "1", 1), ("print(3)", "3", None)]:
+            client.post(
+                "/api/v1/execute",
+                json={"code": code, "language": "python", "sessionId": session_id},
+            )
+            last = client.get(f"/api/v1/sessions/{session_id}").json()["lastExecution"]
+            assert last["result"]["output"] == output
+            assert last["revision"] == revision
+
+    def test_last_execution_output_is_a_preview(self, client: TestClient):
+        """Test that polls and updates carry only the start of a large run's output."""
+        session_id = client.post("/api/v1/sessions").json()["id"]
+        result = ExecutionResult(output="x" * 100_000, error=None, executionTime=1.0)
+        db.record_execution(session_id, "python", result, 1702000000000)
+
+        for response in [
+            client.get(f"/api/v1/sessions/{session_id}"),
+            client.patch(f"/api/v1/sessions/{session_id}", json={"code": "print(1)"}),
+        ]:
+            last = response.json()["lastExecution"]
+            assert last["result"]["output"] == "x" * SESSION_OUTPUT_PREVIEW
+            assert last["result"]["outputTruncated"] is True
+            assert len(response.content) < 2 * SESSION_OUTPUT_PREVIEW
+
 
 class TestUpdateSession:
     """Tests for updating sessions."""
@@ -168,3 +232,117 @@ class TestDeleteSession:
         """Test deleting a non-existent session."""
         response = client.delete("/api/v1/sessions/nonexistent")
         assert response.status_code == 404
+
+
+class TestSessionSerialization:
+    """Tests for the fast session response path."""
+
+    def test_large_unicode_code_round_trip(self, client: TestClient):
+        """Test that large non-ASCII code survives the fast encoder unchanged."""
+        code = "print('héllo wörld — 你好')\n" * 5000
+        create_response = client.post(
+            "/api/v1/sessions", json={"language": "python", "code": code}
+        )
+        assert create_response.status_code == 201
+        assert create_response.headers["content-type"] == "application/json"
+        session_id = create_response.json()["id"]
+
+        response = client.get(f"/api/v1/sessions/{session_id}")
+        assert response.json()["code"] == code
+
+    def test_response_includes_users(self, client: TestClient):
+        """Test that users are serialized in session responses."""
+        session_id = client.post("/api/v1/sessions").json()["id"]
+        client.post(f"/api/v1/sessions/{session_id}/users", json={"name": "Alice"})
+
+        users = client.get(f"/api/v1/sessions/{session_id}").json()["users"]
+        assert [u["name"] for u in users] == ["Alice"]
+        assert set(users[0]) == {"id", "name", "color", "joinedAt"}
+
+
+class TestBulkCreate:
+    """Tests for bulk session creation."""
+
+    def test_bulk_create(self, client: TestClient):
+        """Test creating many sessions in one request."""
+        response = client.post(
+            "/api/v1/sessions/bulk",
+            json={"sessions": [{"language": "python", "code": f"print({i})"} for i in range(25)]},
+        )
+        assert response.status_code == 201
+        sessions = response.json()["sessions"]
+        assert len({s["id"] for s in sessions}) == 25
+        assert sessions[3]["code"] == "print(3)"
+
+        fetched = client.get(f"/api/v1/sessions/{sessions[3]['id']}").json()
+        assert fetched["language"] == "python"
+        assert fetched["code"] == "print(3)"
+
+    def test_bulk_create_limits(self, client: TestClient):
+        """Test that empty and oversized batches are rejected."""
+        assert client.post("/api/v1/sessions/bulk", json={"sessions": []}).status_code == 422
+        too_many = {"sessions": [{}] * 501}
+        assert client.post("/api/v1/sessions/bulk", json=too_many).status_code == 422
+
+
+class TestListSessions:
+    """Tests for the keyset-paginated session listing."""
+
+    def test_requires_admin_token(self, client: TestClient, monkeypatch):
+        """Test that the listing is closed without the admin token."""
+        client.post("/api/v1/sessions")
+        response = client.get("/api/v1/sessions")
+        assert response.status_code == 403
+        assert response.json()["detail"]["error"] == "ADMIN_API_DISABLED"
+
+        monkeypatch.setattr(dependencies, "ADMIN_API_TOKEN", "test-admin-token")
+        assert client.get("/api/v1/sessions").status_code == 401
+        wrong = client.get("/api/v1/sessions", headers={"Authorization": "Bearer nope"})
+        assert wrong.status_code == 401
+        assert wrong.headers["www-authenticate"] == "Bearer"
+        assert client.get("/api/v1/sessions", headers=ADMIN_HEADERS).status_code == 200
+
+    def test_pages_cover_every_session_once(self, client: TestClient, admin_token):
+        """Test walking all pages with the cursor."""
+        created = client.post("/api/v1/sessions/bulk", json={"sessions": [{}] * 12}).json()
+        expected = {s["id"] for s in created["sessions"]}
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            params = {"limit": 5} | ({"cursor": cursor} if cursor else {})
+            page = client.get("/api/v1/sessions", params=params, headers=ADMIN_HEADERS).json()
+            seen.extend(s["id"] for s in page["sessions"])
+            pages += 1
+            cursor = page["nextCursor"]
+            if cursor is None:
+                break
+        assert pages == 3
+        assert len(seen) == len(set(seen)) == 12
+        assert set(seen) == expected
+
+    def test_filters(self, client: TestClient, admin_token):
+        """Test status and updated_after filters."""
+        first = client.post("/api/v1/sessions").json()["id"]
+        second = client.post("/api/v1/sessions").json()["id"]
+        updated = client.patch(f"/api/v1/sessions/{second}", json={"status": "completed"})
+        assert updated.status_code == 200
+
+        completed = client.get(
+            "/api/v1/sessions", params={"status": "completed"}, headers=ADMIN_HEADERS
+        ).json()
+        assert [s["id"] for s in completed["sessions"]] == [second]
+
+        listing = client.get("/api/v1/sessions", headers=ADMIN_HEADERS).json()["sessions"]
+        first_updated = next(s["updatedAt"] for s in listing if s["id"] == first)
+        recent = client.get(
+            "/api/v1/sessions", params={"updated_after": first_updated}, headers=ADMIN_HEADERS
+        ).json()
+        assert first not in [s["id"] for s in recent["sessions"]]
+
+    def test_invalid_cursor(self, client: TestClient, admin_token):
+        """Test that a malformed cursor is rejected."""
+        response = client.get(
+            "/api/v1/sessions", params={"cursor": "not-a-cursor"}, headers=ADMIN_HEADERS
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"]["error"] == "INVALID_CURSOR"
@@ -0,0 +1,153 @@
+"""Tests for session-affinity sharding."""
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+from app.dependencies import rate_limited
+from app.middleware import ShardingMiddleware
+from app.services.sharding import HashRing, ShardMap
+
+NODES = ["http://worker-a:8000", "http://worker-b:8000", "http://worker-c:8000"]
+SESSION_IDS = [f"sess{i:06d}" for i in range(3000)]
+
+
+def _session_owned_by(shard_map: ShardMap, node: str) -> str:
+    return next(s for s in SESSION_IDS if shard_map.owner(s) == node)
+
+
+def _app(shard_map: ShardMap, transport=None) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/v1/sessions/{session_id}")
+    async def get_session(session_id: str):
+        return {"id": session_id, "servedBy": shard_map.self_node}
+
+    app.add_middleware(ShardingMiddleware, shard_map=shard_map, transport=transport)
+    return app
+
+
+class TestHashRing:
+    """Tests for the consistent-hash ring."""
+
+    def test_deterministic_and_balanced(self):
+        """Test that ownership is stable and roughly even."""
+        ring = HashRing(NODES)
+        assert [ring.owner(s) for s in SESSION_IDS] == [HashRing(NODES).owner(s) for s in SESSION_IDS]
+
+        counts = {node: 0 for node in NODES}
+        for session_id in SESSION_IDS:
+            counts[ring.owner(session_id)] += 1
+        assert min(counts.values()) > len(SESSION_IDS) / len(NODES) * 0.7
+
+    def test_adding_node_moves_few_sessions(self):
+        """Test that a new worker takes sessions only from existing owners, about 1/N of them."""
+        before = HashRing(NODES)
+        after = HashRing(NODES + ["http://worker-d:8000"])
+        moved = [s for s in SESSION_IDS if before.owner(s) != after.owner(s)]
+        assert all(after.owner(s) == "http://worker-d:8000" for s in moved)
+        assert len(moved) < len(SESSION_IDS) * 0.4
+
+    def test_self_must_be_a_node(self):
+        """Test that a worker outside the ring is rejected."""
+        with pytest.raises(ValueError):
+            ShardMap(NODES, "http://elsewhere:8000")
+
+
+class TestShardingMiddleware:
+    """Tests for routing requests to the owner worker."""
+
+    def test_owner_serves_locally(self):
+        """Test that the owner worker serves its own sessions."""
+        shard_map = ShardMap(NODES, NODES[0])
+        session_id = _session_owned_by(shard_map, NODES[0])
+        response = TestClient(_app(shard_map)).get(f"/api/v1/sessions/{session_id}")
+        assert response.status_code == 200
+        assert response.json()["servedBy"] == NODES[0]
+
+    def test_non_owner_redirects(self):
+        """Test that other workers redirect to the owner, keeping the query string."""
+        shard_map = ShardMap(NODES, NODES[0], mode="redirect")
+        session_id = _session_owned_by(shard_map, NODES[1])
+        response = TestClient(_app(shard_map)).get(
+            f"/api/v1/sessions/{session_id}?x=1", follow_redirects=False
+        )
+        assert response.status_code == 307
+        assert response.headers["location"] == f"{NODES[1]}/api/v1/sessions/{session_id}?x=1"
+
+    def test_non_owner_forwards(self):
+        """Test that the default forward mode proxies to the owner and marks the request."""
+        shard_map = ShardMap(NODES, NODES[0])
+        owner_map = ShardMap(NODES, NODES[1])
+        owner = TestClient(_app(owner_map))
+        seen_headers = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen_headers.append(request.headers)
+            upstream = owner.get(request.url.path, headers=dict(request.headers))
+            return httpx.Response(upstream.status_code, stream=httpx.ByteStream(upstream.content))
+
+        session_id = _session_owned_by(shard_map, NODES[1])
+        response = TestClient(_app(shard_map, httpx.MockTransport(handler))).get(
+            f"/api/v1/sessions/{session_id}"
+        )
+        assert response.status_code == 200
+        assert response.json()["servedBy"] == NODES[1]
+        assert seen_headers[0]["x-shard-forwarded"] == "1"
+
+    def test_forwarded_clients_keep_their_own_rate_limits(self):
+        """Test that the owner sees each forwarded client's address, not the forwarding worker's."""
+        shard_map = ShardMap(NODES, NODES[0])
+        owner_app = FastAPI()
+
+        @owner_app.get(
+            "/api/v1/sessions/{session_id}",
+            dependencies=[rate_limited("sharding_test_client", rate=0.001, burst=1)],
+        )
+        async def get_session(session_id: str):
+            return {"id": session_id}
+
+        # The owner trusts X-Forwarded-For from the forwarding worker on loopback
+        owner = TestClient(ProxyHeadersMiddleware(owner_app, "127.0.0.1"), client=("127.0.0.1", 50000))
+        seen_headers = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen_headers.append(request.headers)
+            upstream = owner.get(request.url.path, headers=dict(request.headers))
+            return httpx.Response(upstream.status_code, stream=httpx.ByteStream(upstream.content))
+
+        app = _app(shard_map, httpx.MockTransport(handler))
+        path = f"/api/v1/sessions/{_session_owned_by(shard_map, NODES[1])}"
+        first = TestClient(app, client=("203.0.113.1", 1234))
+        second = TestClient(app, client=("203.0.113.2", 1234))
+        assert first.get(path).status_code == 200
+        assert second.get(path).status_code == 200
+        assert first.get(path).status_code == 429
+        assert seen_headers[0]["x-forwarded-for"] == "203.0.113.1"
+
+        # An address added by an edge proxy is kept ahead of the peer's
+        first.get(path, headers={"X-Forwarded-For": "198.51.100.7"})
+        assert seen_headers[-1]["x-forwarded-for"] == "198.51.100.7, 203.0.113.1"
+
+    def test_client_closed_on_shutdown(self):
+        """Test that the proxy's HTTP client is closed when the app shuts down."""
+        shard_map = ShardMap(NODES, NODES[0])
+        transport = httpx.MockTransport(
+            lambda request: httpx.Response(200, stream=httpx.ByteStream(b"{}"))
+        )
+        app = _app(shard_map, transport)
+        with TestClient(app) as client:
+            client.get(f"/api/v1/sessions/{_session_owned_by(shard_map, NODES[1])}")
+            middleware = app.middleware_stack
+            while not isinstance(middleware, ShardingMiddleware):
+                middleware = middleware.app
+            proxy = middleware._client
+            assert proxy is not None and not proxy.is_closed
+        assert proxy.is_closed
+        assert middleware._client is None
+
+    def test_disabled_without_nodes(self, client: TestClient):
+        """Test that the default single-worker app serves every session."""
+        response = client.get("/api/v1/sessions/nonexistent")
+        assert response.status_code == 404
@@ -0,0 +1,114 @@
+"""Tests for the SQLite production profile."""
+
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import event, text
+from app.models import User
+from app.services.database import SQLITE_BUSY_TIMEOUT, Database, WriterQueue
+
+
+def _join_and_edit(database_url: str, worker: int) -> None:
+    """Child process: join the session and edit its code, in a database of its own."""
+    database = Database(database_url)
+    for i in range(30):
+        database.add_user("sqlite0001", User(id=f"user{worker}{i:03d}", name="u", color="#000000", joinedAt=0))
+        database.update_session("sqlite0001", code=f"# {worker}-{i}")
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    """A file-backed SQLite database of its own."""
+    database = Database(f"sqlite:///{tmp_path / 'profile.db'}")
+    database.init()
+    yield database
+    database.engine.dispose()
+
+
+class TestSQLiteProfile:
+    """Tests for SQLite pragmas and write serialization."""
+
+    def test_pragmas_applied_on_connect(self, sqlite_db):
+        """Test that every connection uses WAL, NORMAL sync and the busy timeout."""
+        with sqlite_db.engine.connect() as conn:
+            assert conn.scalar(text("PRAGMA journal_mode")) == "wal"
+            assert conn.scalar(text("PRAGMA synchronous")) == 1  # NORMAL
+            assert conn.scalar(text("PRAGMA busy_timeout")) == SQLITE_BUSY_TIMEOUT
+
+    def test_concurrent_updates_all_commit(self, sqlite_db):
+        """Test that writers from many threads queue up instead of failing as locked."""
+        sqlite_db.create_session("sqlite0001", "python", "", int(time.time() * 1000))
+
+        def update(worker: int):
+            for i in range(20):
+                sqlite_db.update_session("sqlite0001", code=f"# {worker}-{i}")
+                assert sqlite_db.get_session_by_id("sqlite0001") is not None
+
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(update, range(8)))
+
+        # The first revision plus one per update
+        assert sqlite_db.list_revisions("sqlite0001")[-1].revision == 161
+        assert not sqlite_db._writer._held
+
+    def test_concurrent_writers_across_processes(self, sqlite_db):
+        """Test that writers in separate processes take turns on the write lock.
+
+        The per-process writer slot cannot order them; each write transaction
+        starts with BEGIN IMMEDIATE, so reads inside it see every commit.
+        """
+        sqlite_db.create_session("sqlite0001", "python", "", int(time.time() * 1000))
+
+        with multiprocessing.get_context("spawn").Pool(4) as pool:
+            pool.starmap(_join_and_edit, [(sqlite_db.database_url, w) for w in range(4)])
+
+        assert sqlite_db.list_revisions("sqlite0001")[-1].revision == 121
+        assert len(sqlite_db.get_session_users("sqlite0001")) == 120
+
+    def test_write_transactions_begin_immediate(self, sqlite_db):
+        """Test that write methods lock the database when they begin and reads do not."""
+        statements = []
+        event.listen(sqlite_db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        sqlite_db.create_session("sqlite0001", "python", "", int(time.time() * 1000))
+        assert {s for s in statements if s.startswith("BEGIN")} == {"BEGIN IMMEDIATE"}
+
+        statements.clear()
+        sqlite_db.get_session_by_id("sqlite0001")
+        assert [s for s in statements if s.startswith("BEGIN")] == ["BEGIN"]
+
+
+class TestWriterQueue:
+    """Tests for the FIFO writer slot."""
+
+    def test_writers_served_in_arrival_order(self):
+        """Test that waiting writers get the slot in the order they asked."""
+        queue = WriterQueue()
+        queue.acquire(1)
+        order = []
+
+        def writer(n: int):
+            queue.acquire(5)
+            order.append(n)
+            queue.release()
+
+        threads = []
+        for n in range(5):
+            threads.append(threading.Thread(target=writer, args=(n,)))
+            threads[-1].start()
+            while len(queue._waiters) <= n:
+                time.sleep(0.001)
+        queue.release()
+        for thread in threads:
+            thread.join()
+        assert order == [0, 1, 2, 3, 4]
+
+    def test_acquire_times_out(self):
+        """Test that a writer gives up after the timeout and leaves the queue."""
+        queue = WriterQueue()
+        queue.acquire(1)
+        with pytest.raises(TimeoutError):
+            queue.acquire(0.05)
+        assert not queue._waiters
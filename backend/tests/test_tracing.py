@@ -0,0 +1,84 @@
+"""Tests for request tracing."""
+
+import pytest
+from fastapi.testclient import TestClient
+from app.services.tracing import tracer, InMemorySpanExporter, parse_traceparent
+
+
+@pytest.fixture
+def exporter():
+    """Record every trace into memory for the duration of a test."""
+    exporter = InMemorySpanExporter()
+    tracer.configure(exporter, sample_rate=1.0)
+    yield exporter
+    tracer.configure(None)
+
+
+class TestTracing:
+    """Tests for span creation across routes, DB and executor."""
+
+    def test_patch_session_span_breakdown(self, client: TestClient, exporter):
+        """Test that a PATCH produces handler, Database and SQL spans under one trace."""
+        session_id = client.post("/api/v1/sessions").json()["id"]
+        exporter.clear()
+
+        response = client.patch(f"/api/v1/sessions/{session_id}", json={"code": "x = 1"})
+        assert response.status_code == 200
+        assert response.headers["traceparent"].startswith("00-")
+
+        names = [span.name for span in exporter.spans]
+        assert "PATCH /api/v1/sessions/{session_id}" in names
+        assert "handler update_session" in names
+        assert "Database.get_session_by_id" in names
+        assert "Database.update_session" in names
+        assert "db.commit" in names
+        assert "db.UPDATE" in names
+        assert len({span.trace_id for span in exporter.spans}) == 1
+
+        by_id = {span.span_id: span for span in exporter.spans}
+        update = next(s for s in exporter.spans if s.name == "Database.update_session")
+        assert by_id[update.parent_id].name == "handler update_session"
+
+    def test_execution_phase_spans(self, client: TestClient, exporter):
+        """Test that executor phases are traced."""
+        client.post("/api/v1/execute", json={"code": "print(1)", "language": "python"})
+
+        names = {span.name for span in exporter.spans}
+        assert {
+            "CodeExecutionService.execute",
+            "execution.queue_wait",
+            "execution.compile",
+            "execution.run",
+        } <= names
+
+    def test_continues_incoming_trace(self, client: TestClient, exporter):
+        """Test that an incoming traceparent header is continued."""
+        traceparent = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+        client.get("/api/v1/health", headers={"traceparent": traceparent})
+
+        root = next(s for s in exporter.spans if s.name == "GET /api/v1/health")
+        assert f"{root.trace_id:032x}" == "0af7651916cd43dd8448eb211c80319c"
+        assert f"{root.parent_id:016x}" == "b7ad6b7169203331"
+
+    def test_sampling_rate_zero_records_nothing(self, client: TestClient, exporter):
+        """Test that unsampled traces produce no spans."""
+        tracer.configure(exporter, sample_rate=0.0)
+        client.get("/api/v1/health")
+        assert exporter.spans == []
+
+    def test_otlp_json_encoding(self, client: TestClient, exporter):
+        """Test that spans encode as OTLP/JSON."""
+        client.get("/api/v1/health")
+
+        encoded = exporter.encode(exporter.spans)
+        assert '"resourceSpans"' in encoded
+        assert '"traceId"' in encoded
+
+
+class TestTraceparent:
+    """Tests for W3C traceparent parsing."""
+
+    def test_parse_invalid(self):
+        """Test that malformed headers are ignored."""
+        assert parse_traceparent("garbage") is None
+        assert parse_traceparent("00-" + "0" * 32 + "-" + "1" * 16 + "-01") is None
@@ -2,6 +2,26 @@
 
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.services import db
+
+
+@pytest.fixture
+def db_activity():
+    """Count connection checkouts and commits on the primary."""
+    counts = {"checkouts": 0, "commits": 0}
+
+    def on_checkout(*args):
+        counts["checkouts"] += 1
+
+    def on_commit(conn):
+        counts["commits"] += 1
+
+    event.listen(db.engine.pool, "checkout", on_checkout)
+    event.listen(db.engine, "commit", on_commit)
+    yield counts
+    event.remove(db.engine.pool, "checkout", on_checkout)
+    event.remove(db.engine, "commit", on_commit)
 
 
 class TestJoinSession:
@@ -157,6 +177,16 @@ class TestLeaveSession:
         response = client.delete(f"/api/v1/sessions/{session_id}/users/nonexistent")
         assert response.status_code == 404
 
+    def test_leave_session_user_of_other_session(self, client: TestClient):
+        """Test that a user can only leave the session they joined."""
+        first = client.post("/api/v1/sessions").json()["id"]
+        second = client.post("/api/v1/sessions").json()["id"]
+        user_id = client.post(f"/api/v1/sessions/{first}/users").json()["id"]
+
+        response = client.delete(f"/api/v1/sessions/{second}/users/{user_id}")
+        assert response.status_code == 404
+        assert response.json()["detail"]["error"] == "USER_NOT_FOUND"
+
     def test_leave_session_multiple_users(self, client: TestClient):
         """Test one user leaving while others remain."""
         create_response = client.post("/api/v1/sessions")
@@ -180,3 +210,30 @@ class TestLeaveSession:
         remaining_ids = [u["id"] for u in get_response.json()["users"]]
         assert user_ids[1] in remaining_ids
         assert user_ids[2] in remaining_ids
+
+
+class TestRequestUnitOfWork:
+    """Tests for sharing one connection and transaction per request."""
+
+    def test_join_and_leave_use_one_checkout_and_commit(self, client: TestClient, db_activity):
+        """Test that the reads and write of a join or leave share one transaction."""
+        session_id = client.post("/api/v1/sessions").json()["id"]
+
+        db_activity.update(checkouts=0, commits=0)
+        user_id = client.post(f"/api/v1/sessions/{session_id}/users").json()["id"]
+        assert db_activity == {"checkouts": 1, "commits": 1}
+
+        db_activity.update(checkouts=0, commits=0)
+        response = client.delete(f"/api/v1/sessions/{session_id}/users/{user_id}")
+        assert response.status_code == 204
+        assert db_activity == {"checkouts": 1, "commits": 1}
+        assert client.get(f"/api/v1/sessions/{session_id}/users").json()["users"] == []
+
+    def test_failed_write_rolls_back_unit(self):
+        """Test that nothing in a unit of work is kept if a later call fails."""
+        with pytest.raises(RuntimeError):
+            with db.unit_of_work():
+                db.create_session("uow0000001", "python", "", 0)
+                assert db.session_exists("uow0000001")
+                raise RuntimeError("boom")
+        assert not db.session_exists("uow0000001")
@@ -1,5 +1,5 @@
 import { Play } from 'lucide-react';
-import { useEffect } from 'react';
+import { useEffect, useState } from 'react';
 import { Button } from '@/components/ui/button';
 import { Alert, AlertDescription } from '@/components/ui/alert';
 import { Header } from './Header';
@@ -28,6 +28,7 @@ export const InterviewRoom = ({ sessionId, onExit }: InterviewRoomProps) => {
     error,
   } = useSession(sessionId);
   const { executeCode, result, isExecuting } = useCodeExecution();
+  const [lastRunAt, setLastRunAt] = useState(0);
 
   // Load and join session on mount
   useEffect(() => {
@@ -42,9 +43,15 @@ export const InterviewRoom = ({ sessionId, onExit }: InterviewRoomProps) => {
   };
 
   const handleRun = async () => {
-    await executeCode(session!.code, session!.language);
+    await executeCode(session!.code, session!.language, session!.id);
+    setLastRunAt(Date.now());
   };
 
+  // Show whichever is newer: our own run or the last run anyone recorded in the session
+  const shared = session?.lastExecution;
+  const shownResult =
+    shared && (!result || shared.createdAt > lastRunAt) ? shared.result : result;
+
   if (isLoading) {
     return (
       <div className="h-screen flex items-center justify-center bg-background">
@@ -109,7 +116,7 @@ export const InterviewRoom = ({ sessionId, onExit }: InterviewRoomProps) => {
             />
           </div>
           <div className="h-64 lg:h-auto lg:w-96 border-t lg:border-t-0 lg:border-l border-border">
-            <OutputPanel result={result} isExecuting={isExecuting} />
+            <OutputPanel result={shownResult} isExecuting={isExecuting} />
           </div>
         </div>
       </div>
@@ -1,5 +1,6 @@
 import { Terminal, Clock, AlertCircle, CheckCircle } from 'lucide-react';
 import type { ExecutionResult } from '@/types/interview';
+import { executionApi } from '@/services/api';
 
 interface OutputPanelProps {
   result: ExecutionResult | null;
@@ -39,6 +40,25 @@ export const OutputPanel = ({ result, isExecuting }: OutputPanelProps) => {
                 <pre className="whitespace-pre-wrap">{result.output}</pre>
               </div>
             )}
+            {result.outputTruncated && (
+              <div className="text-xs text-muted-foreground">
+                Output truncated
+                {result.outputId && (
+                  <>
+                    {' '}
+                    &middot;{' '}
+                    <a
+                      href={executionApi.outputUrl(result.outputId)}
+                      target="_blank"
+                      rel="noreferrer"
+                      className="underline"
+                    >
+                      View full output
+                    </a>
+                  </>
+                )}
+              </div>
+            )}
           </div>
         ) : (
           <span className="text-muted-foreground">
@@ -9,7 +9,7 @@ export const useCodeExecution = () => {
   const [error, setError] = useState<string | null>(null);
 
   const executeCode = useCallback(
-    async (code: string, language: Language): Promise<ExecutionResult> => {
+    async (code: string, language: Language, sessionId?: string): Promise<ExecutionResult> => {
       setIsExecuting(true);
       setError(null);
 
@@ -32,7 +32,7 @@ export const useCodeExecution = () => {
             console.warn('Pyodide execution failed, falling back to backend', pyErr);
           }
         }
-        const executionResult = await executionApi.execute(code, language, 30000);
+        const executionResult = await executionApi.execute(code, language, 30000, sessionId);
         setResult(executionResult);
         return executionResult;
       } catch (err) {
@@ -1,9 +1,10 @@
 import { useState, useCallback, useEffect, useRef } from 'react';
 import type { Session, User, Language, SessionStatus } from '@/types/interview';
-import { sessionsApi, usersApi, ApiError } from '@/services/api';
+import { sessionsApi, usersApi, presenceApi, ApiError } from '@/services/api';
 
 const MAX_USERS = 10;
 const POLL_INTERVAL = 1000; // Poll every 1 second for real-time updates
+const HEARTBEAT_INTERVAL = 5000; // Presence heartbeat; the server expires users after 30 s of silence
 
 export const useSession = (sessionId: string | null) => {
   const [session, setSession] = useState<Session | null>(null);
@@ -12,6 +13,7 @@ export const useSession = (sessionId: string | null) => {
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const pollIntervalRef = useRef<NodeJS.Timeout | null>(null);
+  const heartbeatIntervalRef = useRef<NodeJS.Timeout | null>(null);
 
   const createSession = useCallback(async (): Promise<string> => {
     try {
@@ -198,6 +200,31 @@ export const useSession = (sessionId: string | null) => {
     };
   }, [sessionId, currentUser]);
 
+  // Keep the current user's presence alive while they are in the session
+  useEffect(() => {
+    if (!sessionId || !currentUser) {
+      return;
+    }
+
+    const heartbeat = async () => {
+      try {
+        await presenceApi.heartbeat(sessionId, currentUser.id);
+      } catch (err) {
+        console.debug('Failed to send presence heartbeat:', err);
+      }
+    };
+
+    heartbeat();
+    heartbeatIntervalRef.current = setInterval(heartbeat, HEARTBEAT_INTERVAL);
+
+    return () => {
+      if (heartbeatIntervalRef.current) {
+        clearInterval(heartbeatIntervalRef.current);
+        heartbeatIntervalRef.current = null;
+      }
+    };
+  }, [sessionId, currentUser]);
+
   return {
     session,
     currentUser,
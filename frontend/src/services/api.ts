@@ -154,6 +154,37 @@ export const usersApi = {
   },
 };
 
+/**
+ * Presence API
+ */
+export const presenceApi = {
+  /**
+   * Heartbeat the current user's presence (cursor/selection are optional)
+   * PUT /api/v1/sessions/{sessionId}/presence/{userId}
+   */
+  async heartbeat(
+    sessionId: string,
+    userId: string,
+    data: {
+      cursor?: { line: number; column: number };
+      selection?: {
+        anchor: { line: number; column: number };
+        head: { line: number; column: number };
+      };
+    } = {}
+  ) {
+    const response = await fetch(
+      `${API_BASE_URL}/sessions/${sessionId}/presence/${userId}`,
+      {
+        method: 'PUT',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(data),
+      }
+    );
+    return handleResponse(response);
+  },
+};
+
 /**
  * Code Execution API
  */
@@ -162,7 +193,7 @@ export const executionApi = {
    * Execute code
    * POST /api/v1/execute
    */
-  async execute(code: string, language: string, timeout?: number) {
+  async execute(code: string, language: string, timeout?: number, sessionId?: string) {
     const response = await fetch(`${API_BASE_URL}/execute`, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
@@ -170,10 +201,19 @@ export const executionApi = {
         code,
         language,
         timeout: timeout || 30000,
+        sessionId,
       }),
     });
     return handleResponse(response);
   },
+
+  /**
+   * URL of a byte range of a truncated run's full output
+   * GET /api/v1/execute/outputs/{outputId}
+   */
+  outputUrl(outputId: string, offset = 0, length = 1024 * 1024) {
+    return `${API_BASE_URL}/execute/outputs/${outputId}?offset=${offset}&length=${length}`;
+  },
 };
 
 /**
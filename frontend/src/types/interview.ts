@@ -16,10 +16,44 @@ export interface Session {
   users: User[];
   createdAt: number;
   status: SessionStatus;
+  lastExecution?: ExecutionRecord | null;
+}
+
+export interface ExecutionTelemetry {
+  queueWaitTime: number;
+  spawnTime: number | null;
+  compileTime: number | null;
+  runTime: number | null;
+  peakRssBytes: number | null;
+  cpuUserTime: number | null;
+  cpuSystemTime: number | null;
+  outputBytes: number;
 }
 
 export interface ExecutionResult {
   output: string;
   error: string | null;
   executionTime: number;
+  telemetry?: ExecutionTelemetry | null;
+  outputTruncated?: boolean;
+  outputId?: string | null;
+}
+
+export interface ExecutionRecord {
+  revision: number | null;
+  language: Language;
+  createdAt: number;
+  result: ExecutionResult;
+}
+
+export interface CursorPosition {
+  line: number;
+  column: number;
+}
+
+export interface Presence {
+  userId: string;
+  cursor: CursorPosition | null;
+  selection: { anchor: CursorPosition; head: CursorPosition } | null;
+  lastSeen: number;
 }